@@ -0,0 +1,52 @@
+"""add analysis cache
+
+Revision ID: add_analysis_cache
+Revises: add_net_worth_rollups
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_analysis_cache'
+down_revision = 'add_net_worth_rollups'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Content hash of each uploaded document
+    op.add_column('documents', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_documents_content_sha256'), 'documents', ['content_sha256'], unique=False)
+
+    # Create analysis_cache table
+    op.create_table(
+        'analysis_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('content_sha256', sa.String(length=64), nullable=False),
+        sa.Column('analyzer_version', sa.String(), nullable=False),
+        sa.Column('result', sa.Text(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('now()')),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_sha256', 'analyzer_version', name='uq_analysis_cache_hash_version')
+    )
+    op.create_index(op.f('ix_analysis_cache_id'), 'analysis_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_cache_last_used_at'), 'analysis_cache', ['last_used_at'], unique=False)
+
+    # Create analysis_cache_counters table
+    op.create_table(
+        'analysis_cache_counters',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+def downgrade():
+    op.drop_table('analysis_cache_counters')
+    op.drop_index(op.f('ix_analysis_cache_last_used_at'), table_name='analysis_cache')
+    op.drop_index(op.f('ix_analysis_cache_id'), table_name='analysis_cache')
+    op.drop_table('analysis_cache')
+    op.drop_index(op.f('ix_documents_content_sha256'), table_name='documents')
+    op.drop_column('documents', 'content_sha256')
@@ -0,0 +1,92 @@
+"""analysis result as jsonb, document asset and liability tables
+
+Revision ID: add_document_line_items
+Revises: add_analysis_cache
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_line_items'
+down_revision = 'add_analysis_cache'
+branch_labels = None
+depends_on = None
+
+LINE_ITEM_TABLES = ('document_assets', 'document_liabilities')
+
+def upgrade():
+    # analysis_result normally holds JSON text, but a plain ::jsonb cast would abort
+    # the migration on any row that doesn't: keep such text as {"error": <text>}
+    # and turn blanks into NULL
+    op.execute("""
+        CREATE FUNCTION analysis_result_to_jsonb(value text) RETURNS jsonb AS $$
+        BEGIN
+            RETURN NULLIF(btrim(value), '')::jsonb;
+        EXCEPTION WHEN invalid_text_representation THEN
+            RETURN jsonb_build_object('error', value);
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    op.alter_column(
+        'documents', 'analysis_result',
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=True,
+        postgresql_using='analysis_result_to_jsonb(analysis_result)'
+    )
+    op.execute("DROP FUNCTION analysis_result_to_jsonb(text)")
+    op.create_index('ix_documents_analysis_result', 'documents', ['analysis_result'], unique=False, postgresql_using='gin')
+
+    for table in LINE_ITEM_TABLES:
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=False),
+            sa.Column('type', sa.String(), nullable=False),
+            sa.Column('value', sa.Float(), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('date', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f(f'ix_{table}_id'), table, ['id'], unique=False)
+        op.create_index(op.f(f'ix_{table}_document_id'), table, ['document_id'], unique=False)
+        op.create_index(op.f(f'ix_{table}_date'), table, ['date'], unique=False)
+        op.create_index(f'ix_{table}_type_date', table, ['type', 'date'], unique=False)
+
+        # Backfill from completed analyses
+        key = table.split('_', 1)[1]
+        op.execute(f"""
+            INSERT INTO {table} (document_id, type, value, description, date)
+            SELECT
+                d.id,
+                COALESCE(NULLIF(item->>'type', ''), 'Unknown'),
+                CASE WHEN jsonb_typeof(item->'value') = 'number' THEN (item->>'value')::float END,
+                item->>'description',
+                (d.analysis_result->>'date')::timestamptz
+            FROM documents d
+            CROSS JOIN LATERAL jsonb_array_elements(d.analysis_result->'{key}') AS item
+            WHERE d.analysis_status = 'completed'
+              AND jsonb_typeof(d.analysis_result->'{key}') = 'array'
+              AND jsonb_typeof(item) = 'object'
+        """)
+
+def downgrade():
+    for table in reversed(LINE_ITEM_TABLES):
+        op.drop_index(f'ix_{table}_type_date', table_name=table)
+        op.drop_index(op.f(f'ix_{table}_date'), table_name=table)
+        op.drop_index(op.f(f'ix_{table}_document_id'), table_name=table)
+        op.drop_index(op.f(f'ix_{table}_id'), table_name=table)
+        op.drop_table(table)
+
+    op.drop_index('ix_documents_analysis_result', table_name='documents')
+    op.alter_column(
+        'documents', 'analysis_result',
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=True,
+        postgresql_using='analysis_result::text'
+    )
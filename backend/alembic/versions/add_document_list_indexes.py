@@ -0,0 +1,26 @@
+"""add document list indexes
+
+Revision ID: add_document_list_indexes
+Revises: add_document_analysis_fields
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_document_list_indexes'
+down_revision = 'add_document_analysis_fields'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Composite indexes for keyset pagination on (created_at, id) and its filters
+    op.create_index('ix_documents_created_at_id', 'documents', ['created_at', 'id'], unique=False)
+    op.create_index('ix_documents_status_created_at_id', 'documents', ['analysis_status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_documents_type_created_at_id', 'documents', ['type', 'created_at', 'id'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_documents_type_created_at_id', table_name='documents')
+    op.drop_index('ix_documents_status_created_at_id', table_name='documents')
+    op.drop_index('ix_documents_created_at_id', table_name='documents')
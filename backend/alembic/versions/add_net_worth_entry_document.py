@@ -0,0 +1,29 @@
+"""link net worth entries to the document that reported them
+
+Revision ID: add_net_worth_entry_document
+Revises: add_document_line_items
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_net_worth_entry_document'
+down_revision = 'add_document_line_items'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing entries stay unlinked: nothing recorded which document added them
+    op.add_column('net_worth_entries', sa.Column('document_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_net_worth_entries_document_id', 'net_worth_entries', 'documents',
+        ['document_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_net_worth_entries_document_id'), 'net_worth_entries', ['document_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_net_worth_entries_document_id'), table_name='net_worth_entries')
+    op.drop_constraint('fk_net_worth_entries_document_id', 'net_worth_entries', type_='foreignkey')
+    op.drop_column('net_worth_entries', 'document_id')
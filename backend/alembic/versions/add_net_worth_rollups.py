@@ -0,0 +1,39 @@
+"""add net worth rollups
+
+Revision ID: add_net_worth_rollups
+Revises: add_document_list_indexes
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_net_worth_rollups'
+down_revision = 'add_document_list_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create net_worth_rollups table; populate it with scripts/rebuild_rollups.py
+    op.create_table(
+        'net_worth_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.Date(), nullable=False),
+        sa.Column('open_value', sa.Float(), nullable=False),
+        sa.Column('open_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('close_value', sa.Float(), nullable=False),
+        sa.Column('close_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=False),
+        sa.Column('max_value', sa.Float(), nullable=False),
+        sa.Column('sum_value', sa.Float(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket_start', name='uq_net_worth_rollups_granularity_bucket')
+    )
+    op.create_index(op.f('ix_net_worth_rollups_id'), 'net_worth_rollups', ['id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_net_worth_rollups_id'), table_name='net_worth_rollups')
+    op.drop_table('net_worth_rollups')
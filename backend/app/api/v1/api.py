@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import net_worth, documents
+from app.api.v1.endpoints import admin, net_worth, documents
 
 api_router = APIRouter()
 
 api_router.include_router(net_worth.router, prefix="/net-worth", tags=["net-worth"])
-api_router.include_router(documents.router, prefix="/documents", tags=["documents"]) 
\ No newline at end of file
+api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from typing import List, Optional
+from app.core.profiling import list_profiles, read_profile, token_authorized
+from app.schemas.schemas import ProfileInfo
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    if not token_authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+@router.get("/profiles", response_model=List[ProfileInfo])
+def get_profiles(limit: int = Query(100, ge=1, le=1000)):
+    """Stored request and task profiles, newest first."""
+    return list_profiles(limit)
+
+@router.get("/profiles/{name}")
+def download_profile(name: str):
+    """The raw pstats file, e.g. for ``python -m pstats`` or snakeviz."""
+    data = read_profile(name)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'}
+    )
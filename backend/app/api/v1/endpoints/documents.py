@@ -1,38 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
-from sqlalchemy.orm import Session
-from typing import List
-import boto3
-from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, null, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import uuid
-from app.core.database import get_db
+import base64
+import json
+from app.core.cache import net_worth_cache
+from app.core.database import get_async_db
+from app.core.events import document_events
 from app.core.config import settings
-from app.models.models import Document, NetWorthEntry
-from app.schemas.schemas import Document as DocumentSchema
-from app.tasks.document_tasks import analyze_document
+from app.core.s3 import get_s3_client, run_s3
+from app.core.serialization import FastJSONResponse
+from app.models.models import Document
+from app.schemas.schemas import (
+    AllocationBucket,
+    AnalysisCacheStats,
+    BulkOperationResult,
+    Document as DocumentSchema,
+    DocumentSelection,
+)
+from app.services.allocation import get_allocation
+from app.services.analysis_cache import cache_stats, get_cached_analysis
+from app.services.analysis_results import record_analysis_result
+from app.services.storage import delete_s3_objects, stream_upload_to_s3, UploadTooLargeError
 
 router = APIRouter()
 
-def get_s3_client():
-    return boto3.client(
-        's3',
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        endpoint_url=settings.S3_ENDPOINT_URL,
-        region_name=settings.AWS_DEFAULT_REGION,
-    )
+DOWNLOAD_URL_PREFIX = f"{settings.API_V1_STR}/documents/download/"
+
+# Columns of the Document response schema, in schema order; url is derived from s3_key
+DOCUMENT_LIST_COLUMNS = (
+    Document.name,
+    Document.type,
+    Document.size,
+    Document.id,
+    Document.s3_key,
+    Document.content_sha256,
+    Document.created_at,
+    Document.analysis_status,
+    Document.analysis_result,
+)
+
+def _queue_analysis(document_id: int, s3_key: str, content_hash: Optional[str]):
+    # Imported on first use: the task module brings in the worker's dependencies,
+    # which API processes that never queue an analysis don't need
+    from app.tasks.document_tasks import analyze_document
+
+    analyze_document.delay(document_id=document_id, s3_key=s3_key, content_hash=content_hash)
 
 def get_s3_url(s3_client, s3_key: str) -> str:
-    try:
-        # Instead of using S3 presigned URLs, return a relative URL to our own endpoint
-        return f"/api/v1/documents/download/{s3_key}"
-    except ClientError as e:
-        print(f"Error generating URL: {e}")
-        return None
+    # Instead of using S3 presigned URLs, return a relative URL to our own endpoint
+    return f"{DOWNLOAD_URL_PREFIX}{s3_key}"
 
 @router.post("/upload", response_model=DocumentSchema)
 async def upload_document(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     s3_client = Depends(get_s3_client)
 ):
     # Generate unique S3 key
@@ -40,39 +67,41 @@ async def upload_document(
     s3_key = f"{uuid.uuid4()}.{file_extension}"
 
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Upload file to S3
-        s3_client.put_object(
-            Bucket=settings.S3_BUCKET_NAME,
-            Key=s3_key,
-            Body=file_content,
-            ContentType=file.content_type
+        # Stream file to S3 without buffering the whole upload in memory
+        upload = await stream_upload_to_s3(
+            s3_client,
+            file,
+            s3_key,
+            content_type=file.content_type
         )
 
         # Create database entry
         document = Document(
             name=file.filename,
             type=file.content_type,
-            size=len(file_content),
+            size=upload.size,
             s3_key=s3_key,
+            content_sha256=upload.sha256,
             analysis_status="pending"
         )
         db.add(document)
-        db.commit()
-        db.refresh(document)
 
-        try:
-            # Trigger async document analysis
-            analyze_document.delay(
-                document_id=document.id,
-                file_content=file_content.decode(),
-                file_type=file.content_type
-            )
-        except Exception as e:
-            print(f"Warning: Failed to queue document analysis task: {e}")
-            # Don't fail the upload if analysis queuing fails
+        # Reuse the analysis of identical content instead of calling the LLM again
+        cached_analysis = await db.run_sync(get_cached_analysis, upload.sha256)
+        added_entry = cached_analysis is not None and await db.run_sync(record_analysis_result, document, cached_analysis)
+        await db.commit()
+        if added_entry:
+            await net_worth_cache.ainvalidate()
+        await db.refresh(document)
+        await document_events.apublish({"document_id": document.id, "status": document.analysis_status})
+
+        if cached_analysis is None:
+            try:
+                # Trigger async document analysis; the worker reads the file from S3
+                _queue_analysis(document.id, s3_key, upload.sha256)
+            except Exception as e:
+                print(f"Warning: Failed to queue document analysis task: {e}")
+                # Don't fail the upload if analysis queuing fails
 
         # Generate presigned URL
         document_schema = DocumentSchema.from_orm(document)
@@ -80,78 +109,318 @@ async def upload_document(
         
         return document_schema
 
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
-        # Clean up S3 object if operation fails
+        # Clean up S3 object if operation fails; botocore is only imported once S3 is in use
+        from botocore.exceptions import ClientError
+
         try:
-            s3_client.delete_object(Bucket=settings.S3_BUCKET_NAME, Key=s3_key)
+            await run_s3(s3_client.delete_object, Bucket=settings.S3_BUCKET_NAME, Key=s3_key)
         except ClientError:
             pass
         raise HTTPException(status_code=500, detail=str(e))
 
+def _encode_cursor(created_at: datetime, document_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), document_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(document_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _filter_documents(query, analysis_status=None, document_type=None, created_after=None, created_before=None):
+    if analysis_status:
+        query = query.filter(Document.analysis_status == analysis_status)
+    if document_type:
+        query = query.filter(Document.type == document_type)
+    if created_after:
+        query = query.filter(Document.created_at >= created_after)
+    if created_before:
+        query = query.filter(Document.created_at < created_before)
+    return query
+
 @router.get("/list", response_model=List[DocumentSchema])
-def list_documents(
-    db: Session = Depends(get_db),
+async def list_documents(
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.DOCUMENTS_PAGE_SIZE, ge=1, le=settings.DOCUMENTS_MAX_PAGE_SIZE),
+    analysis_status: Optional[str] = None,
+    document_type: Optional[str] = Query(None, alias="type"),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List documents newest first, one page at a time.
+
+    Pages are keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    header from the previous response as ``cursor`` to get the next page.
+    The header is absent on the last page.
+
+    The body is built from column tuples and encoded with orjson, skipping
+    ORM objects and per-row schema validation.
+    """
+    query = _filter_documents(select(*DOCUMENT_LIST_COLUMNS), analysis_status, document_type, created_after, created_before)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            Document.created_at < cursor_created_at,
+            and_(Document.created_at == cursor_created_at, Document.id < cursor_id)
+        ))
+
+    # Fetch one extra row to know whether there is a next page
+    result = await db.execute(query.order_by(Document.created_at.desc(), Document.id.desc()).limit(limit + 1))
+    rows = result.all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(last.created_at, last.id)
+
+    keys = [column.key for column in DOCUMENT_LIST_COLUMNS]
+    documents = []
+    for row in rows:
+        document = dict(zip(keys, row))
+        document["url"] = DOWNLOAD_URL_PREFIX + row.s3_key
+        documents.append(document)
+    return FastJSONResponse(documents, headers=headers)
+
+@router.get("/analysis-cache/stats", response_model=AnalysisCacheStats)
+async def get_analysis_cache_stats(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(cache_stats)
+
+@router.get("/allocation", response_model=List[AllocationBucket])
+async def get_document_allocation(
+    kind: Literal["assets", "liabilities"] = "assets",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Total value per asset or liability type across analyzed documents, largest first."""
+    return await db.run_sync(get_allocation, kind, start, end)
+
+async def _select_documents(db: AsyncSession, selection: DocumentSelection, *columns):
+    """
+    Rows of (id, *columns) for a bulk selection, plus a failure for every
+    requested id that doesn't exist or doesn't match the filters.
+    """
+    filters = (selection.analysis_status, selection.type, selection.created_after, selection.created_before)
+    if not selection.ids and not any(filters):
+        # An empty selection would otherwise mean every document
+        raise HTTPException(status_code=400, detail="Pass ids, a filter, or both")
+    if selection.ids and len(selection.ids) > settings.DOCUMENTS_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {settings.DOCUMENTS_BULK_MAX} ids per request")
+
+    query = _filter_documents(select(Document.id, *columns), *filters)
+    if selection.ids:
+        query = query.filter(Document.id.in_(selection.ids))
+    rows = (await db.execute(query.order_by(Document.id).limit(settings.DOCUMENTS_BULK_MAX + 1))).all()
+    if len(rows) > settings.DOCUMENTS_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"Selection matches more than {settings.DOCUMENTS_BULK_MAX} documents")
+
+    found = {row.id for row in rows}
+    failed = [{"id": document_id, "error": "Document not found"} for document_id in dict.fromkeys(selection.ids or ()) if document_id not in found]
+    return rows, failed
+
+@router.post("/bulk-delete", response_model=BulkOperationResult)
+async def bulk_delete_documents(
+    selection: DocumentSelection,
+    db: AsyncSession = Depends(get_async_db),
     s3_client = Depends(get_s3_client)
 ):
-    documents = db.query(Document).order_by(Document.created_at.desc()).all()
-    # Add presigned URLs to each document
-    for doc in documents:
-        doc.url = get_s3_url(s3_client, doc.s3_key)
-    return documents
+    """
+    Delete many documents: S3 objects with batched DeleteObjects, rows with a
+    single DELETE. Documents whose object couldn't be deleted are kept and
+    reported in ``failed``.
+    """
+    rows, failed = await _select_documents(db, selection, Document.s3_key)
+    s3_errors = await delete_s3_objects(s3_client, [row.s3_key for row in rows])
+
+    deleted = []
+    for row in rows:
+        if row.s3_key in s3_errors:
+            failed.append({"id": row.id, "error": f"S3 delete failed: {s3_errors[row.s3_key]}"})
+        else:
+            deleted.append(row.id)
+
+    if deleted:
+        await db.execute(delete(Document).where(Document.id.in_(deleted)))
+        await db.commit()
+        await document_events.apublish_many([{"document_id": document_id, "status": "deleted"} for document_id in deleted])
+    return {"succeeded": deleted, "failed": failed}
+
+def _queue_analyses(rows) -> List[tuple]:
+    """Queue analyze_document for every row; returns (id, error) for those that couldn't be queued."""
+    errors = []
+    for row in rows:
+        try:
+            _queue_analysis(row.id, row.s3_key, row.content_sha256)
+        except Exception as e:
+            errors.append((row.id, str(e)))
+    return errors
+
+@router.post("/bulk-reanalyze", response_model=BulkOperationResult)
+async def bulk_reanalyze_documents(selection: DocumentSelection, db: AsyncSession = Depends(get_async_db)):
+    """
+    Reset many documents to pending with a single UPDATE and queue their analysis.
+
+    Analyses are still served from the analysis cache when the content and
+    analyzer version match. Each one replaces the net worth entry the
+    document's previous analysis recorded.
+    """
+    rows, failed = await _select_documents(db, selection, Document.s3_key, Document.content_sha256)
+    if not rows:
+        return {"succeeded": [], "failed": failed}
+
+    ids = [row.id for row in rows]
+    await db.execute(update(Document).where(Document.id.in_(ids)).values(analysis_status="pending", analysis_result=null()))
+    await db.commit()
+
+    # Publishing to the broker blocks; keep it off the event loop
+    errors = await run_in_threadpool(_queue_analyses, rows)
+    unqueued = {document_id for document_id, _ in errors}
+    if unqueued:
+        await db.execute(update(Document).where(Document.id.in_(unqueued)).values(analysis_status="failed"))
+        await db.commit()
+        failed += [{"id": document_id, "error": f"Failed to queue analysis: {error}"} for document_id, error in errors]
+
+    queued = [document_id for document_id in ids if document_id not in unqueued]
+    await document_events.apublish_many([
+        {"document_id": document_id, "status": "failed" if document_id in unqueued else "pending"} for document_id in ids
+    ])
+    return {"succeeded": queued, "failed": failed}
+
+async def _event_stream(last_event_id: Optional[str]):
+    # Tell EventSource how soon to reconnect; it resends the last id it saw
+    yield b"retry: 3000\n\n"
+    async for event in document_events.subscribe(last_event_id):
+        if event is None:
+            # Comment line: keeps proxies from closing an idle connection
+            yield b": keepalive\n\n"
+            continue
+        event_id, data = event
+        yield b"id: " + event_id.encode() + b"\nevent: document\ndata: " + data + b"\n\n"
+
+@router.get("/events")
+async def document_events_stream(last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events stream of document status changes: uploads, analyses
+    completing or failing, and deletions, as ``{"document_id", "status"}``.
+    Reconnecting clients resume after their Last-Event-ID.
+    """
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Document events are disabled")
+    return StreamingResponse(
+        _event_stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{document_id}", response_model=DocumentSchema)
-def get_document(
+async def get_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     s3_client = Depends(get_s3_client)
 ):
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     document.url = get_s3_url(s3_client, document.s3_key)
     return document
 
 @router.delete("/{document_id}")
-def delete_document(
+async def delete_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     s3_client = Depends(get_s3_client)
 ):
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
     try:
         # Delete from S3
-        s3_client.delete_object(
+        await run_s3(
+            s3_client.delete_object,
             Bucket=settings.S3_BUCKET_NAME,
             Key=document.s3_key
         )
         
         # Delete from database
-        db.delete(document)
-        db.commit()
+        await db.delete(document)
+        await db.commit()
+        await document_events.apublish({"document_id": document_id, "status": "deleted"})
         
         return {"message": "Document deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Add new download endpoint
+def _stream_s3_body(body, chunk_size: int):
+    try:
+        for chunk in body.iter_chunks(chunk_size=chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
 @router.get("/download/{s3_key}")
 async def download_document(
     s3_key: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
     s3_client = Depends(get_s3_client)
 ):
+    # Pass Range and conditional headers through so S3 does the matching
+    request_args = {}
+    if range_header:
+        request_args["Range"] = range_header
+    if if_none_match:
+        request_args["IfNoneMatch"] = if_none_match
+    elif if_modified_since:
+        # If-Modified-Since is ignored when If-None-Match is present (RFC 9110)
+        try:
+            request_args["IfModifiedSince"] = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            pass
+
+    from botocore.exceptions import ClientError
+
     try:
-        # Get the object from S3
-        response = s3_client.get_object(
+        response = await run_s3(
+            s3_client.get_object,
             Bucket=settings.S3_BUCKET_NAME,
-            Key=s3_key
-        )
-        # Return the file content
-        return Response(
-            content=response['Body'].read(),
-            media_type=response['ContentType']
+            Key=s3_key,
+            **request_args
         )
     except ClientError as e:
-        raise HTTPException(status_code=404, detail="File not found") 
\ No newline at end of file
+        error_code = e.response.get("Error", {}).get("Code")
+        if error_code in ("304", "NotModified"):
+            error_headers = e.response.get("ResponseMetadata", {}).get("HTTPHeaders", {})
+            headers = {"ETag": error_headers["etag"]} if "etag" in error_headers else {}
+            return Response(status_code=304, headers=headers)
+        if error_code == "InvalidRange":
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable")
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(response["ContentLength"]),
+    }
+    if response.get("ETag"):
+        headers["ETag"] = response["ETag"]
+    if response.get("LastModified"):
+        headers["Last-Modified"] = format_datetime(
+            response["LastModified"].astimezone(timezone.utc), usegmt=True
+        )
+    if response.get("ContentRange"):
+        headers["Content-Range"] = response["ContentRange"]
+
+    return StreamingResponse(
+        _stream_s3_body(response["Body"], settings.S3_DOWNLOAD_CHUNK_SIZE),
+        status_code=206 if response.get("ContentRange") else 200,
+        media_type=response.get("ContentType"),
+        headers=headers
+    )
@@ -1,28 +1,199 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, File, Header, HTTPException, Query, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from typing import Any, List, Literal, Optional
+from datetime import date, datetime
+import numpy as np
+from app.core.cache import etag_matches, net_worth_cache
+from app.core.config import settings
+from app.core.database import get_async_db, get_db
 from app.models.models import NetWorthEntry
-from app.schemas.schemas import NetWorthEntryCreate, NetWorthEntry as NetWorthEntrySchema
+from app.schemas.schemas import (
+    NetWorthAnalytics as NetWorthAnalyticsSchema,
+    NetWorthEntryCreate,
+    NetWorthEntry as NetWorthEntrySchema,
+    NetWorthImportResult,
+    NetWorthProjection as NetWorthProjectionSchema,
+    NetWorthRollup as NetWorthRollupSchema,
+)
+from app.services.analytics import compute_analytics, series_arrays
+from app.services.downsampling import downsample_indices
+from app.services.net_worth_import import CSVDecodeError, import_entries, iter_csv_rows
+from app.services.projection import InsufficientHistoryError, project
+from app.services.rollups import apply_to_rollups, get_rollups
 
 router = APIRouter()
 
+# Columns of the NetWorthEntry response schema, in schema order
+HISTORY_COLUMNS = (
+    NetWorthEntry.value,
+    NetWorthEntry.date,
+    NetWorthEntry.id,
+    NetWorthEntry.created_at,
+    NetWorthEntry.updated_at,
+)
+
+async def _cached_json(key: str, compute, if_none_match: Optional[str]) -> Response:
+    """Serve a JSON response from the net worth cache, or 304 if the client's copy is current."""
+    cached = await net_worth_cache.get_or_compute(key, compute)
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 @router.post("/", response_model=NetWorthEntrySchema)
-def create_net_worth_entry(entry: NetWorthEntryCreate, db: Session = Depends(get_db)):
+async def create_net_worth_entry(entry: NetWorthEntryCreate, db: AsyncSession = Depends(get_async_db)):
     db_entry = NetWorthEntry(value=entry.value, date=entry.date)
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    await db.run_sync(apply_to_rollups, [(entry.date, entry.value)])
+    await db.commit()
+    await net_worth_cache.ainvalidate()
+    await db.refresh(db_entry)
     return db_entry
 
+@router.post("/batch", response_model=NetWorthImportResult)
+def create_net_worth_entries(entries: List[Any] = Body(...), db: Session = Depends(get_db)):
+    """
+    Insert many entries in one transaction. Rows are validated individually:
+    invalid rows are reported by their 1-based position and the rest are inserted.
+
+    Bulk imports stay on the sync session in the threadpool: validation is
+    CPU-bound and shouldn't run on the event loop, and PostgreSQL gets COPY.
+    """
+    result = import_entries(db, enumerate(entries, start=1))
+    net_worth_cache.invalidate()
+    return result
+
+@router.post("/import-csv", response_model=NetWorthImportResult)
+def import_net_worth_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Stream a CSV with ``value`` and ``date`` columns into net_worth_entries.
+    Errors are reported by CSV line number; a file that isn't UTF-8 is
+    rejected with a 400 naming the first bad line, and nothing is imported.
+    """
+    try:
+        result = import_entries(db, iter_csv_rows(file.file))
+    except CSVDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    net_worth_cache.invalidate()
+    return result
+
 @router.get("/history", response_model=List[NetWorthEntrySchema])
-def get_net_worth_history(db: Session = Depends(get_db)):
-    entries = db.query(NetWorthEntry).order_by(NetWorthEntry.date.desc()).all()
-    return entries
+async def get_net_worth_history(
+    points: Optional[int] = Query(None, ge=3, le=settings.NET_WORTH_HISTORY_MAX_POINTS),
+    method: Literal["lttb", "minmax"] = "lttb",
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Net worth history, newest first.
+
+    With ``points``, returns a shape-preserving downsample of at most that many
+    entries (LTTB or min/max bucketing) instead of the full series.
+    Responses are cached until the next net worth write.
+    """
+    async def compute():
+        keys = [column.key for column in HISTORY_COLUMNS]
+        return [dict(zip(keys, row)) for row in await _load_history(db, points, method)]
+
+    key = f"history:{points}:{method}" if points else "history:all"
+    return await _cached_json(key, compute, if_none_match)
+
+def _pick_points(series: List[tuple], points: int, method: str) -> List[tuple]:
+    x = np.fromiter((row.date.timestamp() for row in series), dtype=np.float64, count=len(series))
+    y = np.fromiter((row.value for row in series), dtype=np.float64, count=len(series))
+    return [series[i] for i in downsample_indices(x, y, points, method)]
+
+async def _load_history(db: AsyncSession, points: Optional[int], method: str) -> List[tuple]:
+    """History rows as column tuples (no ORM objects), newest first."""
+    if points is None:
+        result = await db.execute(select(*HISTORY_COLUMNS).order_by(NetWorthEntry.date.desc()))
+        return result.all()
+
+    result = await db.execute(select(*HISTORY_COLUMNS).order_by(NetWorthEntry.date.asc(), NetWorthEntry.id.asc()))
+    series = result.all()
+    if len(series) > points:
+        # Downsampling long series is CPU-bound; keep it off the event loop
+        series = await run_in_threadpool(_pick_points, series, points, method)
+    return series[::-1]
+
+@router.get("/rollup", response_model=List[NetWorthRollupSchema])
+async def get_net_worth_rollup(
+    granularity: Literal["day", "week", "month"] = "month",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Open/close/min/max/average/count per bucket, oldest first, read from the precomputed rollups."""
+    return await db.run_sync(get_rollups, granularity, start, end)
+
+@router.get("/analytics", response_model=NetWorthAnalyticsSchema)
+async def get_net_worth_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    period: Literal["day", "week", "month"] = "month",
+    window: Optional[int] = Query(None, ge=2, le=365),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Period returns, rolling volatility (over ``window`` periods), max drawdown,
+    CAGR and best/worst periods between ``start`` (inclusive) and ``end`` (exclusive).
+    Cached per range until the next net worth write.
+    """
+    async def compute():
+        query = select(NetWorthEntry.date, NetWorthEntry.value).order_by(NetWorthEntry.date.asc(), NetWorthEntry.id.asc())
+        if start:
+            query = query.where(NetWorthEntry.date >= start)
+        if end:
+            query = query.where(NetWorthEntry.date < end)
+        rows = (await db.execute(query)).all()
+        # Vectorized, but CPU-bound on long series; keep it off the event loop
+        return await run_in_threadpool(_analytics, rows, period, window)
+
+    key = f"analytics:{period}:{window or ''}:{start.isoformat() if start else ''}:{end.isoformat() if end else ''}"
+    return await _cached_json(key, compute, if_none_match)
+
+def _analytics(rows: List[tuple], period: str, window: Optional[int]) -> dict:
+    timestamps, values = series_arrays(rows)
+    return compute_analytics(timestamps, values, period, window)
+
+@router.get("/projection", response_model=NetWorthProjectionSchema)
+async def get_net_worth_projection(
+    months: int = Query(120, ge=1, le=settings.PROJECTION_MAX_MONTHS),
+    paths: int = Query(10000, ge=100, le=settings.PROJECTION_MAX_PATHS),
+    seed: int = Query(0, ge=0),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Monte Carlo projection calibrated on the full history: 5th to 95th
+    percentile bands per month. Deterministic for a given seed, and cached
+    until the next net worth write.
+    """
+    async def compute():
+        query = select(NetWorthEntry.date, NetWorthEntry.value).order_by(NetWorthEntry.date.asc(), NetWorthEntry.id.asc())
+        rows = (await db.execute(query)).all()
+        try:
+            return await run_in_threadpool(_projection, rows, months, paths, seed)
+        except InsufficientHistoryError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return await _cached_json(f"projection:{months}:{paths}:{seed}", compute, if_none_match)
+
+def _projection(rows: List[tuple], months: int, paths: int, seed: int) -> dict:
+    timestamps, values = series_arrays(rows)
+    return project(timestamps, values, months, paths, seed)
 
 @router.get("/latest", response_model=NetWorthEntrySchema)
-def get_latest_net_worth(db: Session = Depends(get_db)):
-    entry = db.query(NetWorthEntry).order_by(NetWorthEntry.date.desc()).first()
-    if not entry:
-        raise HTTPException(status_code=404, detail="No net worth entries found")
-    return entry 
\ No newline at end of file
+async def get_latest_net_worth(if_none_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)):
+    async def compute():
+        result = await db.execute(select(NetWorthEntry).order_by(NetWorthEntry.date.desc()).limit(1))
+        entry = result.scalars().first()
+        if not entry:
+            raise HTTPException(status_code=404, detail="No net worth entries found")
+        return NetWorthEntrySchema.model_validate(entry).model_dump(mode="json")
+
+    return await _cached_json("latest", compute, if_none_match) 
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from redis.exceptions import ConnectionError as RedisConnectionError, RedisError, TimeoutError as RedisTimeoutError
+from .config import settings
+from .redis import get_async_redis, get_redis
+from .serialization import dumps
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+class ResponseCache:
+    """
+    Redis cache of serialized JSON responses for one namespace.
+
+    Keys embed a namespace version: writers call ``invalidate`` to bump it, which
+    orphans every cached response at once (they then expire by TTL). Misses are
+    coalesced (single-flight): one task per process and one process per key
+    computes, the others wait for its result. If Redis is unavailable the
+    response is computed directly, and after a connection error or timeout
+    reads skip Redis for RESPONSE_CACHE_BREAKER_SECONDS rather than each
+    waiting out the socket timeout. Invalidations are always attempted.
+
+    Reads are async, for API routes; ``invalidate`` is also available sync for
+    the Celery worker and scripts.
+    """
+    LOCK_STRIPES = 64
+
+    def __init__(self, namespace: str, ttl: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._redis = None
+        self._async_redis = None
+        self._locks = [asyncio.Lock() for _ in range(self.LOCK_STRIPES)]
+        # Circuit breaker: monotonic time until which reads bypass Redis
+        self._bypass_until = 0.0
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    @redis.setter
+    def redis(self, client):
+        self._redis = client
+
+    @property
+    def async_redis(self):
+        return self._async_redis or get_async_redis()
+
+    @async_redis.setter
+    def async_redis(self, client):
+        self._async_redis = client
+
+    @property
+    def _version_key(self) -> str:
+        return f"cache:{self.namespace}:version"
+
+    @staticmethod
+    def _encode(value: Any) -> CachedResponse:
+        body = dumps(value)
+        return CachedResponse(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+    @staticmethod
+    def _pack(response: CachedResponse) -> bytes:
+        return response.etag.encode() + b"\n" + response.body
+
+    @staticmethod
+    def _unpack(raw: bytes) -> CachedResponse:
+        etag, body = raw.split(b"\n", 1)
+        return CachedResponse(body=body, etag=etag.decode())
+
+    def invalidate(self) -> None:
+        """Bump the namespace version. Call after the write has committed."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return
+        try:
+            self.redis.incr(self._version_key)
+        except RedisError as e:
+            print(f"Warning: failed to invalidate {self.namespace} cache: {e}")
+
+    async def ainvalidate(self) -> None:
+        """Async ``invalidate`` for API routes."""
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return
+        try:
+            await self.async_redis.incr(self._version_key)
+        except RedisError as e:
+            print(f"Warning: failed to invalidate {self.namespace} cache: {e}")
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        if not settings.RESPONSE_CACHE_ENABLED or time.monotonic() < self._bypass_until:
+            return self._encode(await compute())
+        try:
+            return await self._get_or_compute(key, compute)
+        except RedisError as e:
+            if isinstance(e, (RedisConnectionError, RedisTimeoutError)):
+                self._bypass_until = time.monotonic() + settings.RESPONSE_CACHE_BREAKER_SECONDS
+                print(f"Warning: {self.namespace} cache unavailable, bypassing it for {settings.RESPONSE_CACHE_BREAKER_SECONDS}s: {e}")
+            else:
+                print(f"Warning: {self.namespace} cache unavailable: {e}")
+        return self._encode(await compute())
+
+    async def _get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        client = self.async_redis
+        ttl = self.ttl or settings.RESPONSE_CACHE_TTL
+        version = int(await client.get(self._version_key) or 0)
+        cache_key = f"cache:{self.namespace}:v{version}:{key}"
+
+        cached = await client.get(cache_key)
+        if cached is not None:
+            return self._unpack(cached)
+
+        # Coalesce concurrent misses in this process...
+        async with self._locks[hash(cache_key) % self.LOCK_STRIPES]:
+            cached = await client.get(cache_key)
+            if cached is not None:
+                return self._unpack(cached)
+
+            # ...and across processes, with a short-lived Redis lock
+            lock_key = f"{cache_key}:lock"
+            lock_timeout = settings.RESPONSE_CACHE_LOCK_TIMEOUT
+            if await client.set(lock_key, b"1", nx=True, px=int(lock_timeout * 1000)):
+                try:
+                    response = self._encode(await compute())
+                    await client.set(cache_key, self._pack(response), ex=ttl)
+                    return response
+                finally:
+                    await client.delete(lock_key)
+
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+                cached = await client.get(cache_key)
+                if cached is not None:
+                    return self._unpack(cached)
+
+        # The lock holder died or is too slow; don't keep the caller waiting
+        return self._encode(await compute())
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+net_worth_cache = ResponseCache("net-worth")
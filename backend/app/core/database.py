@@ -1,17 +1,119 @@
+import asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+# Async drivers for the sync URLs used by Alembic and the Celery worker
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def _pool_options(url: str, is_async: bool = False) -> dict:
+    # SQLite uses a single-connection or NullPool pool that takes no sizing options
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+engine = create_engine(
+    settings.SQLALCHEMY_DATABASE_URI,
+    pool_pre_ping=True,
+    **_pool_options(settings.SQLALCHEMY_DATABASE_URI)
+)
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def upsert(db, model):
+    """INSERT for ``model`` that supports ``on_conflict_do_update`` on the session's dialect."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
 # Dependency
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def async_database_url() -> str:
+    """ASYNC_DATABASE_URL, or the sync URL with its driver swapped for the async one."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    """
+    Session factory for the async engine, created on first use so that the
+    worker and Alembic, which only use the sync engine, never import asyncpg.
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_database_url()
+        _async_engine = create_async_engine(url, pool_pre_ping=True, **_pool_options(url, is_async=True))
+        instrument_engine(_async_engine.sync_engine, "async")
+        # Objects stay loaded after commit; async sessions can't lazy-load on attribute access
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_sessionmaker = None
+
+class ThreadedSession:
+    """
+    The AsyncSession interface API routes use, over a sync Session whose
+    blocking calls run in a worker thread. Served by ``get_async_db`` when
+    ASYNC_DB_ENABLED is off.
+    """
+    AWAITABLE = {"execute", "scalar", "scalars", "get", "flush", "commit", "rollback", "refresh", "delete", "close"}
+
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    def __getattr__(self, name):
+        attribute = getattr(self.sync_session, name)
+        if name not in self.AWAITABLE:
+            return attribute
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+        return call
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+
+# Async dependency
+async def get_async_db():
+    if not settings.ASYNC_DB_ENABLED:
+        # Like the async sessions, keep objects loaded after commit
+        db = ThreadedSession(SessionLocal(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    async with get_async_sessionmaker()() as db:
+        yield db
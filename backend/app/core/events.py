@@ -0,0 +1,169 @@
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+from redis.exceptions import RedisError
+from .config import settings
+from .redis import get_async_redis, get_redis
+from .serialization import dumps
+
+def _stream_id(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+def _id_key(stream_id: str) -> Tuple[int, int]:
+    ms, _, seq = stream_id.partition("-")
+    return int(ms), int(seq or 0)
+
+class _Subscription:
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        # Set when the subscriber fell behind and events were dropped
+        self.overflowed = False
+
+class EventStream:
+    """
+    Redis stream of JSON events for one topic, served as Server-Sent Events.
+
+    Publishers XADD to a stream capped at EVENTS_STREAM_MAXLEN. Each API process
+    runs a single XREAD loop that fans entries out to its subscribers, so a
+    connected client costs an in-memory queue rather than a Redis connection.
+    Stream ids are the SSE event ids: a client reconnecting with Last-Event-ID
+    first replays what it missed with XRANGE. A subscriber that falls too far
+    behind is disconnected, and catches up the same way when it reconnects.
+    """
+    def __init__(self, topic: str):
+        self.key = f"events:{topic}"
+        self._redis = None
+        self._async_redis = None
+        self._subscribers = set()
+        self._reader: Optional[asyncio.Task] = None
+        # Set once the reader knows where the stream ended when it started
+        self._reader_ready: Optional[asyncio.Event] = None
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    @redis.setter
+    def redis(self, client):
+        self._redis = client
+
+    @property
+    def async_redis(self):
+        return self._async_redis or get_async_redis()
+
+    @async_redis.setter
+    def async_redis(self, client):
+        self._async_redis = client
+
+    def _xadd_args(self, event: dict) -> dict:
+        return {"fields": {"data": dumps(event)}, "maxlen": settings.EVENTS_STREAM_MAXLEN, "approximate": True}
+
+    def publish(self, event: dict) -> Optional[str]:
+        """Append an event; returns its id. Call after the change it describes has committed."""
+        if not settings.EVENTS_ENABLED:
+            return None
+        try:
+            return _stream_id(self.redis.xadd(self.key, **self._xadd_args(event)))
+        except RedisError as e:
+            print(f"Warning: failed to publish {self.key} event: {e}")
+            return None
+
+    async def apublish(self, event: dict) -> Optional[str]:
+        """Async ``publish`` for API routes."""
+        if not settings.EVENTS_ENABLED:
+            return None
+        try:
+            return _stream_id(await self.async_redis.xadd(self.key, **self._xadd_args(event)))
+        except RedisError as e:
+            print(f"Warning: failed to publish {self.key} event: {e}")
+            return None
+
+    async def apublish_many(self, events: List[dict]) -> None:
+        """Publish several events in one round trip."""
+        if not events or not settings.EVENTS_ENABLED:
+            return
+        try:
+            pipeline = self.async_redis.pipeline(transaction=False)
+            for event in events:
+                pipeline.xadd(self.key, **self._xadd_args(event))
+            await pipeline.execute()
+        except RedisError as e:
+            print(f"Warning: failed to publish {self.key} events: {e}")
+
+    async def _read(self, ready: asyncio.Event):
+        redis = self.async_redis
+        last_id = None
+        while self._subscribers:
+            try:
+                if last_id is None:
+                    # Start after the newest entry; "$" would skip entries added between reads
+                    newest = await redis.xrevrange(self.key, count=1)
+                    last_id = _stream_id(newest[0][0]) if newest else "0-0"
+                    ready.set()
+                # Blocks for less than the socket timeout, so the shared client can be used
+                response = await redis.xread({self.key: last_id}, count=100, block=settings.EVENTS_READ_BLOCK_MS)
+            except RedisError as e:
+                print(f"Warning: failed to read {self.key}: {e}")
+                # Don't hold subscribers up while Redis is unavailable
+                ready.set()
+                await asyncio.sleep(1)
+                continue
+            for _, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = _stream_id(entry_id)
+                    event = (last_id, fields[b"data"])
+                    for subscription in list(self._subscribers):
+                        try:
+                            subscription.queue.put_nowait(event)
+                        except asyncio.QueueFull:
+                            subscription.overflowed = True
+                            self._subscribers.discard(subscription)
+
+    async def _ensure_reader(self):
+        # The reader belongs to the running loop; start one if there is none on it
+        loop = asyncio.get_running_loop()
+        if self._reader is None or self._reader.done() or self._reader.get_loop() is not loop:
+            self._reader_ready = asyncio.Event()
+            self._reader = loop.create_task(self._read(self._reader_ready))
+        # Events published from here on reach the subscriber through the reader
+        await self._reader_ready.wait()
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[Optional[Tuple[str, bytes]]]:
+        """
+        Yield (event id, JSON bytes) for every new event, after replaying those
+        following ``last_event_id``. Yields None every EVENTS_HEARTBEAT_SECONDS
+        without events, and returns if the subscriber overflowed.
+        """
+        subscription = _Subscription(settings.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+        # Subscribe before replaying, so nothing falls between the two
+        self._subscribers.add(subscription)
+        try:
+            await self._ensure_reader()
+            replayed = None
+            if last_event_id:
+                try:
+                    entries = await self.async_redis.xrange(
+                        self.key, min=f"({last_event_id}", max="+", count=settings.EVENTS_STREAM_MAXLEN
+                    )
+                except RedisError as e:
+                    # Unknown or malformed id, or Redis is down: continue with live events only
+                    print(f"Warning: failed to replay {self.key} from {last_event_id}: {e}")
+                    entries = []
+                for entry_id, fields in entries:
+                    replayed = _id_key(_stream_id(entry_id))
+                    yield _stream_id(entry_id), fields[b"data"]
+
+            while True:
+                if subscription.overflowed and subscription.queue.empty():
+                    return
+                try:
+                    event_id, data = await asyncio.wait_for(subscription.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if replayed is not None and _id_key(event_id) <= replayed:
+                    continue
+                yield event_id, data
+        finally:
+            self._subscribers.discard(subscription)
+
+document_events = EventStream("documents")
@@ -0,0 +1,231 @@
+"""
+Prometheus metrics for the API and the Celery worker.
+
+The API serves them on /metrics (see ``instrument_app``); the worker starts
+its own exporter on WORKER_METRICS_PORT. The worker runs with
+``--pool=threads``, so one process holds all of its metrics.
+"""
+import time
+from contextvars import ContextVar
+from typing import Iterable, List, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.responses import Response
+from .config import settings
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, until the response body is sent",
+    ["method", "handler", "status"]
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being served", ["method"])
+HTTP_EVENT_STREAMS_OPEN = Gauge("http_event_streams_open", "Server-Sent Events responses currently streaming", ["handler"])
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed while serving one HTTP request", ["handler"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "SQL statement latency", ["engine"])
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connections checked out of the pool", ["engine"])
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool, including opening overflow connections",
+    ["engine"], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+S3_REQUEST_DURATION = Histogram("s3_request_duration_seconds", "S3 API call latency", ["operation", "status"])
+CELERY_TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Celery task run time", ["task", "state"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "LLM chat completion latency", ["model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+LLM_TOKENS = Counter("llm_tokens_total", "LLM tokens used", ["model", "kind"])
+LLM_RATE_LIMIT_WAIT = Histogram(
+    "llm_rate_limit_wait_seconds", "Time LLM calls waited for the shared rate limiter",
+    buckets=(0, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+# Statement counter for the current HTTP request, shared with threadpool and greenlet contexts
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+# Database
+
+class _TimedCheckoutMixin:
+    engine_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(self.engine_label).observe(time.perf_counter() - start)
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """QueuePool that records how long each checkout waits."""
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+_engines = {}
+
+def instrument_engine(engine, label: str) -> None:
+    """Count checkouts and time statements on a (sync) Engine; logs statements slower than SLOW_QUERY_SECONDS."""
+    _engines[label] = engine
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.labels(label).inc()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start"].pop()
+        DB_QUERY_DURATION.labels(label).observe(duration)
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+        if duration >= settings.SLOW_QUERY_SECONDS:
+            print(f"Slow query ({duration:.3f}s, {label}): {' '.join(statement.split())}")
+
+class _PoolCollector:
+    """Pool occupancy, read from the instrumented engines at scrape time."""
+    def describe(self):
+        return []
+
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections open beyond the pool size", labels=["engine"])
+        for label, engine in list(_engines.items()):
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                size.add_metric([label], pool.size())
+                checked_out.add_metric([label], pool.checkedout())
+                overflow.add_metric([label], max(pool.overflow(), 0))
+        yield size
+        yield checked_out
+        yield overflow
+
+REGISTRY.register(_PoolCollector())
+
+# S3
+
+def _s3_before_call(context, **kwargs):
+    context["metrics_start"] = time.perf_counter()
+
+def _s3_after_call(http_response, model, context, **kwargs):
+    S3_REQUEST_DURATION.labels(model.name, str(http_response.status_code)).observe(
+        time.perf_counter() - context["metrics_start"]
+    )
+
+def _s3_after_call_error(model, context, **kwargs):
+    # Connection errors and timeouts, where there is no HTTP response
+    S3_REQUEST_DURATION.labels(model.name, "error").observe(time.perf_counter() - context["metrics_start"])
+
+def instrument_s3_client(client) -> None:
+    events = client.meta.events
+    events.register("before-call.s3", _s3_before_call)
+    events.register("after-call.s3", _s3_after_call)
+    events.register("after-call-error.s3", _s3_after_call_error)
+
+# Celery
+
+class _CeleryQueueCollector:
+    """Broker queue lengths, read from Redis at scrape time."""
+    def __init__(self, queues: Iterable[str]):
+        self.queues = list(queues)
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from .redis import get_redis
+
+        depth = GaugeMetricFamily("celery_queue_length", "Messages waiting in the broker queue", labels=["queue"])
+        try:
+            client = get_redis()
+            for queue in self.queues:
+                depth.add_metric([queue], client.llen(queue))
+        except RedisError as e:
+            print(f"Warning: failed to read Celery queue length: {e}")
+        yield depth
+
+_queue_collector = None
+
+# HTTP
+
+def _handler_label(scope) -> str:
+    # The matched route's name (its endpoint function), never the raw path, so
+    # label cardinality stays bounded; known only once routing has happened
+    route = scope.get("route")
+    return getattr(route, "name", None) or "unmatched"
+
+def is_event_stream(message) -> bool:
+    """Whether an ``http.response.start`` message starts a Server-Sent Events stream."""
+    for key, value in message.get("headers", []):
+        if key.lower() == b"content-type":
+            return value.split(b";")[0].strip() == b"text/event-stream"
+    return False
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware, so streamed responses are timed until their last chunk.
+
+    Server-Sent Events streams stay open for as long as the client is
+    connected, so they are counted in http_event_streams_open instead of
+    the latency and in-progress metrics.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+        event_stream = []
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if is_event_stream(message):
+                    in_progress.dec()
+                    event_stream.append(HTTP_EVENT_STREAMS_OPEN.labels(_handler_label(scope)))
+                    event_stream[0].inc()
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if event_stream:
+                event_stream[0].dec()
+            else:
+                handler = _handler_label(scope)
+                HTTP_REQUEST_DURATION.labels(method, handler, str(status[0])).observe(time.perf_counter() - start)
+                DB_QUERIES_PER_REQUEST.labels(handler).observe(queries[0])
+                in_progress.dec()
+            _request_queries.reset(token)
+
+def metrics_endpoint() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+def instrument_app(app, celery_queues: Iterable[str] = ()) -> None:
+    """Add request metrics and a /metrics endpoint to a FastAPI app."""
+    global _queue_collector
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
+    if celery_queues and _queue_collector is None:
+        _queue_collector = _CeleryQueueCollector(celery_queues)
+        REGISTRY.register(_queue_collector)
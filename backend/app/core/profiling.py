@@ -0,0 +1,187 @@
+"""
+Opt-in cProfile profiling of single API requests and Celery tasks.
+
+A request is profiled when it carries ``X-Profile-Token`` equal to
+PROFILING_TOKEN, or at random with probability PROFILING_SAMPLE_RATE; tasks
+wrapped in ``profiled`` are sampled at the same rate. Profiles are pstats
+files stored under PROFILES_DIR or, with PROFILES_STORAGE=s3, in the
+documents bucket under ``profiles/``.
+
+At most one profile runs per process at a time; requests that would overlap
+run unprofiled. cProfile only sees the thread it was started on: a request
+profile covers the event loop (including other requests interleaved on it),
+not sync routes in the threadpool. Server-Sent Events streams are never
+profiled: they would hold the slot for as long as the client stays connected.
+"""
+import cProfile
+import hmac
+import marshal
+import os
+import random
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from starlette.concurrency import run_in_threadpool
+from .config import settings
+from .metrics import is_event_stream
+
+PROFILES_PREFIX = "profiles/"
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_NAME_PATTERN = re.compile(r"^[\w.-]+\.prof$")
+
+_active = threading.Lock()
+
+def token_authorized(token: Optional[str]) -> bool:
+    return bool(settings.PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, settings.PROFILING_TOKEN)
+
+def sampled() -> bool:
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+def profile_name(label: str) -> str:
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    slug = re.sub(r"[^\w-]+", "_", label).strip("_")[:80]
+    return f"{timestamp}-{slug}-{uuid.uuid4().hex[:8]}.prof"
+
+class Profiler:
+    """A cProfile run that holds the per-process profiling slot while active."""
+    def __init__(self):
+        self.profile = None
+
+    def start(self) -> bool:
+        """Start profiling, or return False if another profile is already running."""
+        if not _active.acquire(blocking=False):
+            return False
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        return True
+
+    def stop(self) -> bytes:
+        """Stop profiling and return the stats in pstats' file format."""
+        self.cancel()
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+    def cancel(self) -> None:
+        """Stop profiling and free the slot, discarding the stats."""
+        self.profile.disable()
+        _active.release()
+
+# Storage
+
+def store_profile(name: str, data: bytes) -> None:
+    if settings.PROFILES_STORAGE == "s3":
+        from .s3 import get_s3_client
+
+        get_s3_client().put_object(Bucket=settings.S3_BUCKET_NAME, Key=PROFILES_PREFIX + name, Body=data)
+        return
+    os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+    with open(os.path.join(settings.PROFILES_DIR, name), "wb") as f:
+        f.write(data)
+
+def list_profiles(limit: int = 100) -> List[Dict]:
+    """Stored profiles, newest first."""
+    if settings.PROFILES_STORAGE == "s3":
+        from .s3 import get_s3_client
+
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        profiles = [
+            {"name": obj["Key"][len(PROFILES_PREFIX):], "size": obj["Size"], "created_at": obj["LastModified"]}
+            for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME, Prefix=PROFILES_PREFIX)
+            for obj in page.get("Contents", [])
+        ]
+    else:
+        profiles = []
+        if os.path.isdir(settings.PROFILES_DIR):
+            for entry in os.scandir(settings.PROFILES_DIR):
+                if entry.is_file() and PROFILE_NAME_PATTERN.match(entry.name):
+                    stat = entry.stat()
+                    profiles.append({
+                        "name": entry.name,
+                        "size": stat.st_size,
+                        "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                    })
+    profiles.sort(key=lambda profile: profile["created_at"], reverse=True)
+    return profiles[:limit]
+
+def read_profile(name: str) -> Optional[bytes]:
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    if settings.PROFILES_STORAGE == "s3":
+        from botocore.exceptions import ClientError
+        from .s3 import get_s3_client
+
+        try:
+            return get_s3_client().get_object(Bucket=settings.S3_BUCKET_NAME, Key=PROFILES_PREFIX + name)["Body"].read()
+        except ClientError:
+            return None
+    path = os.path.join(settings.PROFILES_DIR, name)
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+# Hooks
+
+@contextmanager
+def profiled(label: str, force: bool = False):
+    """Profile the enclosed block when sampled (or forced), e.g. around a Celery task body."""
+    profiler = Profiler()
+    if not (force or sampled()) or not profiler.start():
+        yield
+        return
+    try:
+        yield
+    finally:
+        data = profiler.stop()
+        try:
+            store_profile(profile_name(label), data)
+        except Exception as e:
+            print(f"Warning: failed to store profile for {label}: {e}")
+
+class ProfilingMiddleware:
+    """Profile a request carrying a valid X-Profile-Token, or a random sample of requests."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (self._requested(scope) or sampled()):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = Profiler()
+        if not profiler.start():
+            await self.app(scope, receive, send)
+            return
+
+        name = profile_name(f"{scope['method']} {scope['path']}")
+        cancelled = []
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                if is_event_stream(message):
+                    profiler.cancel()
+                    cancelled.append(True)
+                else:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", name.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            if not cancelled:
+                data = profiler.stop()
+                try:
+                    await run_in_threadpool(store_profile, name, data)
+                except Exception as e:
+                    print(f"Warning: failed to store profile {name}: {e}")
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        header = PROFILE_HEADER.lower().encode()
+        for key, value in scope["headers"]:
+            if key == header:
+                return token_authorized(value.decode("latin-1"))
+        return False
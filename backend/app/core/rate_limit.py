@@ -0,0 +1,184 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional
+from redis.exceptions import RedisError
+from .config import settings
+from .metrics import LLM_RATE_LIMIT_WAIT
+from .redis import get_async_redis
+
+# A 429 multiplies the shared rate by this, down to MIN_RATE of the configured limits
+BACKOFF_FACTOR = 0.5
+MIN_RATE = 0.1
+# Pause after a 429 that didn't say how long to wait
+DEFAULT_RETRY_AFTER = 1.0
+
+def _limits() -> tuple:
+    """Requests and tokens per minute to aim for; 0 leaves that dimension unlimited."""
+    headroom = settings.LLM_RATE_LIMIT_HEADROOM
+    return settings.LLM_RATE_LIMIT_RPM * headroom, settings.LLM_RATE_LIMIT_TPM * headroom
+
+# The whole bucket update, atomic in Redis. Bucket state is a hash of requests,
+# tokens, rate, blocked_until and updated (epoch ms); a missing hash is a full
+# bucket. Each call first refills both buckets at the current rate, up to
+# LLM_RATE_LIMIT_BURST_SECONDS worth of each limit, and recovers the rate
+# linearly towards the full limits over LLM_RATE_LIMIT_RECOVERY_SECONDS. Then:
+#   take     one request and ARGV[2] tokens, or return the milliseconds until
+#            they will be there; a call needing more than a full bucket goes
+#            through once the bucket is full and leaves it in debt, so oversized
+#            calls are slowed, never stuck
+#   settle   charge ARGV[2] more tokens (a refund if negative)
+#   backoff  record a 429: pause every caller for ARGV[2] seconds, empty the
+#            buckets and cut the rate by BACKOFF_FACTOR, down to MIN_RATE; 429s
+#            from calls already in flight during the pause don't cut it again
+# Uses Redis's clock unless ARGV[9] gives ``now``. Returns the milliseconds to
+# wait as a string, since Lua numbers are truncated to integers on the way out.
+BUCKET_SCRIPT = """
+local op, amount = ARGV[1], tonumber(ARGV[2])
+local rpm, tpm = tonumber(ARGV[3]), tonumber(ARGV[4])
+local burst, recovery = tonumber(ARGV[5]) / 60, tonumber(ARGV[6]) * 1000
+local min_rate, factor = tonumber(ARGV[7]), tonumber(ARGV[8])
+local now = tonumber(ARGV[9])
+if not now then
+    local time = redis.call('TIME')
+    now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+end
+
+local stored = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'rate', 'blocked_until', 'updated')
+local requests, tokens, rate, blocked_until = rpm * burst, tpm * burst, 1, 0
+if stored[5] then
+    local elapsed = math.max(0, now - tonumber(stored[5]))
+    rate = tonumber(stored[3])
+    requests = math.min(rpm * burst, tonumber(stored[1]) + elapsed * rpm * rate / 60000)
+    tokens = math.min(tpm * burst, tonumber(stored[2]) + elapsed * tpm * rate / 60000)
+    rate = math.min(1, rate + elapsed / recovery)
+    blocked_until = tonumber(stored[4])
+end
+
+local wait = 0
+if op == 'take' then
+    if blocked_until > now then
+        wait = blocked_until - now
+    else
+        if rpm > 0 then
+            wait = math.max(wait, (math.min(1, rpm * burst) - requests) * 60000 / (rpm * rate))
+        end
+        if tpm > 0 then
+            wait = math.max(wait, (math.min(amount, tpm * burst) - tokens) * 60000 / (tpm * rate))
+        end
+        if wait <= 0 then
+            wait = 0
+            requests = requests - 1
+            tokens = tokens - amount
+        end
+    end
+elseif op == 'settle' then
+    tokens = tokens - amount
+elseif op == 'backoff' then
+    if blocked_until <= now then
+        rate = math.max(min_rate, rate * factor)
+    end
+    blocked_until = math.max(blocked_until, now + amount * 1000)
+    requests = math.min(requests, 0)
+    tokens = math.min(tokens, 0)
+end
+
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', tokens, 'rate', rate,
+    'blocked_until', blocked_until, 'updated', now)
+-- Idle longer than this and a fresh state is the same as a refilled one
+redis.call('PEXPIRE', KEYS[1], math.ceil(math.max(0, blocked_until - now) + recovery + 60000))
+return tostring(wait)
+"""
+
+class TokenBucketLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every
+    worker process through one Redis hash.
+
+    Every update is a single EVALSHA of BUCKET_SCRIPT, which refills the
+    buckets on Redis's clock and applies the change atomically, so concurrent
+    workers never spend the same tokens and contention costs no retries.
+    Buckets refill at LLM_RATE_LIMIT_HEADROOM of the configured limits, times
+    an adaptive rate that 429 responses cut and that recovers over time.
+    Token counts are estimated up front and settled against the usage the
+    response reports. If Redis is unavailable, calls are not limited.
+    """
+    def __init__(self, name: str, clock: Optional[Callable[[], float]] = None, sleep: Optional[Callable[[float], Awaitable]] = None):
+        self.key = f"ratelimit:{name}"
+        # Epoch seconds to refill by; None uses Redis's clock, shared by every worker
+        self.clock = clock
+        self.sleep = sleep or asyncio.sleep
+        self._async_redis = None
+        self._script = None
+
+    @property
+    def async_redis(self):
+        return self._async_redis or get_async_redis()
+
+    @async_redis.setter
+    def async_redis(self, client):
+        self._async_redis = client
+        self._script = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.LLM_RATE_LIMIT_RPM > 0 or settings.LLM_RATE_LIMIT_TPM > 0
+
+    async def _run(self, op: str, amount: float, now: Optional[float] = None) -> float:
+        """Run BUCKET_SCRIPT; ``now`` (epoch ms) overrides the limiter's clock."""
+        if self._script is None:
+            # EVALSHA, loading the script on the first NOSCRIPT
+            self._script = self.async_redis.register_script(BUCKET_SCRIPT)
+        if now is None and self.clock is not None:
+            now = self.clock() * 1000
+        rpm, tpm = _limits()
+        result = await self._script(keys=[self.key], args=[
+            op, amount, rpm, tpm, settings.LLM_RATE_LIMIT_BURST_SECONDS,
+            settings.LLM_RATE_LIMIT_RECOVERY_SECONDS, MIN_RATE, BACKOFF_FACTOR, "" if now is None else now,
+        ])
+        return float(result)
+
+    async def acquire(self, tokens: float) -> float:
+        """Wait until one request and ``tokens`` tokens are available; returns the seconds waited."""
+        if not self.enabled:
+            return 0.0
+        waited = 0.0
+        while True:
+            try:
+                wait_ms = await self._run("take", tokens)
+            except RedisError as e:
+                print(f"Warning: LLM rate limiter unavailable, not limiting: {e}")
+                break
+            if wait_ms <= 0:
+                break
+            # Jitter, so callers woken together don't retry in lockstep
+            delay = wait_ms / 1000 * (1 + random.random() * 0.1)
+            await self.sleep(delay)
+            waited += delay
+        LLM_RATE_LIMIT_WAIT.observe(waited)
+        return waited
+
+    async def settle(self, tokens: float) -> None:
+        """Charge ``tokens`` more (or refund, if negative) once actual usage is known."""
+        if not self.enabled or not tokens:
+            return
+        try:
+            await self._run("settle", tokens)
+        except RedisError as e:
+            print(f"Warning: LLM rate limiter unavailable, usage not recorded: {e}")
+
+    async def back_off(self, retry_after: Optional[float] = None) -> bool:
+        """
+        Record a 429 response; see BUCKET_SCRIPT. Returns False if it
+        couldn't be shared (disabled or Redis unavailable), in which case the
+        caller has to wait on its own.
+        """
+        if not self.enabled:
+            return False
+        try:
+            await self._run("backoff", retry_after if retry_after is not None else DEFAULT_RETRY_AFTER)
+        except RedisError as e:
+            print(f"Warning: LLM rate limiter unavailable, 429 not recorded: {e}")
+            return False
+        return True
+
+llm_rate_limiter = TokenBucketLimiter("llm")
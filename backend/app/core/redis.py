@@ -0,0 +1,34 @@
+import threading
+import redis
+from .config import settings
+
+_redis = None
+_lock = threading.Lock()
+
+def get_redis() -> redis.Redis:
+    """Process-wide Redis client; redis-py clients are thread-safe and pool connections."""
+    global _redis
+    if _redis is None:
+        with _lock:
+            if _redis is None:
+                _redis = redis.Redis.from_url(
+                    settings.redis_url,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                )
+    return _redis
+
+_async_redis = None
+
+def get_async_redis():
+    """Process-wide asyncio Redis client for API routes; its connections belong to the server's event loop."""
+    global _async_redis
+    if _async_redis is None:
+        import redis.asyncio
+
+        _async_redis = redis.asyncio.Redis.from_url(
+            settings.redis_url,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _async_redis
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from .config import settings
+from .metrics import instrument_s3_client
+
+_s3_client = None
+_s3_executor = None
+_lock = threading.Lock()
+
+def create_s3_client():
+    # Imported here: boto3 is slow to import, and the API builds its client in the lifespan hook
+    import boto3
+    from botocore.config import Config
+
+    # A dedicated session: the default boto3 session is not thread-safe
+    session = boto3.session.Session()
+    client = session.client(
+        's3',
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        region_name=settings.AWS_DEFAULT_REGION,
+        config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS),
+    )
+    instrument_s3_client(client)
+    return client
+
+# Dependency
+def get_s3_client():
+    """Return the process-wide S3 client. Clients are thread-safe and keep their connection pool."""
+    global _s3_client
+    if _s3_client is None:
+        with _lock:
+            if _s3_client is None:
+                _s3_client = create_s3_client()
+    return _s3_client
+
+def get_s3_executor() -> ThreadPoolExecutor:
+    global _s3_executor
+    if _s3_executor is None:
+        with _lock:
+            if _s3_executor is None:
+                _s3_executor = ThreadPoolExecutor(
+                    max_workers=settings.S3_EXECUTOR_WORKERS,
+                    thread_name_prefix="s3"
+                )
+    return _s3_executor
+
+async def run_s3(func, *args, **kwargs):
+    """Run a blocking S3 call in the bounded S3 executor so it doesn't block the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_s3_executor(), partial(func, *args, **kwargs))
+
+def close_s3():
+    global _s3_client, _s3_executor
+    with _lock:
+        if _s3_executor is not None:
+            _s3_executor.shutdown(wait=False)
+            _s3_executor = None
+        if _s3_client is not None:
+            _s3_client.close()
+            _s3_client = None
@@ -0,0 +1,23 @@
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+# Same output as Pydantic's JSON mode for the types we return: UTC datetimes
+# end in "Z", naive ones carry no offset
+_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(value) -> bytes:
+    """Serialize plain rows to JSON bytes; unknown types go through jsonable_encoder."""
+    return orjson.dumps(value, default=jsonable_encoder, option=_OPTIONS)
+
+class FastJSONResponse(Response):
+    """
+    JSON response for pre-shaped rows (dicts of column values).
+
+    Returning one from a route skips response_model validation, so callers are
+    responsible for producing exactly the documented shape.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
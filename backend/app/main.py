@@ -1,7 +1,55 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.database import dispose_async_engine
+from app.core.metrics import instrument_app
+from app.core.profiling import ProfilingMiddleware
+from app.core.s3 import get_s3_client, get_s3_executor, close_s3
+from app.services.projection import close_projection_pool
 
-app = FastAPI(title="Wealth Manager API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared S3 client and executor once per process, before the first request
+    get_s3_client()
+    get_s3_executor()
+    yield
+    close_s3()
+    close_projection_pool()
+    await dispose_async_engine()
 
-app.include_router(api_router, prefix="/api/v1") 
\ No newline at end of file
+def create_app() -> FastAPI:
+    """Build the API application; run with ``uvicorn app.main:app``."""
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        description="API for wealth management and document handling",
+        version=settings.VERSION,
+        # Disable automatic redirect for trailing slashes
+        redirect_slashes=False,
+        lifespan=lifespan
+    )
+
+    # CORS middleware configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins
+        allow_credentials=False,
+        allow_methods=["*"],  # Allow all methods
+        allow_headers=["*"],  # Allow all headers
+        expose_headers=["*"],
+        max_age=3600,  # Cache preflight requests for 1 hour
+    )
+
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+    app.add_middleware(ProfilingMiddleware)
+    instrument_app(app, celery_queues=[settings.CELERY_TASK_DEFAULT_QUEUE])
+
+    # Health check endpoint
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    return app
+
+app = create_app()
@@ -1,16 +1,42 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Index, JSON, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.core.database import Base
 
+# JSONB on PostgreSQL, plain JSON elsewhere (tests run on SQLite)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class NetWorthEntry(Base):
     __tablename__ = "net_worth_entries"
 
     id = Column(Integer, primary_key=True, index=True)
     value = Column(Float, nullable=False)
     date = Column(DateTime(timezone=True), nullable=False)
+    # Document whose analysis reported this entry, so reanalysis replaces it; null for manual and imported entries
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
 
+class NetWorthRollup(Base):
+    """Per-bucket aggregate of net_worth_entries, maintained incrementally on insert."""
+    __tablename__ = "net_worth_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String, nullable=False)  # day, week, month
+    bucket_start = Column(Date, nullable=False)
+    open_value = Column(Float, nullable=False)
+    open_at = Column(DateTime(timezone=True), nullable=False)
+    close_value = Column(Float, nullable=False)
+    close_at = Column(DateTime(timezone=True), nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    entry_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", name="uq_net_worth_rollups_granularity_bucket"),
+    )
+
 class Document(Base):
     __tablename__ = "documents"
 
@@ -19,7 +45,70 @@ class Document(Base):
     type = Column(String)
     size = Column(Integer)
     s3_key = Column(String, unique=True, nullable=False)
+    content_sha256 = Column(String(64), index=True, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
     analysis_status = Column(String, default="pending")  # pending, completed, failed
-    analysis_result = Column(Text, nullable=True) 
\ No newline at end of file
+    analysis_result = Column(JSONType, nullable=True)
+
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), optionally narrowed by status or type
+        Index("ix_documents_created_at_id", "created_at", "id"),
+        Index("ix_documents_status_created_at_id", "analysis_status", "created_at", "id"),
+        Index("ix_documents_type_created_at_id", "type", "created_at", "id"),
+        # Containment and key queries on the raw analysis (@>, ?)
+        Index("ix_documents_analysis_result", "analysis_result", postgresql_using="gin"),
+    )
+
+class DocumentAsset(Base):
+    """Asset line item extracted from a document's analysis, dated by the document's valuation date."""
+    __tablename__ = "document_assets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    type = Column(String, nullable=False)
+    value = Column(Float, nullable=True)
+    description = Column(Text, nullable=True)
+    date = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        Index("ix_document_assets_type_date", "type", "date"),
+    )
+
+class DocumentLiability(Base):
+    """Liability line item extracted from a document's analysis, dated by the document's valuation date."""
+    __tablename__ = "document_liabilities"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    type = Column(String, nullable=False)
+    value = Column(Float, nullable=True)
+    description = Column(Text, nullable=True)
+    date = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    __table_args__ = (
+        Index("ix_document_liabilities_type_date", "type", "date"),
+    )
+
+class AnalysisCacheEntry(Base):
+    """Analysis result keyed by document content hash and analyzer (model + prompt) version."""
+    __tablename__ = "analysis_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_sha256 = Column(String(64), nullable=False)
+    analyzer_version = Column(String, nullable=False)
+    result = Column(Text, nullable=False)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("content_sha256", "analyzer_version", name="uq_analysis_cache_hash_version"),
+    )
+
+class AnalysisCacheCounter(Base):
+    """Global hit/miss counters for the analysis cache."""
+    __tablename__ = "analysis_cache_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
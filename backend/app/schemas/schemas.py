@@ -1,13 +1,15 @@
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 
 class NetWorthEntryBase(BaseModel):
     value: float
     date: datetime
 
 class NetWorthEntryCreate(NetWorthEntryBase):
-    pass
+    class Config:
+        # "nan" and "inf" parse as floats, but would poison every rollup and analytic
+        allow_inf_nan = False
 
 class NetWorthEntry(NetWorthEntryBase):
     id: int
@@ -17,6 +19,75 @@ class NetWorthEntry(NetWorthEntryBase):
     class Config:
         from_attributes = True
 
+class NetWorthImportError(BaseModel):
+    row: int
+    error: str
+
+class NetWorthImportResult(BaseModel):
+    inserted: int
+    errors: List[NetWorthImportError]
+
+class NetWorthRollup(BaseModel):
+    bucket_start: date
+    open: float
+    close: float
+    min: float
+    max: float
+    average: float
+    count: int
+
+class SeriesPoint(BaseModel):
+    date: datetime
+    value: Optional[float] = None
+
+class Drawdown(BaseModel):
+    depth: float
+    peak_date: datetime
+    trough_date: datetime
+    recovery_date: Optional[datetime] = None
+    duration_days: float
+
+class NetWorthAnalytics(BaseModel):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    period: str
+    window: int
+    points: int
+    start_value: Optional[float] = None
+    end_value: Optional[float] = None
+    total_return: Optional[float] = None
+    cagr: Optional[float] = None
+    volatility: Optional[float] = None
+    max_drawdown: Optional[Drawdown] = None
+    best_period: Optional[SeriesPoint] = None
+    worst_period: Optional[SeriesPoint] = None
+    returns: List[SeriesPoint]
+    rolling_volatility: List[SeriesPoint]
+
+class ProjectionCalibration(BaseModel):
+    trend: float
+    volatility: float
+    seasonality: List[float]
+    shock_probability: float
+    months: int
+
+class ProjectionBand(BaseModel):
+    date: datetime
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+class NetWorthProjection(BaseModel):
+    start_date: datetime
+    start_value: float
+    months: int
+    paths: int
+    seed: int
+    calibration: ProjectionCalibration
+    bands: List[ProjectionBand]
+
 class DocumentBase(BaseModel):
     name: str
     type: str
@@ -31,10 +102,44 @@ class Document(DocumentBase):
     type: str
     size: int
     s3_key: str
+    content_sha256: Optional[str] = None
     url: Optional[str] = None
     created_at: datetime
     analysis_status: str
-    analysis_result: Optional[str] = None
+    analysis_result: Optional[Dict[str, Any]] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class DocumentSelection(BaseModel):
+    """Documents for a bulk operation: explicit ids, filters, or both (intersected)."""
+    ids: Optional[List[int]] = None
+    analysis_status: Optional[str] = None
+    type: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class BulkFailure(BaseModel):
+    id: int
+    error: str
+
+class BulkOperationResult(BaseModel):
+    succeeded: List[int]
+    failed: List[BulkFailure]
+
+class AllocationBucket(BaseModel):
+    type: str
+    total: float
+    count: int
+    share: float
+
+class AnalysisCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    entries: int
+
+class ProfileInfo(BaseModel):
+    name: str
+    size: int
+    created_at: datetime
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.services.analysis_results import LINE_ITEM_MODELS
+
+def get_allocation(db: Session, kind: str = "assets", start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """
+    Total value and line item count per asset or liability type, largest first.
+
+    Aggregated in SQL over the line item tables; start and end filter on the
+    document's valuation date (start inclusive, end exclusive).
+    """
+    model = LINE_ITEM_MODELS[kind]
+    total = func.coalesce(func.sum(model.value), 0.0)
+    query = db.query(model.type, total.label("total"), func.count(model.id).label("count"))
+    if start:
+        query = query.filter(model.date >= start)
+    if end:
+        query = query.filter(model.date < end)
+    rows = query.group_by(model.type).order_by(total.desc(), model.type.asc()).all()
+
+    grand_total = sum(row.total for row in rows)
+    return [
+        {
+            "type": row.type,
+            "total": row.total,
+            "count": row.count,
+            "share": row.total / grand_total if grand_total else 0.0,
+        }
+        for row in rows
+    ]
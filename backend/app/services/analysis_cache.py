@@ -0,0 +1,92 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import upsert
+from app.models.models import AnalysisCacheCounter, AnalysisCacheEntry
+from app.services.document_analyzer import PROMPT_VERSION
+
+def analyzer_version() -> str:
+    return f"{settings.OPENAI_MODEL}:{PROMPT_VERSION}"
+
+def _increment_counter(db: Session, name: str) -> None:
+    # Every upload and analysis bumps a counter; a random shard ("hits:3") keeps
+    # them from queueing on one row. cache_stats adds the shards back up.
+    shard = random.randrange(max(settings.ANALYSIS_CACHE_COUNTER_SHARDS, 1))
+    stmt = upsert(db, AnalysisCacheCounter).values(name=f"{name}:{shard}", value=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AnalysisCacheCounter.name],
+        set_={"value": AnalysisCacheCounter.value + 1}
+    )
+    db.execute(stmt)
+
+def get_cached_analysis(db: Session, content_sha256: str, count_miss: bool = True) -> Optional[Dict]:
+    """
+    Look up a stored analysis for this content and analyzer version, counting the hit or miss.
+
+    Entries older than ANALYSIS_CACHE_TTL_DAYS are treated as misses. The worker
+    re-checks the cache after an upload-time miss, so it passes count_miss=False
+    to avoid counting the same document twice. Does not commit.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.ANALYSIS_CACHE_TTL_DAYS)
+    entry = db.query(AnalysisCacheEntry).filter(
+        AnalysisCacheEntry.content_sha256 == content_sha256,
+        AnalysisCacheEntry.analyzer_version == analyzer_version(),
+        AnalysisCacheEntry.created_at >= cutoff
+    ).first()
+
+    if entry is None:
+        if count_miss:
+            _increment_counter(db, "misses")
+        return None
+
+    entry.hit_count = AnalysisCacheEntry.hit_count + 1
+    entry.last_used_at = func.now()
+    _increment_counter(db, "hits")
+    return json.loads(entry.result)
+
+def store_analysis(db: Session, content_sha256: str, analysis_result: Dict) -> None:
+    """
+    Cache an analysis result. One store in ANALYSIS_CACHE_EVICT_EVERY also
+    evicts expired and least recently used entries, so the ordered scan over
+    the whole cache doesn't run on every analysis. Does not commit.
+    """
+    stmt = upsert(db, AnalysisCacheEntry).values(
+        content_sha256=content_sha256,
+        analyzer_version=analyzer_version(),
+        result=json.dumps(analysis_result, default=str),
+        hit_count=0
+    ).on_conflict_do_nothing(
+        index_elements=[AnalysisCacheEntry.content_sha256, AnalysisCacheEntry.analyzer_version]
+    )
+    db.execute(stmt)
+    if random.random() * settings.ANALYSIS_CACHE_EVICT_EVERY < 1:
+        evict(db)
+
+def evict(db: Session) -> None:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.ANALYSIS_CACHE_TTL_DAYS)
+    db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+
+    # Keep at most ANALYSIS_CACHE_MAX_ENTRIES, dropping the least recently used
+    overflow = db.query(AnalysisCacheEntry.id).order_by(
+        AnalysisCacheEntry.last_used_at.desc(), AnalysisCacheEntry.id.desc()
+    ).offset(settings.ANALYSIS_CACHE_MAX_ENTRIES).subquery()
+    db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.id.in_(db.query(overflow.c.id))).delete(synchronize_session=False)
+
+def cache_stats(db: Session) -> Dict:
+    counters = {}
+    for name, value in db.query(AnalysisCacheCounter.name, AnalysisCacheCounter.value):
+        # Shards are "hits:<n>"; rows written before sharding are plain "hits"
+        name = name.split(":", 1)[0]
+        counters[name] = counters.get(name, 0) + value
+    hits = counters.get("hits", 0)
+    misses = counters.get("misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "entries": db.query(func.count(AnalysisCacheEntry.id)).scalar(),
+    }
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+from app.models.models import Document, DocumentAsset, DocumentLiability, NetWorthEntry
+from app.services.rollups import apply_to_rollups, refresh_rollups
+
+LINE_ITEM_MODELS = {"assets": DocumentAsset, "liabilities": DocumentLiability}
+
+def _line_item_rows(document_id: int, items, value_date: Optional[datetime]) -> List[Dict]:
+    rows = []
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        value = item.get("value")
+        try:
+            value = float(value) if value is not None else None
+        except (TypeError, ValueError):
+            value = None
+        rows.append({
+            "document_id": document_id,
+            "type": item.get("type") or "Unknown",
+            "value": value,
+            "description": item.get("description"),
+            "date": value_date,
+        })
+    return rows
+
+def replace_line_items(db: Session, document: Document, analysis_result: Dict, value_date: Optional[datetime]) -> None:
+    """Rewrite a document's asset and liability rows from its analysis. Does not commit."""
+    if document.id is None:
+        # New document in this transaction: flush to get its id
+        db.flush()
+    for key, model in LINE_ITEM_MODELS.items():
+        db.execute(delete(model).where(model.document_id == document.id))
+        rows = _line_item_rows(document.id, analysis_result.get(key), value_date)
+        if rows:
+            db.execute(insert(model), rows)
+
+def record_analysis_result(db: Session, document: Document, analysis_result: Dict) -> bool:
+    """
+    Mark a document as analyzed, write its line items and record the net
+    worth entry it reports, if any, replacing the one an earlier analysis of
+    the same document added. A truncated analysis records no entry, since its
+    total only covers part of the document.
+
+    Shared by the analysis task and cache hits at upload time. Does not commit.
+    Returns whether net worth entries changed, so callers can invalidate
+    cached net worth responses after committing.
+    """
+    document.analysis_status = "completed"
+    document.analysis_result = jsonable_encoder(analysis_result)
+
+    value = analysis_result.get("total_value")
+    value_date = analysis_result.get("date")
+    if isinstance(value_date, str):
+        # Results loaded back from JSON carry the date as a string
+        value_date = datetime.fromisoformat(value_date)
+
+    replace_line_items(db, document, analysis_result, value_date)
+
+    previous = db.query(NetWorthEntry).filter(NetWorthEntry.document_id == document.id).all()
+    for entry in previous:
+        db.delete(entry)
+
+    net_worth_entry = None
+    if value and value_date and not analysis_result.get("truncated"):
+        net_worth_entry = NetWorthEntry(value=value, date=value_date, document_id=document.id)
+        db.add(net_worth_entry)
+
+    if previous:
+        # The replaced entries' buckets can't be updated incrementally
+        db.flush()
+        refresh_rollups(db, [entry.date for entry in previous] + ([value_date] if net_worth_entry else []))
+    elif net_worth_entry:
+        apply_to_rollups(db, [(net_worth_entry.date, net_worth_entry.value)])
+    return bool(previous) or net_worth_entry is not None
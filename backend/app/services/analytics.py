@@ -0,0 +1,142 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+PERIODS_PER_YEAR = {"day": 365.0, "week": 52.0, "month": 12.0}
+DEFAULT_WINDOWS = {"day": 30, "week": 13, "month": 12}
+SECONDS_PER_DAY = 86400.0
+SECONDS_PER_YEAR = 365.25 * SECONDS_PER_DAY
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def _datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(float(timestamp), tz=timezone.utc)
+
+def series_arrays(rows: Sequence) -> tuple:
+    """(date, value) rows, oldest first, as contiguous float64 arrays of UTC epoch seconds and values."""
+    timestamps = np.fromiter(
+        # Naive datetimes are UTC, as for the rollups
+        ((row.date if row.date.tzinfo else row.date.replace(tzinfo=timezone.utc)).timestamp() for row in rows),
+        dtype=np.float64, count=len(rows)
+    )
+    values = np.fromiter((row.value for row in rows), dtype=np.float64, count=len(rows))
+    return timestamps, values
+
+def period_close_indices(timestamps: np.ndarray, period: str) -> np.ndarray:
+    """Index of the last point in every day, week (Monday start) or month, in UTC."""
+    days = np.floor(timestamps / SECONDS_PER_DAY).astype(np.int64)
+    if period == "day":
+        keys = days
+    elif period == "week":
+        # 1970-01-01 was a Thursday
+        keys = (days + 3) // 7
+    elif period == "month":
+        keys = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return np.flatnonzero(np.append(keys[1:] != keys[:-1], True))
+
+def period_returns(closes: np.ndarray) -> np.ndarray:
+    """Simple return of each period over the previous one; NaN where the previous close is zero."""
+    previous = closes[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous != 0, closes[1:] / previous - 1, np.nan)
+
+def rolling_volatility(returns: np.ndarray, window: int, periods_per_year: float) -> np.ndarray:
+    """Annualized standard deviation of returns over each trailing window."""
+    if window < 2 or len(returns) < window:
+        return np.empty(0)
+    return sliding_window_view(returns, window).std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+
+def max_drawdown(timestamps: np.ndarray, values: np.ndarray) -> Optional[Dict]:
+    """
+    Deepest peak-to-trough decline, with the peak, trough and recovery dates.
+
+    Duration runs from the peak to the recovery, or to the last point if the
+    series hasn't recovered. None if the series never declines.
+    """
+    if len(values) < 2:
+        return None
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = np.where(peaks > 0, values / peaks - 1, 0.0)
+    trough = int(np.argmin(drawdowns))
+    if drawdowns[trough] >= 0:
+        return None
+
+    peak = int(np.flatnonzero(values[:trough + 1] == peaks[trough])[-1])
+    recovered = np.flatnonzero(values[trough:] >= peaks[trough])
+    recovery = trough + int(recovered[0]) if len(recovered) else None
+    end = recovery if recovery is not None else len(values) - 1
+    return {
+        "depth": float(drawdowns[trough]),
+        "peak_date": _datetime(timestamps[peak]),
+        "trough_date": _datetime(timestamps[trough]),
+        "recovery_date": _datetime(timestamps[recovery]) if recovery is not None else None,
+        "duration_days": float((timestamps[end] - timestamps[peak]) / SECONDS_PER_DAY),
+    }
+
+def cagr(timestamps: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """Compound annual growth rate between the first and last points."""
+    if len(values) < 2:
+        return None
+    years = (timestamps[-1] - timestamps[0]) / SECONDS_PER_YEAR
+    if years <= 0 or values[0] <= 0 or values[-1] <= 0:
+        return None
+    return _finite((values[-1] / values[0]) ** (1 / years) - 1)
+
+def _points(timestamps: np.ndarray, values: np.ndarray) -> List[Dict]:
+    return [{"date": _datetime(t), "value": _finite(v)} for t, v in zip(timestamps.tolist(), values.tolist())]
+
+def compute_analytics(timestamps: np.ndarray, values: np.ndarray, period: str = "month", window: Optional[int] = None) -> Dict:
+    """
+    Portfolio analytics over a sorted series of (epoch seconds, value) points.
+
+    Returns are taken between period closes (the last point in each period) and
+    dated by the close; volatility is annualized. Drawdown and CAGR use every point.
+    """
+    window = window or DEFAULT_WINDOWS[period]
+    periods_per_year = PERIODS_PER_YEAR[period]
+
+    closes_at = period_close_indices(timestamps, period) if len(values) else np.empty(0, dtype=np.int64)
+    close_timestamps = timestamps[closes_at]
+    returns = period_returns(values[closes_at]) if len(closes_at) > 1 else np.empty(0)
+    return_timestamps = close_timestamps[1:]
+    finite = np.isfinite(returns)
+
+    volatility = None
+    if finite.sum() >= 2:
+        volatility = _finite(np.std(returns[finite], ddof=1) * np.sqrt(periods_per_year))
+
+    best = worst = None
+    if finite.any():
+        masked = np.where(finite, returns, np.nan)
+        best_at, worst_at = int(np.nanargmax(masked)), int(np.nanargmin(masked))
+        best = {"date": _datetime(return_timestamps[best_at]), "value": float(returns[best_at])}
+        worst = {"date": _datetime(return_timestamps[worst_at]), "value": float(returns[worst_at])}
+
+    total_return = None
+    if len(values) >= 2 and values[0] != 0:
+        total_return = _finite(values[-1] / values[0] - 1)
+
+    rolling = rolling_volatility(returns, window, periods_per_year)
+    return {
+        "start": _datetime(timestamps[0]) if len(values) else None,
+        "end": _datetime(timestamps[-1]) if len(values) else None,
+        "period": period,
+        "window": window,
+        "points": int(len(values)),
+        "start_value": float(values[0]) if len(values) else None,
+        "end_value": float(values[-1]) if len(values) else None,
+        "total_return": total_return,
+        "cagr": cagr(timestamps, values),
+        "volatility": volatility,
+        "max_drawdown": max_drawdown(timestamps, values),
+        "best_period": best,
+        "worst_period": worst,
+        "returns": _points(return_timestamps, returns),
+        "rolling_volatility": _points(return_timestamps[window - 1:], rolling),
+    }
@@ -1,95 +1,287 @@
-from typing import Dict, Optional, List
-import openai
+from typing import TYPE_CHECKING, Dict, Optional, List
+import asyncio
 import json
+import random
+import re
+import time
 from datetime import datetime
 from app.core.config import settings
+from app.core.metrics import LLM_REQUEST_DURATION, LLM_TOKENS
+from app.core.rate_limit import TokenBucketLimiter, llm_rate_limiter
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Bump whenever the prompt or result post-processing changes, so cached
+# analyses produced by the old prompt are not reused
+PROMPT_VERSION = "2"
+
+# Rough size of a token, to reserve rate limit tokens before the response reports usage
+CHARS_PER_TOKEN = 4
+# Backoff between retries of server and connection errors
+RETRY_INITIAL_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+SYSTEM_PROMPT = "You are a financial document analyzer. Extract and structure financial data in JSON format. Be precise with numerical values and dates."
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars, breaking on page boundaries
+    (form feeds) first, then blank-line separated sections, then lines.
+    """
+    units = []
+    for page in text.split("\f"):
+        for section in re.split(r"\n\s*\n", page):
+            section = section.strip()
+            if not section:
+                continue
+            if len(section) <= max_chars:
+                units.append(section)
+                continue
+            # Oversized section: fall back to line breaks, then hard splits
+            for line in section.splitlines():
+                while len(line) > max_chars:
+                    units.append(line[:max_chars])
+                    line = line[max_chars:]
+                if line.strip():
+                    units.append(line)
+
+    # Greedily pack consecutive units into chunks
+    chunks = []
+    current = ""
+    for unit in units:
+        if current and len(current) + 2 + len(unit) > max_chars:
+            chunks.append(current)
+            current = unit
+        else:
+            current = f"{current}\n\n{unit}" if current else unit
+    if current:
+        chunks.append(current)
+    return chunks
+
+def merge_partial_analyses(partials: List[Dict]) -> Dict:
+    """
+    Reduce per-chunk analyses into one, in chunk order so the result is deterministic.
+
+    Line items are concatenated (chunks don't overlap, so an item repeated
+    across chunks is a separate holding); totals are recomputed from the line
+    items when there are any, and the latest valuation date wins.
+    """
+    if len(partials) == 1:
+        return partials[0]
+
+    assets = [item for partial in partials for item in partial.get("assets") or []]
+    liabilities = [item for partial in partials for item in partial.get("liabilities") or []]
+
+    if assets:
+        total_assets = sum(float(item.get("value") or 0) for item in assets)
+    else:
+        total_assets = sum(float(partial.get("total_assets") or 0) for partial in partials)
+    total_liabilities = sum(float(item.get("value") or 0) for item in liabilities)
+
+    dates = sorted(partial["valuation_date"] for partial in partials if partial.get("valuation_date"))
+    return {
+        "total_assets": total_assets,
+        "valuation_date": dates[-1] if dates else None,
+        "assets": assets,
+        "liabilities": liabilities,
+        "net_worth": total_assets - total_liabilities,
+    }
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    """Tokens a chat completion is expected to use: the prompt, plus LLM_COMPLETION_TOKENS_ESTIMATE."""
+    return sum(len(message["content"]) for message in messages) // CHARS_PER_TOKEN + settings.LLM_COMPLETION_TOKENS_ESTIMATE
+
+def _retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    from openai import APIConnectionError  # also covers timeouts
+
+    return isinstance(error, APIConnectionError)
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from the Retry-After headers of an API error."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 1000), ("retry-after", 1)):
+        try:
+            return min(float(headers[header]) / scale, 60.0)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+def _retry_delay(attempt: int) -> float:
+    return min(RETRY_INITIAL_DELAY * 2 ** (attempt - 1), RETRY_MAX_DELAY) * (1 + random.random() * 0.25)
 
 class DocumentAnalyzer:
-    def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
+    """
+    Async LLM document analyzer. Create one per process and share it: the
+    underlying AsyncOpenAI client keeps a connection pool, but is bound to the
+    event loop it is first used on.
+    """
+    def __init__(self, client: Optional["AsyncOpenAI"] = None, rate_limiter: Optional[TokenBucketLimiter] = None):
+        if client is None:
+            # The SDK takes longer to import than the rest of the app; only workers need it
+            from openai import AsyncOpenAI
+
+            client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL or None,
+                timeout=settings.OPENAI_TIMEOUT,
+                # Retried in _create_completion, through the rate limiter
+                max_retries=0,
+            )
+        self.client = client
+        self.rate_limiter = rate_limiter or llm_rate_limiter
+        # Caps the chat completions in flight across all documents using this analyzer
+        self._calls: Optional[asyncio.Semaphore] = None
+        self.model = settings.OPENAI_MODEL
+
+    async def _create_completion(self, messages: List[Dict]):
+        """
+        Chat completion through the shared rate limiter. Rate limited (429),
+        server and connection errors are retried up to OPENAI_MAX_RETRIES
+        times; a 429 also slows down every worker, not just this call.
+        """
+        estimate = estimate_tokens(messages)
+        if self._calls is None:
+            # Created on first use, so it binds to the loop the analyzer runs on
+            self._calls = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+        attempt = 0
+        while True:
+            async with self._calls:
+                await self.rate_limiter.acquire(estimate)
+                start = time.perf_counter()
+                try:
+                    response = await self.client.chat.completions.create(model=self.model, messages=messages)
+                    error = None
+                except Exception as e:
+                    error = e
+            if error is not None:
+                status = getattr(error, "status_code", None)
+                LLM_REQUEST_DURATION.labels(self.model, "rate_limited" if status == 429 else "error").observe(time.perf_counter() - start)
+                if attempt >= settings.OPENAI_MAX_RETRIES or not _retryable(error):
+                    raise error
+                attempt += 1
+                retry_after = _retry_after(error)
+                # A shared pause applies to every worker and acquire waits it out;
+                # without one (no limiter, or Redis down) wait here
+                if not (status == 429 and await self.rate_limiter.back_off(retry_after)):
+                    await asyncio.sleep(retry_after if retry_after is not None else _retry_delay(attempt))
+                continue
+
+            LLM_REQUEST_DURATION.labels(self.model, "ok").observe(time.perf_counter() - start)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS.labels(self.model, "prompt").inc(usage.prompt_tokens or 0)
+                LLM_TOKENS.labels(self.model, "completion").inc(usage.completion_tokens or 0)
+                await self.rate_limiter.settle((usage.prompt_tokens or 0) + (usage.completion_tokens or 0) - estimate)
+            return response
+
+    async def _analyze_chunk(self, text_content: str) -> Optional[Dict]:
+        """Run the extraction prompt on one chunk and return the parsed JSON, or None."""
+        # Create analysis prompt with JSON structure
+        prompt = f"""
+        Analyze this financial document and extract the information in the following JSON structure:
+        {{
+            "total_assets": float,  # Total value of all assets
+            "valuation_date": "YYYY-MM-DD",  # Date of valuation
+            "assets": [
+                {{
+                    "type": str,  # Type of asset (e.g., "Real Estate", "Stocks", "Cash")
+                    "value": float,  # Value of this asset type
+                    "description": str  # Brief description
+                }}
+            ],
+            "liabilities": [
+                {{
+                    "type": str,  # Type of liability (e.g., "Mortgage", "Credit Card")
+                    "value": float,  # Value of this liability
+                    "description": str  # Brief description
+                }}
+            ],
+            "net_worth": float  # Total assets minus total liabilities
+        }}
+
+        Ensure all numerical values are formatted as plain numbers without currency symbols.
+        Format dates as YYYY-MM-DD.
+        If a field cannot be determined, use null.
+
+        Document content:
+        {text_content}
+        """
+
+        response = await self._create_completion([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ])
+
+        # Parse the response
+        analysis_text = response.choices[0].message.content
+
+        # Find JSON content (in case there's additional text)
+        json_start = analysis_text.find('{')
+        json_end = analysis_text.rfind('}') + 1
+        if json_start >= 0 and json_end > json_start:
+            return json.loads(analysis_text[json_start:json_end])
+        return None
 
     async def analyze_document(self, content: bytes, file_type: str) -> Optional[Dict]:
         """
         Analyze document content and extract financial information.
         Returns a dictionary containing structured financial data.
+
+        Long documents are split on page/section boundaries and the chunks are
+        analyzed concurrently (up to ANALYSIS_CHUNK_CONCURRENCY at a time), so
+        latency tracks the slowest chunk rather than the sum of all chunks.
+        Only the first ANALYSIS_MAX_CHUNKS chunks are analyzed; a longer
+        document's result is marked ``truncated``.
         """
         try:
             # Convert document content to text
             text_content = content.decode('utf-8')
+            chunks = split_into_chunks(text_content, settings.ANALYSIS_CHUNK_CHARS)
+            if not chunks:
+                return None
+            truncated = len(chunks) > settings.ANALYSIS_MAX_CHUNKS
+            if truncated:
+                print(f"Warning: document has {len(chunks)} chunks; analyzing the first {settings.ANALYSIS_MAX_CHUNKS}, totals are partial")
+                chunks = chunks[:settings.ANALYSIS_MAX_CHUNKS]
 
-            # Create analysis prompt with JSON structure
-            prompt = f"""
-            Analyze this financial document and extract the information in the following JSON structure:
-            {{
-                "total_assets": float,  # Total value of all assets
-                "valuation_date": "YYYY-MM-DD",  # Date of valuation
-                "assets": [
-                    {{
-                        "type": str,  # Type of asset (e.g., "Real Estate", "Stocks", "Cash")
-                        "value": float,  # Value of this asset type
-                        "description": str  # Brief description
-                    }}
-                ],
-                "liabilities": [
-                    {{
-                        "type": str,  # Type of liability (e.g., "Mortgage", "Credit Card")
-                        "value": float,  # Value of this liability
-                        "description": str  # Brief description
-                    }}
-                ],
-                "net_worth": float  # Total assets minus total liabilities
-            }}
-
-            Ensure all numerical values are formatted as plain numbers without currency symbols.
-            Format dates as YYYY-MM-DD.
-            If a field cannot be determined, use null.
-
-            Document content:
-            {text_content[:4000]}
-            """
-
-            # Call OpenAI API
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a financial document analyzer. Extract and structure financial data in JSON format. Be precise with numerical values and dates."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            semaphore = asyncio.Semaphore(settings.ANALYSIS_CHUNK_CONCURRENCY)
+
+            async def analyze_chunk(chunk: str) -> Optional[Dict]:
+                async with semaphore:
+                    return await self._analyze_chunk(chunk)
 
-            # Parse the response
-            analysis_text = response.choices[0].message.content
-
-            # Extract JSON from the response
-            try:
-                # Find JSON content (in case there's additional text)
-                json_start = analysis_text.find('{')
-                json_end = analysis_text.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_content = analysis_text[json_start:json_end]
-                    analysis_data = json.loads(json_content)
-
-                    # Validate and clean the data
-                    cleaned_data = {
-                        "total_value": float(analysis_data.get("total_assets", 0)),
-                        "date": datetime.strptime(
-                            analysis_data.get("valuation_date", datetime.now().strftime("%Y-%m-%d")),
-                            "%Y-%m-%d"
-                        ),
-                        "source_document": file_type,
-                        "raw_analysis": analysis_data,
-                        "assets": analysis_data.get("assets", []),
-                        "liabilities": analysis_data.get("liabilities", []),
-                        "net_worth": float(analysis_data.get("net_worth", 0))
-                    }
-                    return cleaned_data
-
-            except (json.JSONDecodeError, ValueError) as e:
-                print(f"Error parsing analysis response: {str(e)}")
+            # gather keeps chunk order, which keeps the reduce step deterministic
+            partials = await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks))
+            if any(partial is None for partial in partials):
+                print("Error analyzing document: a chunk returned no JSON")
                 return None
+            analysis_data = merge_partial_analyses(partials)
+
+            # Validate and clean the data
+            cleaned_data = {
+                "total_value": float(analysis_data.get("total_assets") or 0),
+                "date": datetime.strptime(
+                    analysis_data.get("valuation_date") or datetime.now().strftime("%Y-%m-%d"),
+                    "%Y-%m-%d"
+                ),
+                "source_document": file_type,
+                "raw_analysis": analysis_data,
+                "assets": analysis_data.get("assets") or [],
+                "liabilities": analysis_data.get("liabilities") or [],
+                "net_worth": float(analysis_data.get("net_worth") or 0),
+                # Chunks past ANALYSIS_MAX_CHUNKS were skipped, so the totals undercount
+                "truncated": truncated
+            }
+            return cleaned_data
+
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Error parsing analysis response: {str(e)}")
+            return None
 
         except Exception as e:
             print(f"Error analyzing document: {str(e)}")
             return None
-
-        return None 
\ No newline at end of file
@@ -0,0 +1,75 @@
+from typing import Optional
+import numpy as np
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the points to keep, in ascending order. ``x`` must be
+    sorted ascending. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points split into n_out - 2 buckets
+    every = (n - 2) / (n_out - 2)
+    edges = np.floor(np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average of the following bucket for every bucket, from cumulative sums;
+    # the last bucket looks ahead to the final point
+    cum_x = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y, dtype=np.float64)))
+    next_starts = np.append(starts[1:], n - 1)
+    next_ends = np.append(ends[1:], n)
+    counts = next_ends - next_starts
+    avg_x = (cum_x[next_ends] - cum_x[next_starts]) / counts
+    avg_y = (cum_y[next_ends] - cum_y[next_starts]) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    # Each choice depends on the previous one, so only the bucket loop stays in Python
+    for i in range(n_out - 2):
+        start, end = starts[i], ends[i]
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[a] - avg_x[i]) * (by - y[a]) - (x[a] - bx) * (avg_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max bucketing: keep the lowest and highest point of each bucket.
+
+    Fully vectorized. Returns at most ``n_out`` indices in ascending order,
+    always including the first and last points. Below four points there is no
+    room for a min/max pair besides the endpoints, so LTTB picks them instead.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        return lttb_indices(x, y, n_out)
+
+    n_buckets = (n_out - 2) // 2
+    bucket = np.arange(n) * n_buckets // n
+    # Sort by bucket, then value: the first and last entry of each bucket are its min and max
+    order = np.lexsort((y, bucket))
+    boundaries = np.flatnonzero(np.diff(bucket[order])) + 1
+    first = np.concatenate(([0], boundaries))
+    last = np.concatenate((boundaries - 1, [n - 1]))
+    keep = np.concatenate(([0, n - 1], order[first], order[last]))
+    return np.unique(keep)
+
+DOWNSAMPLERS = {
+    "lttb": lttb_indices,
+    "minmax": minmax_indices,
+}
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, n_out: int, method: Optional[str] = "lttb") -> np.ndarray:
+    return DOWNSAMPLERS[method or "lttb"](x, y, n_out)
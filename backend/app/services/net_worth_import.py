@@ -0,0 +1,106 @@
+import csv
+import io
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.models import NetWorthEntry
+from app.schemas.schemas import NetWorthEntryCreate
+from app.services.rollups import apply_to_rollups
+
+class CSVDecodeError(ValueError):
+    """Raised when a CSV line is not valid UTF-8."""
+    def __init__(self, line: int, error: UnicodeDecodeError):
+        super().__init__(f"Line {line} is not valid UTF-8: {error.reason} at byte {error.start}")
+        self.line = line
+
+def _format_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+def _copy_entries(db: Session, rows: List[Dict]) -> None:
+    """Load rows with PostgreSQL COPY on the session's own connection (same transaction)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((repr(row["value"]), row["date"].isoformat(), row["created_at"].isoformat(), row["updated_at"].isoformat()))
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY net_worth_entries (value, date, created_at, updated_at) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+def bulk_insert_entries(db: Session, entries: List[NetWorthEntryCreate]) -> None:
+    """
+    Write validated entries in one round trip: COPY on PostgreSQL (psycopg2),
+    a multi-row INSERT elsewhere. Rollups are updated in the same transaction.
+    Does not commit.
+    """
+    if not entries:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"value": entry.value, "date": entry.date, "created_at": now, "updated_at": now.replace(tzinfo=None)}
+        for entry in entries
+    ]
+    dialect = db.bind.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        _copy_entries(db, rows)
+    else:
+        db.execute(insert(NetWorthEntry), rows)
+    apply_to_rollups(db, ((entry.date, entry.value) for entry in entries))
+
+def import_entries(db: Session, rows: Iterable[Tuple[int, Dict]], chunk_size: int = None) -> Dict:
+    """
+    Validate and insert (row_number, raw_row) pairs in chunks, in a single transaction.
+
+    Invalid rows are skipped and reported per row; valid rows are inserted.
+    Nothing is written if the insert itself fails.
+    """
+    chunk_size = chunk_size or settings.NET_WORTH_IMPORT_CHUNK_SIZE
+    inserted = 0
+    errors = []
+    iterator: Iterator[Tuple[int, Dict]] = iter(rows)
+    try:
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            valid = []
+            for row_number, raw in chunk:
+                try:
+                    valid.append(NetWorthEntryCreate.model_validate(raw))
+                except ValidationError as e:
+                    errors.append({"row": row_number, "error": _format_error(e)})
+            bulk_insert_entries(db, valid)
+            inserted += len(valid)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return {"inserted": inserted, "errors": errors}
+
+def _decoded_lines(file) -> Iterator[str]:
+    # Decoded line by line, so a decoding error names the line it is on
+    for number, line in enumerate(file, start=1):
+        try:
+            yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError as e:
+            raise CSVDecodeError(number, e) from e
+
+def iter_csv_rows(file) -> Iterator[Tuple[int, Dict]]:
+    """
+    Stream (line_number, row) pairs from a binary CSV file with a header row.
+    Raises CSVDecodeError on the first line that isn't UTF-8.
+    """
+    reader = csv.DictReader(_decoded_lines(file))
+    for row in reader:
+        yield reader.line_num, row
@@ -0,0 +1,139 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import numpy as np
+from app.core.config import settings
+from app.services.analytics import period_close_indices
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Monthly residuals further than this many standard deviations out are treated as shocks
+SHOCK_Z = 2.5
+# Fewer months than this and per-month seasonality is mostly noise
+MIN_SEASONAL_MONTHS = 24
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+class InsufficientHistoryError(ValueError):
+    """Raised when the history is too short (or non-positive) to calibrate a projection."""
+
+def calibrate(timestamps: np.ndarray, values: np.ndarray) -> Dict:
+    """
+    Fit the model used by scripts/add_test_data.py to a net worth series: a
+    monthly log-return trend, Gaussian volatility, a per-calendar-month
+    seasonal offset and occasional shocks drawn from the observed outliers.
+    """
+    closes_at = period_close_indices(timestamps, "month") if len(values) else np.empty(0, dtype=np.int64)
+    closes = values[closes_at]
+    if len(closes) < 3:
+        raise InsufficientHistoryError("At least three months of history are needed for a projection")
+    if np.any(closes <= 0):
+        raise InsufficientHistoryError("Projections need a positive net worth history")
+
+    returns = np.diff(np.log(closes))
+    # Calendar month (0-11) each return ends in
+    months = timestamps[closes_at[1:]].astype("datetime64[s]").astype("datetime64[M]").astype(np.int64) % 12
+
+    trend = float(returns.mean())
+    seasonality = np.zeros(12)
+    if len(returns) >= MIN_SEASONAL_MONTHS:
+        sums = np.bincount(months, weights=returns - trend, minlength=12)
+        counts = np.bincount(months, minlength=12)
+        seasonality = np.divide(sums, counts, out=np.zeros(12), where=counts > 0)
+
+    residuals = returns - trend - seasonality[months]
+    spread = residuals.std()
+    shocks = np.abs(residuals) > SHOCK_Z * spread if spread > 0 else np.zeros(len(residuals), dtype=bool)
+    calm = residuals[~shocks]
+    return {
+        "trend": trend,
+        "volatility": float(calm.std(ddof=1)) if len(calm) > 1 else 0.0,
+        "seasonality": seasonality.tolist(),
+        "shock_probability": float(shocks.mean()),
+        "shocks": residuals[shocks].tolist(),
+        "months": int(len(returns)),
+    }
+
+def simulate_paths(calibration: Dict, start_value: float, first_month: int, months: int, paths: int, seed) -> np.ndarray:
+    """Simulate ``paths`` monthly net worth paths as one (paths, months) float32 matrix."""
+    rng = np.random.default_rng(seed)
+    seasonality = np.asarray(calibration["seasonality"])[(first_month + np.arange(months)) % 12]
+    log_returns = rng.normal(calibration["trend"], calibration["volatility"], size=(paths, months))
+    log_returns += seasonality
+    if calibration["shocks"] and calibration["shock_probability"] > 0:
+        hit = rng.random((paths, months)) < calibration["shock_probability"]
+        log_returns[hit] += rng.choice(calibration["shocks"], size=int(hit.sum()))
+    np.cumsum(log_returns, axis=1, out=log_returns)
+    return (start_value * np.exp(log_returns)).astype(np.float32)
+
+def _simulate_chunk(args) -> np.ndarray:
+    return simulate_paths(*args)
+
+def get_projection_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                # spawn: forking a process with live threads (event loop, executors) is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PROJECTION_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+def close_projection_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def run_simulation(calibration: Dict, start_value: float, first_month: int, months: int, paths: int, seed: int) -> np.ndarray:
+    """
+    Simulate in fixed-size chunks, each with its own child seed, so results
+    depend only on the seed. Large runs spread the chunks over the process pool.
+    """
+    chunk_size = settings.PROJECTION_CHUNK_PATHS
+    sizes = [min(chunk_size, paths - offset) for offset in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(calibration, start_value, first_month, months, size, child) for size, child in zip(sizes, seeds)]
+    if paths >= settings.PROJECTION_PARALLEL_PATHS and settings.PROJECTION_WORKERS > 1 and len(jobs) > 1:
+        chunks = list(get_projection_pool().map(_simulate_chunk, jobs))
+    else:
+        chunks = [_simulate_chunk(job) for job in jobs]
+    return np.concatenate(chunks)
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    year, month = value.year + month // 12, month % 12 + 1
+    # Clamp to the end of shorter months
+    day = min(value.day, (datetime(year + month // 12, month % 12 + 1, 1) - datetime(year, month, 1)).days)
+    return value.replace(year=year, month=month, day=day)
+
+def project(timestamps: np.ndarray, values: np.ndarray, months: int, paths: int, seed: int) -> Dict:
+    """
+    Monte Carlo projection of net worth ``months`` ahead of the last point,
+    as percentile bands per month.
+    """
+    calibration = calibrate(timestamps, values)
+    start = datetime.fromtimestamp(float(timestamps[-1]), tz=timezone.utc)
+    start_value = float(values[-1])
+
+    simulated = run_simulation(calibration, start_value, start.month % 12, months, paths, seed)
+    bands = np.percentile(simulated, PERCENTILES, axis=0)
+
+    keys = [f"p{p}" for p in PERCENTILES]
+    return {
+        "start_date": start,
+        "start_value": start_value,
+        "months": months,
+        "paths": paths,
+        "seed": seed,
+        "calibration": {key: calibration[key] for key in ("trend", "volatility", "seasonality", "shock_probability", "months")},
+        "bands": [
+            {"date": _add_months(start, i + 1), **dict(zip(keys, column))}
+            for i, column in enumerate(bands.T.tolist())
+        ],
+    }
@@ -0,0 +1,153 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import and_, case, or_
+from sqlalchemy.orm import Session
+from app.core.database import upsert
+from app.models.models import NetWorthEntry, NetWorthRollup
+
+GRANULARITIES = ("day", "week", "month")
+
+def _as_utc(value_date: datetime) -> datetime:
+    # Entries are read back naive from SQLite and may be posted without an
+    # offset; both are taken as UTC, so every timestamp compares with the others
+    if value_date.tzinfo is None:
+        return value_date.replace(tzinfo=timezone.utc)
+    return value_date.astimezone(timezone.utc)
+
+def bucket_start(value_date: datetime, granularity: str) -> date:
+    """First day of the bucket containing value_date. Weeks start on Monday; buckets are in UTC."""
+    day = _as_utc(value_date).date()
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+def _bucket_end(start: date, granularity: str) -> date:
+    """First day after the bucket starting on ``start``."""
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _aggregate(points: Iterable[Tuple[datetime, float]]) -> Dict[Tuple[str, date], dict]:
+    """Fold (date, value) points into one partial rollup row per (granularity, bucket)."""
+    buckets = {}
+    for value_date, value in points:
+        value_date = _as_utc(value_date)
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(value_date, granularity))
+            row = buckets.get(key)
+            if row is None:
+                buckets[key] = {
+                    "granularity": granularity,
+                    "bucket_start": key[1],
+                    "open_value": value,
+                    "open_at": value_date,
+                    "close_value": value,
+                    "close_at": value_date,
+                    "min_value": value,
+                    "max_value": value,
+                    "sum_value": value,
+                    "entry_count": 1,
+                }
+                continue
+            if value_date < row["open_at"]:
+                row["open_value"], row["open_at"] = value, value_date
+            if value_date >= row["close_at"]:
+                row["close_value"], row["close_at"] = value, value_date
+            row["min_value"] = min(row["min_value"], value)
+            row["max_value"] = max(row["max_value"], value)
+            row["sum_value"] += value
+            row["entry_count"] += 1
+    return buckets
+
+def apply_to_rollups(db: Session, points: Iterable[Tuple[datetime, float]]) -> None:
+    """
+    Merge new net worth points into the rollup tables.
+
+    Upserts every touched bucket in the caller's transaction, so rollups
+    commit or roll back together with the entries. Safe under concurrent writers.
+    """
+    rows = list(_aggregate(points).values())
+    if not rows:
+        return
+
+    table = NetWorthRollup.__table__
+    stmt = upsert(db, NetWorthRollup)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.granularity, table.c.bucket_start],
+        set_={
+            "open_value": case((excluded.open_at < table.c.open_at, excluded.open_value), else_=table.c.open_value),
+            "open_at": case((excluded.open_at < table.c.open_at, excluded.open_at), else_=table.c.open_at),
+            "close_value": case((excluded.close_at >= table.c.close_at, excluded.close_value), else_=table.c.close_value),
+            "close_at": case((excluded.close_at >= table.c.close_at, excluded.close_at), else_=table.c.close_at),
+            "min_value": case((excluded.min_value < table.c.min_value, excluded.min_value), else_=table.c.min_value),
+            "max_value": case((excluded.max_value > table.c.max_value, excluded.max_value), else_=table.c.max_value),
+            "sum_value": table.c.sum_value + excluded.sum_value,
+            "entry_count": table.c.entry_count + excluded.entry_count,
+        }
+    )
+    db.execute(stmt, rows)
+
+def refresh_rollups(db: Session, dates: Iterable[datetime]) -> None:
+    """
+    Recompute the buckets containing ``dates`` from net_worth_entries, after
+    entries in them were removed or replaced; ``apply_to_rollups`` can only add.
+
+    Runs in the caller's transaction, after the entry changes are flushed.
+    """
+    keys = {(granularity, bucket_start(value_date, granularity)) for value_date in dates for granularity in GRANULARITIES}
+    if not keys:
+        return
+
+    table = NetWorthRollup.__table__
+    db.execute(table.delete().where(or_(*(
+        and_(table.c.granularity == granularity, table.c.bucket_start == start) for granularity, start in keys
+    ))))
+
+    # Entries in the union of the buckets; those only in a neighbouring bucket are dropped below
+    ranges = {
+        (datetime.combine(start, datetime.min.time(), timezone.utc),
+         datetime.combine(_bucket_end(start, granularity), datetime.min.time(), timezone.utc))
+        for granularity, start in keys
+    }
+    entries = db.query(NetWorthEntry.date, NetWorthEntry.value).filter(or_(*(
+        and_(NetWorthEntry.date >= low, NetWorthEntry.date < high) for low, high in ranges
+    )))
+    rows = [row for key, row in _aggregate((entry.date, entry.value) for entry in entries).items() if key in keys]
+    if rows:
+        db.execute(table.insert(), rows)
+
+def rebuild_rollups(db: Session, batch_size: int = 10000) -> int:
+    """Recompute all rollups from net_worth_entries. Returns the number of rollup rows written."""
+    db.query(NetWorthRollup).delete()
+    entries = db.query(NetWorthEntry.date, NetWorthEntry.value).execution_options(yield_per=batch_size)
+    rows = list(_aggregate((entry.date, entry.value) for entry in entries).values())
+    if rows:
+        db.execute(NetWorthRollup.__table__.insert(), rows)
+    db.commit()
+    return len(rows)
+
+def get_rollups(db: Session, granularity: str, start: date = None, end: date = None) -> List[dict]:
+    query = db.query(NetWorthRollup).filter(NetWorthRollup.granularity == granularity)
+    if start:
+        query = query.filter(NetWorthRollup.bucket_start >= start)
+    if end:
+        query = query.filter(NetWorthRollup.bucket_start <= end)
+    return [
+        {
+            "bucket_start": rollup.bucket_start,
+            "open": rollup.open_value,
+            "close": rollup.close_value,
+            "min": rollup.min_value,
+            "max": rollup.max_value,
+            "average": rollup.sum_value / rollup.entry_count,
+            "count": rollup.entry_count,
+        }
+        for rollup in query.order_by(NetWorthRollup.bucket_start.asc())
+    ]
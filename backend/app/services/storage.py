@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+from typing import Dict, List, NamedTuple, Optional
+from fastapi import UploadFile
+from app.core.config import settings
+from app.core.s3 import run_s3
+
+
+# DeleteObjects accepts at most this many keys per request
+S3_DELETE_BATCH_SIZE = 1000
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds settings.MAX_UPLOAD_SIZE."""
+
+
+class ChecksumMismatchError(Exception):
+    """Raised when a downloaded object does not match its expected SHA-256."""
+
+
+class UploadResult(NamedTuple):
+    size: int
+    sha256: str
+
+
+async def _read_part(file: UploadFile, part_size: int) -> bytes:
+    # UploadFile.read may return short reads; keep reading until the part is full or EOF
+    buffer = bytearray()
+    while len(buffer) < part_size:
+        chunk = await file.read(part_size - len(buffer))
+        if not chunk:
+            break
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+async def stream_upload_to_s3(
+    s3_client,
+    file: UploadFile,
+    s3_key: str,
+    content_type: Optional[str] = None,
+    part_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+) -> UploadResult:
+    """
+    Stream an uploaded file to S3 one part at a time.
+
+    At most one part is held in memory. Files that fit in a single part are sent
+    with put_object; larger files use a multipart upload, which is aborted if
+    anything goes wrong. Size and SHA-256 are computed while streaming.
+    """
+    part_size = part_size or settings.S3_MULTIPART_CHUNK_SIZE
+    max_size = max_size or settings.MAX_UPLOAD_SIZE
+    extra_args = {"ContentType": content_type} if content_type else {}
+
+    digest = hashlib.sha256()
+    size = 0
+
+    part = await _read_part(file, part_size)
+    if len(part) < part_size:
+        # Small file: a single PUT is cheaper than a multipart round trip
+        if len(part) > max_size:
+            raise UploadTooLargeError(f"File exceeds maximum upload size of {max_size} bytes")
+        digest.update(part)
+        await run_s3(
+            s3_client.put_object,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            Body=part,
+            **extra_args
+        )
+        return UploadResult(size=len(part), sha256=digest.hexdigest())
+
+    multipart = await run_s3(
+        s3_client.create_multipart_upload,
+        Bucket=settings.S3_BUCKET_NAME,
+        Key=s3_key,
+        **extra_args
+    )
+    upload_id = multipart["UploadId"]
+    parts = []
+    try:
+        part_number = 1
+        while part:
+            size += len(part)
+            if size > max_size:
+                raise UploadTooLargeError(f"File exceeds maximum upload size of {max_size} bytes")
+            digest.update(part)
+            response = await run_s3(
+                s3_client.upload_part,
+                Bucket=settings.S3_BUCKET_NAME,
+                Key=s3_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=part
+            )
+            parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+            part_number += 1
+            part = await _read_part(file, part_size)
+
+        await run_s3(
+            s3_client.complete_multipart_upload,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts}
+        )
+    except BaseException:
+        # Also covers cancellation when the client disconnects mid-upload
+        from botocore.exceptions import ClientError
+
+        try:
+            await run_s3(
+                s3_client.abort_multipart_upload,
+                Bucket=settings.S3_BUCKET_NAME,
+                Key=s3_key,
+                UploadId=upload_id
+            )
+        except ClientError as e:
+            print(f"Error aborting multipart upload {upload_id}: {e}")
+        raise
+
+    return UploadResult(size=size, sha256=digest.hexdigest())
+
+
+async def delete_s3_objects(s3_client, keys: List[str]) -> Dict[str, str]:
+    """
+    Delete keys with DeleteObjects, S3_DELETE_BATCH_SIZE keys per request, the
+    batches in parallel. Returns an error message per key that wasn't deleted.
+    """
+    batches = [keys[i:i + S3_DELETE_BATCH_SIZE] for i in range(0, len(keys), S3_DELETE_BATCH_SIZE)]
+    responses = await asyncio.gather(*(
+        run_s3(
+            s3_client.delete_objects,
+            Bucket=settings.S3_BUCKET_NAME,
+            # Quiet: the response lists only the keys that failed
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+        )
+        for batch in batches
+    ), return_exceptions=True)
+
+    errors = {}
+    for batch, response in zip(batches, responses):
+        if isinstance(response, Exception):
+            errors.update((key, str(response)) for key in batch)
+        elif isinstance(response, BaseException):
+            raise response
+        else:
+            for error in response.get("Errors", []):
+                errors[error["Key"]] = f"{error.get('Code')}: {error.get('Message')}"
+    return errors
+
+
+def read_s3_object(s3_client, s3_key: str, expected_sha256: Optional[str] = None, chunk_size: Optional[int] = None) -> bytes:
+    """
+    Read an object from S3 in chunks, verifying its SHA-256 when one is given.
+
+    Used by workers that receive only the S3 key in the task message.
+    """
+    chunk_size = chunk_size or settings.S3_DOWNLOAD_CHUNK_SIZE
+    body = s3_client.get_object(Bucket=settings.S3_BUCKET_NAME, Key=s3_key)["Body"]
+    digest = hashlib.sha256()
+    content = bytearray()
+    try:
+        for chunk in body.iter_chunks(chunk_size=chunk_size):
+            digest.update(chunk)
+            content.extend(chunk)
+    finally:
+        body.close()
+
+    if expected_sha256 and digest.hexdigest() != expected_sha256:
+        raise ChecksumMismatchError(f"SHA-256 mismatch for {s3_key}")
+    return bytes(content)
@@ -0,0 +1,39 @@
+from typing import Optional
+import numpy as np
+
+def generate_realistic_net_worth(
+    periods: int,
+    start_value: float = 100000,
+    volatility: float = 0.02,
+    trend: float = 0.005,
+    periods_per_year: float = 12,
+    calendar_months: Optional[np.ndarray] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Generate realistic net worth data with:
+    - Compound growth
+    - Random volatility
+    - Seasonal patterns (slight increase in Q4, decrease in Q1)
+    - Occasional market corrections or booms (5% chance per month)
+
+    ``trend`` and ``volatility`` are monthly and are scaled to the period
+    length, so the same parameters work for daily or hourly series.
+    ``calendar_months`` gives the month (0-11) of every period; by default
+    period i is month i % 12. All periods are drawn at once.
+    """
+    rng = rng or np.random.default_rng()
+    months_per_period = 12 / periods_per_year
+    if calendar_months is None:
+        calendar_months = np.arange(periods) % 12
+
+    returns = trend * months_per_period + rng.normal(0, volatility * np.sqrt(months_per_period), periods)
+    returns += np.select(
+        [np.isin(calendar_months, (9, 10, 11)), np.isin(calendar_months, (0, 1, 2))],
+        [0.002 * months_per_period, -0.001 * months_per_period],
+        0.0
+    )
+    factors = 1 + returns
+    shocks = rng.random(periods) < 0.05 * months_per_period
+    factors[shocks] *= rng.uniform(0.95, 1.07, int(shocks.sum()))
+    return start_value * np.cumprod(factors)
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from typing import Optional
+from celery.concurrency import get_implementation
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+from app.core.config import settings
+from app.services.document_analyzer import DocumentAnalyzer
+
+class AsyncRuntime:
+    """
+    One event loop per worker process, running in a background thread.
+
+    Task threads hand coroutines to the loop with ``run`` and block until they
+    finish, so with a thread pool (``celery worker --pool=threads``) a single
+    process keeps many LLM calls in flight. The shared analyzer caps how many
+    chat completions run at once (LLM_MAX_CONCURRENCY).
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="async-runtime", daemon=True)
+        self._analyzer: Optional[DocumentAnalyzer] = None
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the runtime loop and wait for its result from a worker thread."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    @property
+    def analyzer(self) -> DocumentAnalyzer:
+        """Shared analyzer; its connection-pooled client is only ever used on this loop."""
+        if self._analyzer is None:
+            self._analyzer = DocumentAnalyzer()
+        return self._analyzer
+
+    def stop(self):
+        if self._analyzer is not None:
+            asyncio.run_coroutine_threadsafe(self._analyzer.client.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.loop.close()
+
+_runtime: Optional[AsyncRuntime] = None
+_lock = threading.Lock()
+
+def get_runtime() -> AsyncRuntime:
+    global _runtime
+    if _runtime is None:
+        with _lock:
+            if _runtime is None:
+                runtime = AsyncRuntime()
+                runtime.start()
+                _runtime = runtime
+    return _runtime
+
+def shutdown_runtime():
+    global _runtime
+    with _lock:
+        if _runtime is not None:
+            _runtime.stop()
+            _runtime = None
+
+@worker_init.connect
+def _start_worker_runtime(sender=None, **kwargs):
+    # Thread and solo pools run tasks in this process, so worker_process_init
+    # never fires; prefork children start their own runtime after the fork
+    if sender is None or not issubclass(get_implementation(sender.pool_cls), PreforkPool):
+        get_runtime()
+
+@worker_shutdown.connect
+def _stop_worker_runtime(**kwargs):
+    shutdown_runtime()
+
+@worker_process_init.connect
+def _start_runtime(**kwargs):
+    # Threads don't survive fork: drop any runtime inherited from the parent
+    global _runtime
+    _runtime = None
+    get_runtime()
+
+@worker_process_shutdown.connect
+def _stop_runtime(**kwargs):
+    shutdown_runtime()
@@ -1,10 +1,17 @@
+import threading
+import time
 from celery import Celery
+from celery.concurrency import get_implementation
+from celery.concurrency.prefork import TaskPool as PreforkPool
+from celery.signals import task_postrun, task_prerun, worker_init
+from prometheus_client import start_http_server
 from app.core.config import settings
+from app.core.metrics import CELERY_TASK_DURATION
 
 celery_app = Celery(
     "wealthmgr",
-    broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL,
+    broker=settings.redis_url,
+    backend=settings.redis_url,
     include=["app.tasks.document_tasks"]
 )
 
@@ -15,4 +22,37 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-) 
\ No newline at end of file
+    task_default_queue=settings.CELERY_TASK_DEFAULT_QUEUE,
+    worker_concurrency=settings.WORKER_CONCURRENCY,
+)
+
+_task_started = {}
+_task_started_lock = threading.Lock()
+
+@task_prerun.connect
+def _record_task_start(task_id=None, **kwargs):
+    with _task_started_lock:
+        _task_started[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def _record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    with _task_started_lock:
+        start = _task_started.pop(task_id, None)
+    if start is not None:
+        CELERY_TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - start)
+
+@worker_init.connect
+def _check_db_pool(sender=None, **kwargs):
+    # Threads beyond the pool size queue for a connection, or time out after DB_POOL_TIMEOUT
+    concurrency = getattr(sender, "concurrency", None) or settings.WORKER_CONCURRENCY
+    if concurrency > settings.DB_POOL_SIZE:
+        print(f"Warning: worker concurrency {concurrency} exceeds DB_POOL_SIZE {settings.DB_POOL_SIZE}; raise DB_POOL_SIZE to at least {concurrency}")
+
+@worker_init.connect
+def _start_metrics_server(sender=None, **kwargs):
+    # Scraped separately from the API; queue length is exported by the API.
+    # The exporter serves this process's registry, which prefork children
+    # don't share, so their task metrics would silently never be scraped.
+    if sender is not None and issubclass(get_implementation(sender.pool_cls), PreforkPool):
+        raise SystemExit("Worker metrics need a pool that runs tasks in this process; start the worker with --pool=threads or --pool=solo")
+    start_http_server(settings.WORKER_METRICS_PORT)
@@ -1,49 +1,71 @@
-from celery import shared_task
+from typing import Optional
 from sqlalchemy.orm import Session
+from app.core.cache import net_worth_cache
 from app.core.database import SessionLocal
-from app.models.models import Document, NetWorthEntry
-from app.services.document_analyzer import DocumentAnalyzer
+from app.core.events import document_events
+from app.core.profiling import profiled
+from app.core.s3 import get_s3_client
+from app.models.models import Document
+from app.services.analysis_cache import get_cached_analysis, store_analysis
+from app.services.analysis_results import record_analysis_result
+from app.services.storage import read_s3_object
+from app.tasks.async_runtime import get_runtime
+from app.tasks.celery_app import celery_app
 
-@shared_task
-def analyze_document(document_id: int, file_content: bytes, file_type: str):
+@celery_app.task
+def analyze_document(document_id: int, s3_key: str, content_hash: Optional[str] = None):
     """
     Analyze a document using the document analyzer service and update the net worth table.
+
+    The message carries only the document id and S3 key (claim check), so its
+    size doesn't depend on the document; the worker reads the file from S3.
+    A sample of runs is profiled when PROFILING_SAMPLE_RATE is set.
     """
+    with profiled("task analyze_document"):
+        return _analyze_document(document_id, s3_key, content_hash)
+
+def _analyze_document(document_id: int, s3_key: str, content_hash: Optional[str]):
+    document = None
+    # Create a new database session
+    db = SessionLocal()
     try:
-        # Create a new database session
-        db = SessionLocal()
-        
         # Get the document
         document = db.query(Document).filter(Document.id == document_id).first()
         if not document:
             return {"error": "Document not found"}
 
-        # Initialize the document analyzer
-        analyzer = DocumentAnalyzer()
-        
-        # Analyze the document
-        analysis_result = analyzer.analyze_document(file_content, file_type)
-        
-        # Update document status
-        document.analysis_status = "completed"
-        document.analysis_result = analysis_result
-        
-        # If net worth value was found, create a new entry
-        if "total_assets" in analysis_result:
-            net_worth_entry = NetWorthEntry(
-                value=analysis_result["total_assets"],
-                date=analysis_result.get("date_of_valuation", None)
-            )
-            db.add(net_worth_entry)
+        # A duplicate uploaded before the first analysis finished may already be cached
+        content_hash = content_hash or document.content_sha256
+        analysis_result = get_cached_analysis(db, content_hash, count_miss=False) if content_hash else None
+
+        if analysis_result is None:
+            # Fetch the uploaded file from S3, verifying it against the upload hash
+            file_content = read_s3_object(get_s3_client(), s3_key, expected_sha256=content_hash)
+
+            # Analyze the document on the process-wide event loop with the shared analyzer
+            runtime = get_runtime()
+            analysis_result = runtime.run(runtime.analyzer.analyze_document(file_content, document.type))
+            if analysis_result is None:
+                raise ValueError("Document analysis returned no result")
+            if content_hash:
+                store_analysis(db, content_hash, analysis_result)
+
+        # Update document status and record the net worth entry
+        added_entry = record_analysis_result(db, document, analysis_result)
         
         db.commit()
-        return {"status": "success", "analysis_result": analysis_result}
+        if added_entry:
+            net_worth_cache.invalidate()
+        document_events.publish({"document_id": document.id, "status": document.analysis_status})
+        return {"status": "success", "analysis_result": document.analysis_result}
         
     except Exception as e:
         if document:
+            db.rollback()
             document.analysis_status = "failed"
             document.analysis_result = {"error": str(e)}
             db.commit()
+            document_events.publish({"document_id": document.id, "status": "failed"})
         return {"error": str(e)}
         
     finally:
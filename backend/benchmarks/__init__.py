@@ -0,0 +1,4 @@
+"""
+Benchmarks for the wealth manager backend. Run from the backend directory,
+e.g. ``python -m benchmarks.bench_s3_client``.
+"""
@@ -0,0 +1,68 @@
+"""
+Compare download throughput with a new S3 client per request (the old
+get_s3_client behaviour) against the process-wide pooled client.
+
+S3 is faked in-process with moto, so this measures client construction and
+event loop blocking rather than network latency.
+
+    python -m benchmarks.bench_s3_client --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+
+import httpx
+from moto import mock_aws
+from app.core.config import settings
+from app.core import s3
+from app.main import app
+
+OBJECT_KEY = "bench.pdf"
+
+async def run(requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def fetch():
+            async with semaphore:
+                response = await client.get(f"/api/v1/documents/download/{OBJECT_KEY}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--size", type=int, default=256 * 1024, help="object size in bytes")
+    args = parser.parse_args()
+
+    # moto only intercepts the default AWS endpoints
+    settings.S3_ENDPOINT_URL = None
+
+    with mock_aws():
+        client = s3.create_s3_client()
+        client.create_bucket(Bucket=settings.S3_BUCKET_NAME)
+        client.put_object(Bucket=settings.S3_BUCKET_NAME, Key=OBJECT_KEY, Body=os.urandom(args.size))
+
+        # Before: a fresh client for every request
+        app.dependency_overrides[s3.get_s3_client] = s3.create_s3_client
+        before = asyncio.run(run(args.requests, args.concurrency))
+
+        # After: one pooled client per process
+        app.dependency_overrides.clear()
+        s3.close_s3()
+        after = asyncio.run(run(args.requests, args.concurrency))
+
+    print(f"per-request client: {before:8.1f} req/s")
+    print(f"shared client:      {after:8.1f} req/s")
+    print(f"speedup:            {after / before:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compare building the /documents/list and /net-worth/history bodies the old
+way (ORM objects, then response_model validation and stdlib JSON, as FastAPI
+does) against the column projection + orjson fast path.
+
+Runs against a temporary SQLite file and calls the route functions directly
+(the fast paths through the async session they use in the API), so the
+numbers are query + serialization time only.
+
+    python -m benchmarks.bench_serialization --rows 10000 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.api.v1.endpoints.documents import get_s3_url, list_documents
+from app.api.v1.endpoints.net_worth import get_net_worth_history
+from app.core.database import Base
+from app.models.models import Document, NetWorthEntry
+from app.schemas.schemas import Document as DocumentSchema, NetWorthEntry as NetWorthEntrySchema
+
+DOCUMENTS = TypeAdapter(List[DocumentSchema])
+ENTRIES = TypeAdapter(List[NetWorthEntrySchema])
+
+def seed(db, rows: int) -> None:
+    now = datetime.now(timezone.utc)
+    db.execute(insert(Document), [
+        {
+            "name": f"statement-{i}.pdf",
+            "type": "application/pdf",
+            "size": 250000,
+            "s3_key": f"{i:08d}.pdf",
+            "content_sha256": f"{i:064x}",
+            "analysis_status": "completed",
+            "analysis_result": {"total_value": 250000.0},
+            "created_at": now - timedelta(minutes=i),
+        }
+        for i in range(rows)
+    ])
+    db.execute(insert(NetWorthEntry), [
+        {"value": 100000.0 + i, "date": now - timedelta(hours=i), "created_at": now, "updated_at": now.replace(tzinfo=None)}
+        for i in range(rows)
+    ])
+    db.commit()
+
+def orm_documents(db, rows: int) -> bytes:
+    documents = db.query(Document).order_by(Document.created_at.desc(), Document.id.desc()).limit(rows).all()
+    for document in documents:
+        document.url = get_s3_url(None, document.s3_key)
+    content = DOCUMENTS.dump_python(DOCUMENTS.validate_python(documents, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+def fast_documents(async_db, rows: int) -> bytes:
+    response = async_db.run(list_documents(
+        cursor=None, limit=rows, analysis_status=None, document_type=None,
+        created_after=None, created_before=None, db=async_db.session
+    ))
+    return response.body
+
+def orm_history(db, rows: int) -> bytes:
+    entries = db.query(NetWorthEntry).order_by(NetWorthEntry.date.desc()).all()
+    content = ENTRIES.dump_python(ENTRIES.validate_python(entries, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+def fast_history(async_db, rows: int) -> bytes:
+    return async_db.run(get_net_worth_history(points=None, method="lttb", if_none_match=None, db=async_db.session)).body
+
+class AsyncDB:
+    """An AsyncSession plus the event loop it runs on, for calling async routes from sync code."""
+    def __init__(self, url: str):
+        self.loop = asyncio.new_event_loop()
+        self.engine = create_async_engine(url)
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)()
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def expunge_all(self):
+        self.session.expunge_all()
+
+    def close(self):
+        self.run(self.session.close())
+        self.run(self.engine.dispose())
+        self.loop.close()
+
+def best_of(func, db, rows: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        func(db, rows)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine)()
+            seed(db, rows)
+            async_db = AsyncDB(f"sqlite+aiosqlite:///{path}")
+
+            for name, before, after in (
+                ("documents", orm_documents, fast_documents),
+                ("history", orm_history, fast_history),
+            ):
+                assert json.loads(before(db, rows)) == json.loads(after(async_db, rows))
+                slow = best_of(before, db, rows, args.repeat)
+                fast = best_of(after, async_db, rows, args.repeat)
+                print(f"{name:10} {rows:>7} rows   ORM + response_model {slow * 1000:8.1f}ms   projection + orjson {fast * 1000:8.1f}ms   {slow / fast:5.2f}x")
+
+            async_db.close()
+            db.close()
+            engine.dispose()
+
+if __name__ == "__main__":
+    main()
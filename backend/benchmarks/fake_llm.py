@@ -0,0 +1,63 @@
+"""
+A local stand-in for the OpenAI chat completions API with configurable latency.
+
+Returns a fixed, valid analysis for every request so DocumentAnalyzer can run
+end to end without network access.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS = {
+    "total_assets": 250000.0,
+    "valuation_date": "2024-03-31",
+    "assets": [{"type": "Stocks", "value": 250000.0, "description": "Brokerage account"}],
+    "liabilities": [],
+    "net_worth": 250000.0,
+}
+
+def make_handler(latency: float):
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            time.sleep(latency)
+            body = json.dumps({
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": json.dumps(ANALYSIS)},
+                }],
+                "usage": {"prompt_tokens": 500, "completion_tokens": 100, "total_tokens": 600},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeLLMHandler
+
+@contextmanager
+def fake_llm_server(latency: float = 0.2):
+    """Serve the fake API on a free localhost port; yields the base URL for OPENAI_BASE_URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,90 @@
+"""
+Cold start of the API and the Celery worker: import time and resident memory.
+
+Each target is imported in a fresh interpreter, --runs times, and the median
+is reported. The API target builds the application as uvicorn does; the
+worker target loads the Celery app and its task modules as ``celery -A
+app.tasks.celery_app worker`` does before it accepts tasks. With --top, one
+more run under ``-X importtime`` lists the slowest top-level packages.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 10 --top 10 --targets worker
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "api": "import app.main",
+    "worker": "from app.tasks.celery_app import celery_app\ncelery_app.loader.import_default_modules()",
+}
+
+# Runs in the child: time the import, then report RSS from /proc (peak RSS elsewhere)
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec(compile(sys.argv[1], "<startup>", "exec"))
+elapsed = time.perf_counter() - start
+rss_kb = None
+try:
+    with open("/proc/self/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+except OSError:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    rss_kb = peak // 1024 if sys.platform == "darwin" else peak
+print(json.dumps({"import_ms": elapsed * 1000, "rss_mb": rss_kb / 1024, "modules": len(sys.modules)}))
+"""
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    # Settings are read at import time; nothing connects during startup
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env.setdefault("OPENAI_API_KEY", "bench")
+    return env
+
+def measure(code: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, code],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_packages(code: str, top: int) -> list:
+    """(package, cumulative ms) for the top-level packages that took longest to import."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, check=True
+    ).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if "." not in name:
+            packages[name] = packages.get(name, 0) + int(cumulative) / 1000
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="list the N slowest top-level packages per target")
+    args = parser.parse_args()
+
+    for name in args.targets:
+        runs = [measure(TARGETS[name]) for _ in range(args.runs)]
+        import_ms = statistics.median(run["import_ms"] for run in runs)
+        rss_mb = statistics.median(run["rss_mb"] for run in runs)
+        print(f"{name:8} import {import_ms:8.1f}ms (min {min(run['import_ms'] for run in runs):.1f}ms)  RSS {rss_mb:6.1f}MB  {runs[0]['modules']} modules")
+        for package, ms in slowest_packages(TARGETS[name], args.top) if args.top else []:
+            print(f"    {package:24} {ms:8.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+End-to-end benchmark and load test, fully offline.
+
+S3 is faked with moto, Celery runs in eager mode, the LLM is a local fake
+server with configurable latency and the database is a temporary SQLite file.
+Each scenario reports throughput, p50/p95/p99 latency, and its own peak RSS
+and growth over the RSS it started with (sampled while it runs, since the
+process's ru_maxrss only ever reports the largest scenario so far). Results
+are compared against benchmarks/baseline.json.
+
+    python -m benchmarks.suite                      # run and compare
+    python -m benchmarks.suite --save-baseline      # run and store a new baseline
+    python -m benchmarks.suite --scenarios list history_downsampled
+
+Exits with status 1 if any scenario regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Settings are read at import time; the engine is rebound to a temporary file below
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+# No Redis offline: no response cache, which also keeps read scenarios measuring
+# the database path, and no document events
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("EVENTS_ENABLED", "false")
+
+import httpx
+import numpy as np
+from moto import mock_aws
+from sqlalchemy import create_engine, insert
+from app.core import s3
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, dispose_async_engine
+from app.main import app
+from app.models.models import Document
+from app.schemas.schemas import NetWorthEntryCreate
+from app.services.net_worth_import import bulk_insert_entries
+from app.tasks.async_runtime import shutdown_runtime
+from app.tasks.celery_app import celery_app
+from app.tasks.document_tasks import analyze_document
+from benchmarks.fake_llm import fake_llm_server
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DOWNLOAD_KEY = "bench-download.pdf"
+ANALYSIS_TEXT = b"Brokerage statement\nTotal assets: 250,000.00\nValuation date: 2024-03-31\n"
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        # No procfs (macOS): fall back to the process peak; ru_maxrss is bytes there, KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class RSSMonitor:
+    """Samples the process's RSS from a background thread while a scenario runs."""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+def summarize(latencies, elapsed: float) -> dict:
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 2),
+    }
+
+async def drive_http(make_request, requests: int, concurrency: int) -> dict:
+    """Issue ``requests`` calls of ``make_request(client, i)`` with bounded concurrency."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await make_request(client, i)
+                await response.aread()
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        result = summarize(latencies, time.perf_counter() - start)
+
+    # Pooled async connections belong to this scenario's event loop
+    await dispose_async_engine()
+    return result
+
+def seed(args) -> None:
+    db = SessionLocal()
+    try:
+        # Net worth history: one entry per day
+        end = datetime.now(timezone.utc)
+        values = 100000 * np.cumprod(1 + np.random.default_rng(0).normal(0.0003, 0.01, args.entries))
+        bulk_insert_entries(db, [
+            NetWorthEntryCreate(value=float(value), date=end - timedelta(days=args.entries - i))
+            for i, value in enumerate(values)
+        ])
+
+        # Documents with analysis results, spread over the last few years
+        now = datetime.now(timezone.utc)
+        db.execute(insert(Document), [
+            {
+                "name": f"statement-{i}.pdf",
+                "type": "application/pdf",
+                "size": 250000,
+                "s3_key": f"seed-{i}.pdf",
+                "content_sha256": f"{i:064x}",
+                "analysis_status": "completed",
+                "analysis_result": {"total_value": 250000.0, "assets": [], "liabilities": []},
+                "created_at": now - timedelta(minutes=i),
+                "updated_at": now.replace(tzinfo=None),
+            }
+            for i in range(args.documents)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    client = s3.get_s3_client()
+    client.put_object(Bucket=settings.S3_BUCKET_NAME, Key=DOWNLOAD_KEY, Body=os.urandom(args.download_size), ContentType="application/pdf")
+
+def scenario_upload(args) -> dict:
+    # Measures the API path only; queuing is a no-op here and analysis has its own scenario
+    with patch.object(analyze_document, "delay"):
+        return asyncio.run(drive_http(
+            lambda client, i: client.post(
+                "/api/v1/documents/upload",
+                files={"file": (f"upload-{i}.pdf", os.urandom(args.upload_size), "application/pdf")}
+            ),
+            args.requests, args.concurrency
+        ))
+
+def scenario_list(args) -> dict:
+    return asyncio.run(drive_http(
+        lambda client, i: client.get("/api/v1/documents/list", params={"limit": 50}),
+        args.requests, args.concurrency
+    ))
+
+def scenario_download(args) -> dict:
+    return asyncio.run(drive_http(
+        lambda client, i: client.get(f"/api/v1/documents/download/{DOWNLOAD_KEY}"),
+        args.requests, args.concurrency
+    ))
+
+def scenario_history_full(args) -> dict:
+    return asyncio.run(drive_http(
+        lambda client, i: client.get("/api/v1/net-worth/history"),
+        max(args.requests // 10, 10), args.concurrency
+    ))
+
+def scenario_history_downsampled(args) -> dict:
+    return asyncio.run(drive_http(
+        lambda client, i: client.get("/api/v1/net-worth/history", params={"points": 500}),
+        args.requests, args.concurrency
+    ))
+
+def scenario_analysis(args) -> dict:
+    """Run analyze_document through Celery in eager mode from a pool of worker threads."""
+    db = SessionLocal()
+    client = s3.get_s3_client()
+    try:
+        documents = []
+        for i in range(args.analysis_tasks):
+            # Unique content per task so the analysis cache doesn't short-circuit the LLM
+            content = ANALYSIS_TEXT + f"Account {i}\n".encode()
+            key = f"analysis-{i}.txt"
+            client.put_object(Bucket=settings.S3_BUCKET_NAME, Key=key, Body=content)
+            document = Document(name=key, type="text/plain", size=len(content), s3_key=key, analysis_status="pending")
+            db.add(document)
+            documents.append(document)
+        db.commit()
+        jobs = [(document.id, document.s3_key) for document in documents]
+    finally:
+        db.close()
+
+    latencies = []
+
+    def run(job):
+        start = time.perf_counter()
+        # Eager mode runs the task inline and returns an EagerResult
+        result = analyze_document.delay(document_id=job[0], s3_key=job[1]).result
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.worker_threads) as pool:
+        list(pool.map(run, jobs))
+    return summarize(latencies, time.perf_counter() - start)
+
+SCENARIOS = {
+    "upload": scenario_upload,
+    "list": scenario_list,
+    "download": scenario_download,
+    "history_full": scenario_history_full,
+    "history_downsampled": scenario_history_downsampled,
+    "analysis": scenario_analysis,
+}
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']} < baseline {base['throughput']}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms > baseline {base['p95_ms']}ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--documents", type=int, default=20000, help="seeded documents")
+    parser.add_argument("--entries", type=int, default=3650, help="seeded daily net worth entries")
+    parser.add_argument("--upload-size", type=int, default=1024 * 1024)
+    parser.add_argument("--download-size", type=int, default=2 * 1024 * 1024)
+    parser.add_argument("--analysis-tasks", type=int, default=64)
+    parser.add_argument("--worker-threads", type=int, default=32, help="simulated --pool=threads concurrency")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM response time in seconds")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, fake_llm_server(args.llm_latency) as llm_url, mock_aws():
+        db_path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False, "timeout": 30})
+        Base.metadata.create_all(bind=engine)
+        SessionLocal.configure(bind=engine)
+        # The async engine is created on first use, so pointing the setting at the file is enough
+        settings.ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{db_path}"
+
+        # moto only intercepts the default AWS endpoints
+        settings.S3_ENDPOINT_URL = None
+        settings.OPENAI_BASE_URL = llm_url
+        celery_app.conf.task_always_eager = True
+        s3.close_s3()
+        s3.get_s3_client().create_bucket(Bucket=settings.S3_BUCKET_NAME)
+
+        seed(args)
+        results = {}
+        for name in args.scenarios:
+            with RSSMonitor() as rss:
+                r = results[name] = SCENARIOS[name](args)
+            r["peak_rss_mb"] = round(rss.peak_mb, 1)
+            r["rss_growth_mb"] = round(rss.peak_mb - rss.start_mb, 1)
+            print(
+                f"{name:22} {r['throughput']:9.1f} req/s  p50 {r['p50_ms']:8.1f}ms  p95 {r['p95_ms']:8.1f}ms  p99 {r['p99_ms']:8.1f}ms"
+                f"  peak RSS {r['peak_rss_mb']:7.1f}MB (+{r['rss_growth_mb']:.1f}MB)"
+            )
+
+        shutdown_runtime()
+        s3.close_s3()
+        engine.dispose()
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,6 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
-from app.api.v1.api import api_router
-
-app = FastAPI(
-    title="Wealth Management Platform",
-    description="API for wealth management and document handling",
-    version="1.0.0",
-    # Disable automatic redirect for trailing slashes
-    redirect_slashes=False
-)
-
-# CORS middleware configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
-    allow_credentials=False,
-    allow_methods=["*"],  # Allow all methods
-    allow_headers=["*"],  # Allow all headers
-    expose_headers=["*"],
-    max_age=3600,  # Cache preflight requests for 1 hour
-)
-
-# Include API router
-app.include_router(api_router, prefix="/api/v1")
-
-# Health check endpoint
-@app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+from app.main import app
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
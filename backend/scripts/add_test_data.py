@@ -1,50 +1,19 @@
 import os
 import sys
-import random
 from datetime import datetime, timedelta
-import math
+import numpy as np
 
 # Add the parent directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.core.cache import net_worth_cache
 from app.core.database import SessionLocal
 from app.models.models import NetWorthEntry
-
-def generate_realistic_net_worth(months, start_value=100000, volatility=0.02, trend=0.005):
-    """
-    Generate realistic net worth data with:
-    - Monthly compound growth
-    - Random volatility
-    - Seasonal patterns
-    - Market-like trends
-    """
-    data = []
-    current_value = start_value
-    
-    for i in range(months):
-        # Base monthly return (trend)
-        monthly_return = trend
-        
-        # Add random volatility
-        monthly_return += random.gauss(0, volatility)
-        
-        # Add seasonal pattern (slight increase in Q4, decrease in Q1)
-        month = i % 12
-        if month in [9, 10, 11]:  # Q4
-            monthly_return += 0.002
-        elif month in [0, 1, 2]:  # Q1
-            monthly_return -= 0.001
-            
-        # Calculate new value with compound interest
-        current_value *= (1 + monthly_return)
-        
-        # Add some major events occasionally (like market corrections or booms)
-        if random.random() < 0.05:  # 5% chance each month
-            current_value *= random.uniform(0.95, 1.07)
-        
-        data.append(current_value)
-    
-    return data
+from app.schemas.schemas import NetWorthEntryCreate
+from app.services.analytics import compute_analytics
+from app.services.net_worth_import import bulk_insert_entries
+from app.services.rollups import rebuild_rollups
+from app.services.synthetic import generate_realistic_net_worth
 
 # Connect to database
 db = SessionLocal()
@@ -61,34 +30,38 @@ try:
     
     # Generate values with realistic patterns
     values = generate_realistic_net_worth(
-        months=months,
+        periods=months,
         start_value=100000,  # Start at $100k
         volatility=0.02,     # 2% monthly volatility
         trend=0.005          # 0.5% average monthly growth
     )
     
-    # Add entries to database
-    for i in range(months):
-        date = start_date + timedelta(days=i*30)
-        entry = NetWorthEntry(
-            value=round(values[i], 2),
-            date=date
-        )
-        db.add(entry)
-    
+    # Add entries to database in one bulk insert
+    entries = [
+        NetWorthEntryCreate(value=round(float(values[i]), 2), date=start_date + timedelta(days=i*30))
+        for i in range(months)
+    ]
+    bulk_insert_entries(db, entries)
     db.commit()
+
+    # Entries were deleted above, so rebuild rollups from scratch
+    rebuild_rollups(db)
+    net_worth_cache.invalidate()
     print(f"Added {months} months of test net worth entries successfully!")
     
-    # Print some statistics
-    latest_value = values[-1]
-    initial_value = values[0]
-    total_return = (latest_value - initial_value) / initial_value * 100
+    # Print some statistics, computed the same way as /net-worth/analytics
+    stats = compute_analytics(
+        np.array([entry.date.timestamp() for entry in entries]),
+        np.array([entry.value for entry in entries])
+    )
     
     print(f"\nStatistics:")
-    print(f"Initial Value: ${initial_value:,.2f}")
-    print(f"Final Value: ${latest_value:,.2f}")
-    print(f"Total Return: {total_return:.1f}%")
-    print(f"Annualized Return: {(math.pow(latest_value/initial_value, 12/months) - 1) * 100:.1f}%")
+    print(f"Initial Value: ${stats['start_value']:,.2f}")
+    print(f"Final Value: ${stats['end_value']:,.2f}")
+    print(f"Total Return: {stats['total_return'] * 100:.1f}%")
+    print(f"Annualized Return: {stats['cagr'] * 100:.1f}%")
+    if stats["max_drawdown"]:
+        print(f"Max Drawdown: {stats['max_drawdown']['depth'] * 100:.1f}%")
     
 finally:
     db.close() 
\ No newline at end of file
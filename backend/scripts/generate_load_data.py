@@ -0,0 +1,242 @@
+"""
+Synthetic data generator for load testing at production scale.
+
+    python scripts/generate_load_data.py --entries 5000000 --frequency hour --documents 300000
+    python scripts/generate_load_data.py --entries 100000 --documents 0 --truncate --seed 7
+
+Net worth entries follow generate_realistic_net_worth at the given frequency,
+ending at --end. Documents get a completed analysis result, asset and
+liability line items and, unless --skip-s3, a small fake statement in S3
+matching their size and SHA-256. Rows are streamed into PostgreSQL with COPY
+in batches of --batch-size, one transaction per batch; other databases fall
+back to multi-row INSERTs. The same --seed and --end give the same data.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import func, insert, text
+from app.core.cache import net_worth_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.s3 import create_s3_client
+from app.models.models import Document, DocumentAsset, DocumentLiability, NetWorthEntry, NetWorthRollup
+from app.services.rollups import rebuild_rollups
+from app.services.synthetic import generate_realistic_net_worth
+
+# numpy datetime64 unit and periods per year for each --frequency
+FREQUENCIES = {
+    "minute": ("m", 365.25 * 24 * 60),
+    "hour": ("h", 365.25 * 24),
+    "day": ("D", 365.25),
+    "week": ("W", 365.25 / 7),
+    "month": ("M", 12),
+}
+ASSET_TYPES = ["Cash", "Stocks", "Bonds", "Real Estate", "Retirement", "Crypto"]
+LIABILITY_TYPES = ["Mortgage", "Credit Card", "Student Loan", "Auto Loan"]
+ENTRY_COLUMNS = ("value", "date", "created_at", "updated_at")
+DOCUMENT_COLUMNS = (
+    "id", "name", "type", "size", "s3_key", "content_sha256",
+    "created_at", "updated_at", "analysis_status", "analysis_result",
+)
+LINE_ITEM_COLUMNS = ("document_id", "type", "value", "description", "date")
+
+def _csv_value(value):
+    if isinstance(value, dict):
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def copy_rows(db, table, columns, rows) -> None:
+    """Write rows with COPY on PostgreSQL (psycopg2), a multi-row INSERT elsewhere. Does not commit."""
+    if not rows:
+        return
+    dialect = db.bind.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # None becomes an unquoted empty field, which COPY reads as NULL
+            writer.writerow([_csv_value(value) for value in row])
+        buffer.seek(0)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+    else:
+        db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+def truncate(db) -> None:
+    tables = [DocumentAsset, DocumentLiability, Document, NetWorthRollup, NetWorthEntry]
+    if db.bind.dialect.name == "postgresql":
+        names = ", ".join(model.__tablename__ for model in tables)
+        db.execute(text(f"TRUNCATE {names} RESTART IDENTITY CASCADE"))
+    else:
+        for model in tables:
+            db.query(model).delete()
+    db.commit()
+
+def generate_entries(db, args, rng) -> None:
+    unit, periods_per_year = FREQUENCIES[args.frequency]
+    end = np.datetime64(args.end.replace(tzinfo=None), unit)
+    dates = end - np.arange(args.entries - 1, -1, -1).astype(f"timedelta64[{unit}]")
+    values = generate_realistic_net_worth(
+        periods=args.entries,
+        start_value=args.start_value,
+        volatility=args.volatility,
+        trend=args.trend,
+        periods_per_year=periods_per_year,
+        calendar_months=dates.astype("datetime64[M]").astype(np.int64) % 12,
+        rng=rng,
+    ).round(2)
+    dates = dates.astype("datetime64[us]")
+
+    created_at, updated_at = args.end, args.end.replace(tzinfo=None)
+    started = time.perf_counter()
+    for offset in range(0, args.entries, args.batch_size):
+        batch = slice(offset, offset + args.batch_size)
+        copy_rows(db, NetWorthEntry.__table__, ENTRY_COLUMNS, [
+            (value, date.replace(tzinfo=timezone.utc), created_at, updated_at)
+            for value, date in zip(values[batch].tolist(), dates[batch].tolist())
+        ])
+        db.commit()
+        done = min(offset + args.batch_size, args.entries)
+        print(f"net_worth_entries: {done}/{args.entries} ({done / (time.perf_counter() - started):,.0f} rows/s)")
+
+def _statement(document_id: int, valuation_date: datetime, assets, liabilities) -> bytes:
+    lines = [f"Synthetic statement {document_id}", f"Valuation date: {valuation_date:%Y-%m-%d}"]
+    lines += [f"{item['type']}: {item['value']:,.2f}" for item in assets]
+    lines += [f"{item['type']} (liability): {item['value']:,.2f}" for item in liabilities]
+    return "\n".join(lines).encode() + b"\n"
+
+def _line_items(rng, count: int, types, scale: float):
+    picked = rng.choice(len(types), size=count)
+    values = np.round(rng.lognormal(np.log(scale), 1.0, count), 2)
+    return [
+        {"type": types[kind], "value": value, "description": f"{types[kind]} account"}
+        for kind, value in zip(picked.tolist(), values.tolist())
+    ]
+
+def document_batch(rng, first_id: int, count: int, args):
+    """Document rows, line item rows and S3 objects (key, body) for ids first_id.."""
+    span = args.document_days * 86400
+    ages = np.sort(rng.uniform(0, span, count))[::-1]
+    asset_counts = rng.integers(1, 6, count)
+    liability_counts = rng.integers(0, 3, count)
+
+    documents, assets_rows, liability_rows, objects = [], [], [], []
+    for i in range(count):
+        document_id = first_id + i
+        created_at = args.end - timedelta(seconds=float(ages[i]))
+        valuation_date = datetime(created_at.year, created_at.month, 1, tzinfo=timezone.utc) - timedelta(days=1)
+        assets = _line_items(rng, int(asset_counts[i]), ASSET_TYPES, 50000)
+        liabilities = _line_items(rng, int(liability_counts[i]), LIABILITY_TYPES, 20000)
+        body = _statement(document_id, valuation_date, assets, liabilities)
+        total_assets = round(sum(item["value"] for item in assets), 2)
+        analysis_result = {
+            "total_value": total_assets,
+            "date": valuation_date.replace(tzinfo=None).isoformat(),
+            "source_document": "text/plain",
+            "assets": assets,
+            "liabilities": liabilities,
+            "net_worth": round(total_assets - sum(item["value"] for item in liabilities), 2),
+        }
+        s3_key = f"synthetic/{args.seed}/{document_id}.txt"
+        documents.append((
+            document_id, f"statement-{document_id}.txt", "text/plain", len(body), s3_key,
+            hashlib.sha256(body).hexdigest(), created_at, created_at.replace(tzinfo=None),
+            "completed", analysis_result,
+        ))
+        assets_rows += [(document_id, item["type"], item["value"], item["description"], valuation_date) for item in assets]
+        liability_rows += [(document_id, item["type"], item["value"], item["description"], valuation_date) for item in liabilities]
+        objects.append((s3_key, body))
+    return documents, assets_rows, liability_rows, objects
+
+def generate_documents(db, args, rng) -> None:
+    s3_client = None if args.skip_s3 else create_s3_client()
+    # Explicit ids so line items can reference documents within the same COPY batch
+    first_id = (db.query(func.max(Document.id)).scalar() or 0) + 1
+
+    def put(item):
+        key, body = item
+        s3_client.put_object(Bucket=settings.S3_BUCKET_NAME, Key=key, Body=body, ContentType="text/plain")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.s3_workers) as pool:
+        for offset in range(0, args.documents, args.batch_size):
+            count = min(args.batch_size, args.documents - offset)
+            documents, assets, liabilities, objects = document_batch(rng, first_id + offset, count, args)
+            if s3_client is not None:
+                # Objects first: a committed row should always have its object
+                list(pool.map(put, objects))
+            copy_rows(db, Document.__table__, DOCUMENT_COLUMNS, documents)
+            copy_rows(db, DocumentAsset.__table__, LINE_ITEM_COLUMNS, assets)
+            copy_rows(db, DocumentLiability.__table__, LINE_ITEM_COLUMNS, liabilities)
+            db.commit()
+            done = offset + count
+            print(f"documents: {done}/{args.documents} ({done / (time.perf_counter() - started):,.0f} rows/s)")
+
+    if db.bind.dialect.name == "postgresql":
+        # Rows were copied with explicit ids; move the sequence past them
+        db.execute(text("SELECT setval(pg_get_serial_sequence('documents', 'id'), (SELECT MAX(id) FROM documents))"))
+        db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000000, help="net worth entries to generate")
+    parser.add_argument("--frequency", choices=list(FREQUENCIES), default="hour")
+    parser.add_argument("--start-value", type=float, default=100000)
+    parser.add_argument("--volatility", type=float, default=0.02, help="monthly volatility")
+    parser.add_argument("--trend", type=float, default=0.005, help="average monthly growth")
+    parser.add_argument("--documents", type=int, default=100000, help="documents to generate")
+    parser.add_argument("--document-days", type=int, default=3 * 365, help="documents are spread over this many days before --end")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=None, help="timestamp of the last entry (default: today 00:00 UTC)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=50000, help="rows per COPY and transaction")
+    parser.add_argument("--s3-workers", type=int, default=32, help="concurrent S3 uploads")
+    parser.add_argument("--skip-s3", action="store_true", help="don't upload statement objects")
+    parser.add_argument("--skip-rollups", action="store_true", help="don't rebuild net_worth_rollups afterwards")
+    parser.add_argument("--truncate", action="store_true", help="delete existing entries, rollups and documents first (S3 objects are kept)")
+    args = parser.parse_args()
+
+    if args.end is None:
+        args.end = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    elif args.end.tzinfo is None:
+        args.end = args.end.replace(tzinfo=timezone.utc)
+
+    # Independent streams, so changing one table's size doesn't change the other's data
+    entries_seed, documents_seed = np.random.SeedSequence(args.seed).spawn(2)
+
+    db = SessionLocal()
+    try:
+        if args.truncate:
+            truncate(db)
+        if args.entries:
+            generate_entries(db, args, np.random.default_rng(entries_seed))
+        if args.documents:
+            generate_documents(db, args, np.random.default_rng(documents_seed))
+        if args.entries and not args.skip_rollups:
+            print(f"Rebuilt {rebuild_rollups(db)} rollup rows")
+        if db.bind.dialect.name == "postgresql":
+            # Fresh planner statistics, so EXPLAIN reflects the new table sizes
+            db.execute(text("ANALYZE"))
+            db.commit()
+    finally:
+        db.close()
+    net_worth_cache.invalidate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.services.rollups import rebuild_rollups
+
+def main():
+    """Recompute net_worth_rollups from net_worth_entries, e.g. after a backfill."""
+    db = SessionLocal()
+    try:
+        count = rebuild_rollups(db)
+        print(f"Rebuilt {count} rollup rows")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,17 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from unittest.mock import MagicMock, patch
 import boto3
+import fakeredis
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.cache import net_worth_cache
+from app.core.events import document_events
+from app.core.rate_limit import llm_rate_limiter
+from app.core.metrics import instrument_engine
+from app.core.database import Base, get_async_db, get_db
 from app.core.config import settings
 from app.api.v1.endpoints.documents import get_s3_client
 
@@ -17,6 +24,14 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The API's async session, on the same file. TestClient may run each request on a
+# new event loop, so connections are not pooled across requests.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+
 @pytest.fixture(scope="function")
 def db():
     # Create the database tables
@@ -31,6 +46,23 @@ def db():
         # Drop all tables after each test
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(scope="function", autouse=True)
+def fake_redis():
+    # One in-memory server per test, seen through sync and asyncio clients
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeRedis(server=server)
+    net_worth_cache.redis = redis
+    net_worth_cache.async_redis = fakeredis.FakeAsyncRedis(server=server)
+    document_events.redis = redis
+    document_events.async_redis = fakeredis.FakeAsyncRedis(server=server)
+    llm_rate_limiter.async_redis = fakeredis.FakeAsyncRedis(server=server)
+    yield redis
+    net_worth_cache.redis = None
+    net_worth_cache.async_redis = None
+    document_events.redis = None
+    document_events.async_redis = None
+    llm_rate_limiter.async_redis = None
+
 @pytest.fixture(scope="function")
 def mock_s3_client():
     mock_client = MagicMock()
@@ -55,10 +87,15 @@ def client(db, mock_s3_client, mock_celery):
         finally:
             db.close()
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+
     def override_get_s3_client():
         return mock_s3_client
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     app.dependency_overrides[get_s3_client] = override_get_s3_client
     
     yield TestClient(app)
@@ -0,0 +1,90 @@
+import io
+from datetime import datetime, timedelta, timezone
+from app.models.models import AnalysisCacheCounter, AnalysisCacheEntry, Document, NetWorthEntry
+from app.services.analysis_cache import cache_stats, evict, get_cached_analysis, store_analysis
+
+ANALYSIS = {"total_value": 250000.0, "date": datetime(2024, 3, 31), "assets": [], "liabilities": []}
+
+def upload(client, content=b"statement content"):
+    return client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("statement.txt", io.BytesIO(content), "text/plain")}
+    )
+
+def test_repeat_upload_reuses_cached_analysis(client, db, mock_celery):
+    """Test that uploading identical content is answered from the cache without queuing"""
+    first = upload(client).json()
+    assert first["analysis_status"] == "pending"
+    assert mock_celery.call_count == 1
+
+    # The worker stores the analysis for this content hash
+    store_analysis(db, first["content_sha256"], ANALYSIS)
+    db.commit()
+
+    second = upload(client).json()
+    assert second["analysis_status"] == "completed"
+    assert second["content_sha256"] == first["content_sha256"]
+    assert second["analysis_result"]["total_value"] == 250000.0
+    assert mock_celery.call_count == 1
+    assert [entry.value for entry in db.query(NetWorthEntry).all()] == [250000.0]
+
+    response = client.get("/api/v1/documents/analysis-cache/stats")
+    assert response.json() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+def test_cache_is_keyed_by_analyzer_version(db, monkeypatch):
+    """Test that changing the model invalidates cached results"""
+    store_analysis(db, "a" * 64, ANALYSIS)
+    db.commit()
+    assert get_cached_analysis(db, "a" * 64) is not None
+
+    monkeypatch.setattr("app.core.config.settings.OPENAI_MODEL", "another-model")
+    assert get_cached_analysis(db, "a" * 64) is None
+
+def test_cache_evicts_least_recently_used(db, monkeypatch):
+    """Test that the cache is capped at ANALYSIS_CACHE_MAX_ENTRIES"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CACHE_EVICT_EVERY", 1)
+    for i, content_hash in enumerate(["a" * 64, "b" * 64, "c" * 64]):
+        store_analysis(db, content_hash, ANALYSIS)
+        db.query(AnalysisCacheEntry).filter(AnalysisCacheEntry.content_sha256 == content_hash).update(
+            {"last_used_at": datetime(2024, 1, 1 + i)}
+        )
+        db.commit()
+
+    remaining = sorted(entry.content_sha256[0] for entry in db.query(AnalysisCacheEntry).all())
+    assert remaining == ["b", "c"]
+
+def test_cache_expires_old_entries(db):
+    """Test that entries older than the TTL are not served"""
+    store_analysis(db, "a" * 64, ANALYSIS)
+    db.query(AnalysisCacheEntry).update({"created_at": datetime.now(timezone.utc) - timedelta(days=365)})
+    db.commit()
+
+    assert get_cached_analysis(db, "a" * 64) is None
+
+def test_eviction_is_sampled(db, monkeypatch):
+    """Test that stores skip eviction unless sampled, letting the cache overshoot its cap briefly"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CACHE_MAX_ENTRIES", 1)
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CACHE_EVICT_EVERY", 10 ** 9)
+    for content_hash in ["a" * 64, "b" * 64, "c" * 64]:
+        store_analysis(db, content_hash, ANALYSIS)
+    db.commit()
+    assert db.query(AnalysisCacheEntry).count() == 3
+
+    evict(db)
+    db.commit()
+    assert db.query(AnalysisCacheEntry).count() == 1
+
+def test_stats_add_up_counter_shards(db, monkeypatch):
+    """Test that hits and misses spread over shards, and legacy unsharded rows, are summed"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CACHE_COUNTER_SHARDS", 4)
+    db.add(AnalysisCacheCounter(name="hits", value=5))
+    store_analysis(db, "a" * 64, ANALYSIS)
+    for _ in range(20):
+        get_cached_analysis(db, "a" * 64)
+        get_cached_analysis(db, "b" * 64)
+    db.commit()
+
+    assert 1 < db.query(AnalysisCacheCounter).count() <= 9
+    stats = cache_stats(db)
+    assert (stats["hits"], stats["misses"]) == (25, 20)
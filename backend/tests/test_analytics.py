@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from app.services.analytics import compute_analytics, max_drawdown, period_close_indices
+
+def timestamps(*dates):
+    return np.array([datetime(*d, tzinfo=timezone.utc).timestamp() for d in dates])
+
+def test_period_close_indices():
+    """Test that the last point of every week and month is picked"""
+    ts = timestamps((2024, 1, 1), (2024, 1, 7), (2024, 1, 8), (2024, 1, 31), (2024, 2, 1))
+
+    # Weeks start on Mondays 2024-01-01, 01-08 and 01-29
+    assert period_close_indices(ts, "week").tolist() == [1, 2, 4]
+    assert period_close_indices(ts, "month").tolist() == [3, 4]
+
+def test_max_drawdown():
+    """Test drawdown depth, dates and duration to recovery"""
+    ts = timestamps((2024, 1, 1), (2024, 1, 2), (2024, 1, 3), (2024, 1, 4), (2024, 1, 5), (2024, 1, 6))
+    values = np.array([100.0, 120.0, 90.0, 60.0, 100.0, 130.0])
+
+    drawdown = max_drawdown(ts, values)
+
+    assert drawdown["depth"] == pytest.approx(-0.5)
+    assert drawdown["peak_date"] == datetime(2024, 1, 2, tzinfo=timezone.utc)
+    assert drawdown["trough_date"] == datetime(2024, 1, 4, tzinfo=timezone.utc)
+    assert drawdown["recovery_date"] == datetime(2024, 1, 6, tzinfo=timezone.utc)
+    assert drawdown["duration_days"] == 4.0
+
+def test_max_drawdown_unrecovered_and_monotonic():
+    """Test that an unrecovered drawdown runs to the last point and a rising series has none"""
+    ts = timestamps((2024, 1, 1), (2024, 1, 11), (2024, 1, 21))
+
+    drawdown = max_drawdown(ts, np.array([100.0, 80.0, 90.0]))
+    assert drawdown["recovery_date"] is None
+    assert drawdown["duration_days"] == 20.0
+
+    assert max_drawdown(ts, np.array([1.0, 2.0, 3.0])) is None
+
+def test_compute_analytics_monthly():
+    """Test returns, best/worst periods, CAGR and rolling volatility on a monthly series"""
+    ts = timestamps(*[(2023 + (m // 12), m % 12 + 1, 1) for m in range(13)])
+    values = 100.0 * 1.01 ** np.arange(13)
+    values[6] = values[5] * 0.9  # one bad month, then back on trend
+
+    result = compute_analytics(ts, values, "month", window=3)
+
+    assert result["points"] == 13
+    assert len(result["returns"]) == 12
+    assert result["worst_period"]["date"] == datetime(2023, 7, 1, tzinfo=timezone.utc)
+    assert result["worst_period"]["value"] == pytest.approx(-0.1)
+    assert result["total_return"] == pytest.approx(1.01 ** 12 - 1)
+    # 365 days between the first and last points
+    assert result["cagr"] == pytest.approx((1.01 ** 12) ** (365.25 / 365) - 1)
+    assert len(result["rolling_volatility"]) == 10
+    assert result["rolling_volatility"][0]["date"] == datetime(2023, 4, 1, tzinfo=timezone.utc)
+
+def test_compute_analytics_empty():
+    """Test that an empty series yields empty analytics"""
+    result = compute_analytics(np.empty(0), np.empty(0), "day")
+
+    assert result["points"] == 0
+    assert result["returns"] == [] and result["rolling_volatility"] == []
+    assert result["cagr"] is None and result["max_drawdown"] is None and result["best_period"] is None
@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.tasks.async_runtime import AsyncRuntime
+
+@pytest.fixture
+def runtime():
+    runtime = AsyncRuntime()
+    runtime.start()
+    yield runtime
+    runtime.stop()
+
+def test_runtime_runs_calls_concurrently(runtime):
+    """Test that calls from many task threads overlap on the shared loop"""
+    in_flight = 0
+    peak = 0
+
+    async def fake_llm_call(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.1)
+        in_flight -= 1
+        return i
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: runtime.run(fake_llm_call(i)), range(8)))
+    elapsed = time.perf_counter() - start
+
+    assert results == list(range(8))
+    # All eight overlap instead of running one after another
+    assert peak == 8
+    assert elapsed < 0.5
+
+def test_runtime_propagates_errors(runtime):
+    """Test that exceptions raised on the loop reach the calling thread"""
+    async def failing_call():
+        raise RuntimeError("rate limited")
+
+    with pytest.raises(RuntimeError, match="rate limited"):
+        runtime.run(failing_call())
+
+def test_runtime_reuses_analyzer(runtime, monkeypatch):
+    """Test that the analyzer and its client are created once per runtime"""
+    monkeypatch.setattr("app.core.config.settings.OPENAI_API_KEY", "test")
+    assert runtime.analyzer is runtime.analyzer
+
+class FakeWorker:
+    """The parts of celery's WorkController that worker_init receivers see."""
+    def __init__(self, pool_cls):
+        self.pool_cls = pool_cls
+
+@pytest.mark.parametrize("pool", ["threads", "solo"])
+def test_thread_pool_worker_starts_and_stops_runtime(pool, monkeypatch):
+    """Test that a worker without forked children runs the runtime from worker_init to worker_shutdown"""
+    from app.tasks import async_runtime
+
+    closed = []
+
+    class FakeClient:
+        async def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(async_runtime, "DocumentAnalyzer", lambda: SimpleNamespace(client=FakeClient()))
+    async_runtime._start_worker_runtime(sender=FakeWorker(pool))
+    runtime = async_runtime._runtime
+    assert runtime is not None and runtime._thread.is_alive()
+    assert runtime.analyzer is async_runtime.get_runtime().analyzer
+
+    async_runtime._stop_worker_runtime(sender=None)
+    assert async_runtime._runtime is None
+    assert not runtime._thread.is_alive()
+    assert closed == [True]
+
+def test_prefork_worker_leaves_runtime_to_children():
+    """Test that the prefork parent doesn't start a loop thread its children would inherit"""
+    from app.tasks import async_runtime
+
+    async_runtime._start_worker_runtime(sender=FakeWorker("prefork"))
+    assert async_runtime._runtime is None
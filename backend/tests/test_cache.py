@@ -0,0 +1,136 @@
+import asyncio
+import fakeredis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.core.cache import ResponseCache, etag_matches
+
+def make_cache():
+    server = fakeredis.FakeServer()
+    cache = ResponseCache("test", ttl=60)
+    cache.redis = fakeredis.FakeRedis(server=server)
+    cache.async_redis = fakeredis.FakeAsyncRedis(server=server)
+    return cache
+
+class DownRedis:
+    """Client whose every command fails to connect; ``calls`` records the command names."""
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            self.calls.append(name)
+            raise RedisConnectionError("down")
+        return fail
+
+class AsyncDownRedis(DownRedis):
+    def __getattr__(self, name):
+        fail = super().__getattr__(name)
+
+        async def call(*args, **kwargs):
+            return fail(*args, **kwargs)
+        return call
+
+def test_get_or_compute_caches_until_invalidated():
+    """Test that responses are served from cache until the namespace is invalidated"""
+    cache = make_cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    async def scenario():
+        first = await cache.get_or_compute("latest", compute)
+        second = await cache.get_or_compute("latest", compute)
+        assert first == second
+        assert first.body == b'{"value":1}'
+        assert len(calls) == 1
+
+        # The worker invalidates synchronously, routes asynchronously
+        cache.invalidate()
+        third = await cache.get_or_compute("latest", compute)
+        assert third.body == b'{"value":2}'
+        assert third.etag != first.etag
+
+        await cache.ainvalidate()
+        assert (await cache.get_or_compute("latest", compute)).body == b'{"value":3}'
+
+    asyncio.run(scenario())
+
+def test_get_or_compute_single_flight():
+    """Test that concurrent misses for the same key compute the response once"""
+    cache = make_cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [1, 2, 3]
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("history", compute) for _ in range(8)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert len({result.etag for result in results}) == 1
+
+def test_get_or_compute_waits_for_other_process(monkeypatch):
+    """Test that a miss waits for another process holding the lock instead of recomputing"""
+    monkeypatch.setattr("app.core.config.settings.RESPONSE_CACHE_LOCK_TIMEOUT", 2.0)
+    cache = make_cache()
+    computed = cache._encode({"from": "other"})
+    cache.redis.set("cache:test:v0:latest:lock", b"1", px=2000)
+
+    async def compute():
+        return {"from": "self"}
+
+    async def other_process():
+        await asyncio.sleep(0.05)
+        cache.redis.set("cache:test:v0:latest", cache._pack(computed), ex=60)
+
+    async def scenario():
+        result, _ = await asyncio.gather(cache.get_or_compute("latest", compute), other_process())
+        return result
+
+    assert asyncio.run(scenario()) == computed
+
+def test_get_or_compute_without_redis():
+    """Test that the cache falls back to computing when Redis is unavailable"""
+    cache = ResponseCache("test")
+    cache.redis = DownRedis()
+    cache.async_redis = AsyncDownRedis()
+
+    async def compute():
+        return {"value": 1}
+
+    assert asyncio.run(cache.get_or_compute("latest", compute)).body == b'{"value":1}'
+    asyncio.run(cache.ainvalidate())
+    cache.invalidate()
+
+def test_get_or_compute_bypasses_redis_after_connection_error(monkeypatch):
+    """Test that reads skip Redis for RESPONSE_CACHE_BREAKER_SECONDS after a connection error"""
+    cache = ResponseCache("test")
+    cache.async_redis = AsyncDownRedis()
+    calls = cache.async_redis.calls
+
+    async def compute():
+        return {"value": 1}
+
+    async def read_twice():
+        return [await cache.get_or_compute("latest", compute) for _ in range(2)]
+
+    assert [response.body for response in asyncio.run(read_twice())] == [b'{"value":1}'] * 2
+    assert calls == ["get"]
+
+    # Once the breaker window has passed, Redis is tried again
+    monkeypatch.setattr("app.core.config.settings.RESPONSE_CACHE_BREAKER_SECONDS", 0.0)
+    cache._bypass_until = 0.0
+    asyncio.run(read_twice())
+    assert calls == ["get"] * 3
+
+def test_etag_matches():
+    """Test If-None-Match parsing"""
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
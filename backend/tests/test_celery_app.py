@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+import pytest
+from app.core.config import settings
+from app.tasks.celery_app import _check_db_pool, _start_metrics_server, celery_app
+
+def test_default_db_pool_fits_worker_concurrency():
+    """Test that every worker thread can hold a connection with the default settings"""
+    assert celery_app.conf.worker_concurrency == settings.WORKER_CONCURRENCY
+    assert settings.DB_POOL_SIZE >= settings.WORKER_CONCURRENCY
+
+def test_worker_warns_when_concurrency_exceeds_db_pool(monkeypatch, capsys):
+    """Test that a worker started with more threads than pooled connections says so"""
+    monkeypatch.setattr("app.core.config.settings.DB_POOL_SIZE", 20)
+    _check_db_pool(sender=SimpleNamespace(concurrency=32))
+    assert "exceeds DB_POOL_SIZE 20" in capsys.readouterr().out
+
+    _check_db_pool(sender=SimpleNamespace(concurrency=20))
+    assert capsys.readouterr().out == ""
+
+def test_metrics_server_refuses_prefork_pool(monkeypatch):
+    """Test that a prefork worker fails at startup instead of exporting no task metrics"""
+    started = []
+    monkeypatch.setattr("app.tasks.celery_app.start_http_server", started.append)
+
+    with pytest.raises(SystemExit, match="--pool=threads"):
+        _start_metrics_server(sender=SimpleNamespace(pool_cls="prefork"))
+    assert started == []
+
+    _start_metrics_server(sender=SimpleNamespace(pool_cls="threads"))
+    assert started == [settings.WORKER_METRICS_PORT]
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import re
+import time
+from types import SimpleNamespace
+from app.services.document_analyzer import DocumentAnalyzer, merge_partial_analyses, split_into_chunks
+
+class FakeCompletions:
+    """Answers each chunk with the asset named on its first line, after a per-chunk delay."""
+    def __init__(self, delays):
+        self.delays = delays
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, model, messages):
+        page = int(re.search(r"Page (\d+)", messages[1]["content"]).group(1))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delays[page])
+        self.in_flight -= 1
+        result = {
+            "total_assets": 1000.0 * page,
+            "valuation_date": f"2024-0{page}-28",
+            "assets": [{"type": "Cash", "value": 1000.0 * page, "description": f"Account {page}"}],
+            "liabilities": [{"type": "Credit Card", "value": 100.0, "description": "Card"}] if page == 1 else [],
+            "net_worth": 1000.0 * page,
+        }
+        message = SimpleNamespace(content=f"Here you go: {json.dumps(result)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def make_analyzer(delays):
+    completions = FakeCompletions(delays)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return DocumentAnalyzer(client=client), completions
+
+def test_split_into_chunks_on_pages():
+    """Test that chunks break on page and section boundaries and respect the size limit"""
+    text = "Page 1\nCash 100\f" + "Page 2\nStocks 200\n\nPage 2 notes\f" + "x" * 25
+
+    chunks = split_into_chunks(text, max_chars=20)
+
+    assert chunks[0] == "Page 1\nCash 100"
+    assert chunks[1] == "Page 2\nStocks 200"
+    assert chunks[2] == "Page 2 notes"
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert "".join(chunks[3:]) == "x" * 25
+
+def test_split_into_chunks_packs_small_sections():
+    """Test that small sections are packed together"""
+    assert split_into_chunks("a\n\nb\n\nc", max_chars=100) == ["a\n\nb\n\nc"]
+
+def test_merge_partial_analyses():
+    """Test that the reduce step keeps every line item, including identical ones, and recomputes totals"""
+    partials = [
+        {"total_assets": 100.0, "valuation_date": "2024-01-31", "assets": [{"type": "Cash", "value": 100.0, "description": "A"}], "liabilities": [], "net_worth": 100.0},
+        {"total_assets": 250.0, "valuation_date": "2024-02-29", "assets": [
+            {"type": "Cash", "value": 100.0, "description": "A"},  # a second, identical account
+            {"type": "Stocks", "value": 150.0, "description": "B"},
+        ], "liabilities": [{"type": "Mortgage", "value": 50.0, "description": "C"}], "net_worth": 200.0},
+    ]
+
+    merged = merge_partial_analyses(partials)
+
+    assert [asset["type"] for asset in merged["assets"]] == ["Cash", "Cash", "Stocks"]
+    assert merged["total_assets"] == 350.0
+    assert merged["net_worth"] == 300.0
+    assert merged["valuation_date"] == "2024-02-29"
+
+def test_analyze_document_chunks_concurrently(monkeypatch):
+    """Test that chunks are analyzed in parallel and merged in document order"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CHARS", 30)
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CONCURRENCY", 4)
+    # Later pages answer first; the result must not depend on completion order
+    analyzer, completions = make_analyzer({1: 0.2, 2: 0.1, 3: 0.05, 4: 0.01})
+    content = "\f".join(f"Page {page}\nBalance {page * 1000}" for page in range(1, 5)).encode()
+
+    start = time.perf_counter()
+    result = asyncio.run(analyzer.analyze_document(content, "text/plain"))
+    elapsed = time.perf_counter() - start
+
+    assert completions.peak == 4
+    assert elapsed < 0.3  # slowest chunk, not the 0.36s sum
+    assert [asset["description"] for asset in result["assets"]] == ["Account 1", "Account 2", "Account 3", "Account 4"]
+    assert result["total_value"] == 10000.0
+    assert result["net_worth"] == 9900.0
+    assert result["date"].strftime("%Y-%m-%d") == "2024-04-28"
+
+def test_analyze_document_respects_chunk_concurrency(monkeypatch):
+    """Test that no more than ANALYSIS_CHUNK_CONCURRENCY chunks are in flight"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CHARS", 30)
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CONCURRENCY", 2)
+    analyzer, completions = make_analyzer({page: 0.02 for page in range(1, 7)})
+    content = "\f".join(f"Page {page}\nBalance {page * 1000}" for page in range(1, 7)).encode()
+
+    result = asyncio.run(analyzer.analyze_document(content, "text/plain"))
+
+    assert completions.peak == 2
+    assert len(result["assets"]) == 6
+
+def test_llm_max_concurrency_caps_calls_across_documents(monkeypatch):
+    """Test that LLM_MAX_CONCURRENCY caps completions in flight over all documents, not documents"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CHARS", 30)
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CONCURRENCY", 4)
+    monkeypatch.setattr("app.core.config.settings.LLM_MAX_CONCURRENCY", 3)
+    analyzer, completions = make_analyzer({page: 0.02 for page in range(1, 5)})
+    content = "\f".join(f"Page {page}\nBalance {page * 1000}" for page in range(1, 5)).encode()
+
+    async def run():
+        return await asyncio.gather(*(analyzer.analyze_document(content, "text/plain") for _ in range(4)))
+
+    results = asyncio.run(run())
+
+    # Four documents of four chunks could otherwise have 16 calls in flight
+    assert completions.peak == 3
+    assert all(len(result["assets"]) == 4 for result in results)
+
+def test_analyze_document_flags_truncated_result(monkeypatch, capsys):
+    """Test that chunks past ANALYSIS_MAX_CHUNKS are skipped and the result is marked partial"""
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_CHUNK_CHARS", 30)
+    monkeypatch.setattr("app.core.config.settings.ANALYSIS_MAX_CHUNKS", 2)
+    analyzer, completions = make_analyzer({page: 0 for page in range(1, 5)})
+    content = "\f".join(f"Page {page}\nBalance {page * 1000}" for page in range(1, 5)).encode()
+
+    result = asyncio.run(analyzer.analyze_document(content, "text/plain"))
+
+    assert result["truncated"] is True
+    assert len(result["assets"]) == 2
+    assert "analyzing the first 2" in capsys.readouterr().out
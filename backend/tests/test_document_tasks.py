@@ -0,0 +1,139 @@
+import asyncio
+import json
+from datetime import date, datetime
+from unittest.mock import patch
+import pytest
+from prometheus_client import REGISTRY
+from app.models.models import Document, DocumentAsset, DocumentLiability, NetWorthEntry, NetWorthRollup
+from app.tasks import document_tasks
+from tests.conftest import TestingSessionLocal
+
+class FakeAnalyzer:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    async def analyze_document(self, content, file_type):
+        self.calls.append((content, file_type))
+        return self.result
+
+class FakeRuntime:
+    def __init__(self, analyzer):
+        self.analyzer = analyzer
+
+    def run(self, coro):
+        return asyncio.run(coro)
+
+@pytest.fixture
+def task_env(db):
+    content = b"Statement: total assets 250000"
+    with patch.object(document_tasks, "SessionLocal", TestingSessionLocal), \
+         patch.object(document_tasks, "get_s3_client") as get_s3_client, \
+         patch.object(document_tasks, "read_s3_object", return_value=content) as read_s3_object:
+        yield content, read_s3_object
+
+def make_document(db):
+    document = Document(name="statement.txt", type="text/plain", size=10, s3_key="statement.txt", analysis_status="pending")
+    db.add(document)
+    db.commit()
+    return document
+
+def test_analyze_document_task(db, task_env, fake_redis):
+    """Test that the task analyzes the S3 object and records the result"""
+    content, read_s3_object = task_env
+    document = make_document(db)
+    analyzer = FakeAnalyzer({"total_value": 250000.0, "date": datetime(2024, 3, 31), "assets": [], "liabilities": []})
+
+    with patch.object(document_tasks, "get_runtime", return_value=FakeRuntime(analyzer)):
+        result = document_tasks.analyze_document(document.id, "statement.txt", content_hash="abc")
+
+    assert result["status"] == "success"
+    assert analyzer.calls == [(content, "text/plain")]
+    assert read_s3_object.call_args.kwargs["expected_sha256"] == "abc"
+
+    db.expire_all()
+    document = db.get(Document, document.id)
+    assert document.analysis_status == "completed"
+    assert document.analysis_result["total_value"] == 250000.0
+    assert [entry.value for entry in db.query(NetWorthEntry).all()] == [250000.0]
+    events = [json.loads(fields[b"data"]) for _, fields in fake_redis.xrange("events:documents")]
+    assert events == [{"document_id": document.id, "status": "completed"}]
+
+def test_analyze_document_task_line_items(db, task_env):
+    """Test that assets and liabilities are written to their tables and replaced on reanalysis"""
+    document = make_document(db)
+    analyzer = FakeAnalyzer({
+        "total_value": 500000.0,
+        "date": datetime(2024, 3, 31),
+        "assets": [
+            {"type": "Real Estate", "value": 400000.0, "description": "House"},
+            {"type": "Cash", "value": "100000", "description": "Checking"},
+        ],
+        "liabilities": [{"type": "Mortgage", "value": 250000.0, "description": None}],
+    })
+
+    with patch.object(document_tasks, "get_runtime", return_value=FakeRuntime(analyzer)):
+        document_tasks.analyze_document(document.id, "statement.txt")
+        document_tasks.analyze_document(document.id, "statement.txt")
+
+    db.expire_all()
+    assets = db.query(DocumentAsset).order_by(DocumentAsset.value.desc()).all()
+    assert [(asset.type, asset.value) for asset in assets] == [("Real Estate", 400000.0), ("Cash", 100000.0)]
+    assert all(asset.document_id == document.id and asset.date.date() == datetime(2024, 3, 31).date() for asset in assets)
+    assert [(l.type, l.value) for l in db.query(DocumentLiability).all()] == [("Mortgage", 250000.0)]
+
+def test_reanalysis_replaces_net_worth_entry(db, task_env):
+    """Test that reanalyzing a document replaces its net worth entry and corrects the rollups"""
+    document = make_document(db)
+    db.add(NetWorthEntry(value=100000.0, date=datetime(2024, 3, 1)))
+    db.commit()
+
+    first = FakeAnalyzer({"total_value": 250000.0, "date": datetime(2024, 3, 31), "assets": [], "liabilities": []})
+    second = FakeAnalyzer({"total_value": 200000.0, "date": datetime(2024, 4, 30), "assets": [], "liabilities": []})
+    for analyzer in (first, second, second):
+        with patch.object(document_tasks, "get_runtime", return_value=FakeRuntime(analyzer)):
+            document_tasks.analyze_document(document.id, "statement.txt")
+
+    db.expire_all()
+    entries = db.query(NetWorthEntry).order_by(NetWorthEntry.date).all()
+    assert [(entry.value, entry.document_id) for entry in entries] == [(100000.0, None), (200000.0, document.id)]
+    # The March bucket is recomputed without the replaced entry
+    rollups = {
+        rollup.bucket_start: (rollup.close_value, rollup.max_value, rollup.entry_count)
+        for rollup in db.query(NetWorthRollup).filter(NetWorthRollup.granularity == "month")
+    }
+    assert rollups == {date(2024, 3, 1): (100000.0, 100000.0, 1), date(2024, 4, 1): (200000.0, 200000.0, 1)}
+
+def test_truncated_analysis_records_no_entry(db, task_env):
+    """Test that a partial analysis is stored but its undercounted total is kept out of net worth"""
+    document = make_document(db)
+    analyzer = FakeAnalyzer({"total_value": 250000.0, "date": datetime(2024, 3, 31), "assets": [], "liabilities": [], "truncated": True})
+
+    with patch.object(document_tasks, "get_runtime", return_value=FakeRuntime(analyzer)):
+        document_tasks.analyze_document(document.id, "statement.txt")
+
+    db.expire_all()
+    document = db.get(Document, document.id)
+    assert document.analysis_status == "completed"
+    assert document.analysis_result["truncated"] is True
+    assert db.query(NetWorthEntry).count() == 0
+
+def test_analyze_document_task_failure(db, task_env):
+    """Test that an empty analysis marks the document as failed"""
+    document = make_document(db)
+
+    with patch.object(document_tasks, "get_runtime", return_value=FakeRuntime(FakeAnalyzer(None))):
+        result = document_tasks.analyze_document(document.id, "statement.txt")
+
+    assert "error" in result
+    db.expire_all()
+    assert db.get(Document, document.id).analysis_status == "failed"
+    assert db.query(NetWorthEntry).count() == 0
+
+def test_analyze_document_task_duration_metric(db, task_env):
+    """Test that task runs are timed through the Celery signals"""
+    labels = {"task": document_tasks.analyze_document.name, "state": "SUCCESS"}
+    before = REGISTRY.get_sample_value("celery_task_duration_seconds_count", labels) or 0.0
+    result = document_tasks.analyze_document.apply(kwargs={"document_id": 999, "s3_key": "missing.txt"})
+    assert result.result == {"error": "Document not found"}
+    assert REGISTRY.get_sample_value("celery_task_duration_seconds_count", labels) == before + 1
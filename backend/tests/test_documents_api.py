@@ -1,7 +1,12 @@
+import hashlib
 import io
-from datetime import datetime
+import json
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
 import pytest
-from app.models.models import Document
+from botocore.exceptions import ClientError
+from app.models.models import Document, DocumentAsset, DocumentLiability
+from app.schemas.schemas import Document as DocumentSchema
 
 def test_upload_document(client, mock_s3_client):
     """Test uploading a document"""
@@ -20,17 +25,47 @@ def test_upload_document(client, mock_s3_client):
     assert data["type"] == "text/plain"
     assert data["size"] == len(file_content)
     assert data["analysis_status"] == "pending"
-    assert data["url"] == "http://mock-presigned-url"
-    assert "s3_key" in data
+    assert data["url"] == f"/api/v1/documents/download/{data['s3_key']}"
     
-    # Verify S3 upload was called
+    # Small files are uploaded with a single PUT
     mock_s3_client.put_object.assert_called_once()
+    mock_s3_client.create_multipart_upload.assert_not_called()
+
+def test_upload_document_queues_claim_check(client, mock_celery):
+    """Test that the analysis task message carries the S3 key and hash, not the file"""
+    file_content = b"%PDF-1.4 " + bytes(range(256))  # binary content must not break queuing
+
+    response = client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("statement.pdf", io.BytesIO(file_content), "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    mock_celery.assert_called_once_with(
+        document_id=data["id"],
+        s3_key=data["s3_key"],
+        content_hash=hashlib.sha256(file_content).hexdigest()
+    )
+
+def test_upload_document_too_large(client, mock_s3_client, monkeypatch):
+    """Test that uploads over the size limit are rejected"""
+    monkeypatch.setattr("app.core.config.settings.MAX_UPLOAD_SIZE", 10)
+
+    response = client.post(
+        "/api/v1/documents/upload",
+        files={"file": ("test.txt", io.BytesIO(b"x" * 11), "text/plain")}
+    )
+
+    assert response.status_code == 413
+    mock_s3_client.put_object.assert_not_called()
 
 def test_list_documents_empty(client):
     """Test listing documents when none exist"""
-    response = client.get("/api/v1/documents/")
+    response = client.get("/api/v1/documents/list")
     assert response.status_code == 200
     assert response.json() == []
+    assert "x-next-cursor" not in response.headers
 
 def test_list_documents_with_entries(client, db, mock_s3_client):
     """Test listing documents with multiple entries"""
@@ -57,15 +92,128 @@ def test_list_documents_with_entries(client, db, mock_s3_client):
         db.add(doc)
     db.commit()
 
-    response = client.get("/api/v1/documents/")
+    response = client.get("/api/v1/documents/list")
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 2
     # Check if documents are ordered by created_at descending
     assert data[0]["name"] == "doc2.txt"
     assert data[1]["name"] == "doc1.txt"
-    assert data[0]["url"] == "http://mock-presigned-url"
-    assert data[1]["url"] == "http://mock-presigned-url"
+    assert data[0]["url"] == "/api/v1/documents/download/key2"
+    assert data[1]["url"] == "/api/v1/documents/download/key1"
+
+def test_list_documents_paginated(client, db):
+    """Test walking through documents with the keyset cursor"""
+    # Two documents share a timestamp to exercise the id tie-breaker
+    created = [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 2, 1), datetime(2024, 3, 1), datetime(2024, 4, 1)]
+    for i, created_at in enumerate(created):
+        db.add(Document(
+            name=f"doc{i}.txt",
+            type="text/plain",
+            size=100,
+            s3_key=f"key{i}",
+            analysis_status="completed",
+            created_at=created_at
+        ))
+    db.commit()
+
+    names = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/documents/list", params=params)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        names.extend(doc["name"] for doc in response.json())
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert names == ["doc4.txt", "doc3.txt", "doc2.txt", "doc1.txt", "doc0.txt"]
+
+def test_list_documents_filtered(client, db):
+    """Test filtering the document list by status, type and date range"""
+    documents = [
+        Document(name="a.pdf", type="application/pdf", size=1, s3_key="a", analysis_status="completed", created_at=datetime(2024, 1, 1)),
+        Document(name="b.pdf", type="application/pdf", size=1, s3_key="b", analysis_status="pending", created_at=datetime(2024, 2, 1)),
+        Document(name="c.txt", type="text/plain", size=1, s3_key="c", analysis_status="completed", created_at=datetime(2024, 3, 1)),
+    ]
+    for doc in documents:
+        db.add(doc)
+    db.commit()
+
+    response = client.get("/api/v1/documents/list", params={"analysis_status": "completed"})
+    assert [doc["name"] for doc in response.json()] == ["c.txt", "a.pdf"]
+
+    response = client.get("/api/v1/documents/list", params={"type": "application/pdf"})
+    assert [doc["name"] for doc in response.json()] == ["b.pdf", "a.pdf"]
+
+    response = client.get(
+        "/api/v1/documents/list",
+        params={"created_after": "2024-01-15T00:00:00", "created_before": "2024-03-01T00:00:00"}
+    )
+    assert [doc["name"] for doc in response.json()] == ["b.pdf"]
+
+def test_list_documents_matches_schema(client, db):
+    """Test that the projection fast path returns exactly what the response schema would"""
+    document = Document(
+        name="statement.pdf",
+        type="application/pdf",
+        size=1024,
+        s3_key="statement.pdf",
+        content_sha256="ab" * 32,
+        analysis_status="completed",
+        analysis_result={"total_value": 1000.0},
+        created_at=datetime(2024, 1, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+    )
+    db.add(document)
+    db.commit()
+    db.refresh(document)
+
+    document.url = "/api/v1/documents/download/statement.pdf"
+    expected = DocumentSchema.model_validate(document).model_dump(mode="json")
+    assert client.get("/api/v1/documents/list").json() == [expected]
+
+def test_list_documents_invalid_cursor(client):
+    """Test that a malformed cursor is rejected"""
+    response = client.get("/api/v1/documents/list", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_list_documents_limit_capped(client):
+    """Test that the page size cannot exceed the maximum"""
+    response = client.get("/api/v1/documents/list", params={"limit": 10000})
+    assert response.status_code == 422
+
+def test_document_allocation(client, db):
+    """Test that allocation sums line items per type, optionally within a date range"""
+    document = Document(name="statement.pdf", type="application/pdf", size=10, s3_key="statement.pdf", analysis_status="completed")
+    db.add(document)
+    db.flush()
+    db.add_all([
+        DocumentAsset(document_id=document.id, type="Stocks", value=300.0, date=datetime(2024, 1, 31, tzinfo=timezone.utc)),
+        DocumentAsset(document_id=document.id, type="Stocks", value=500.0, date=datetime(2024, 2, 29, tzinfo=timezone.utc)),
+        DocumentAsset(document_id=document.id, type="Cash", value=200.0, date=datetime(2024, 2, 29, tzinfo=timezone.utc)),
+        DocumentLiability(document_id=document.id, type="Mortgage", value=1000.0, date=datetime(2024, 2, 29, tzinfo=timezone.utc)),
+    ])
+    db.commit()
+
+    response = client.get("/api/v1/documents/allocation")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"type": "Stocks", "total": 800.0, "count": 2, "share": 0.8},
+        {"type": "Cash", "total": 200.0, "count": 1, "share": 0.2},
+    ]
+
+    response = client.get("/api/v1/documents/allocation", params={"start": "2024-02-01T00:00:00Z"})
+    assert [(bucket["type"], bucket["total"]) for bucket in response.json()] == [("Stocks", 500.0), ("Cash", 200.0)]
+
+    response = client.get("/api/v1/documents/allocation", params={"kind": "liabilities"})
+    assert response.json() == [{"type": "Mortgage", "total": 1000.0, "count": 1, "share": 1.0}]
 
 def test_get_document_not_found(client):
     """Test getting a document that doesn't exist"""
@@ -126,4 +274,138 @@ def test_delete_document(client, db, mock_s3_client):
     mock_s3_client.delete_object.assert_called_once_with(
         Bucket="wealthmgr-documents",
         Key="test_key"
-    ) 
\ No newline at end of file
+    ) 
+
+def add_documents(db, count, **fields):
+    first = db.query(Document).count()
+    documents = [
+        Document(name=f"doc-{i}.pdf", type="application/pdf", size=10, s3_key=f"key-{i}", **{"analysis_status": "completed", **fields})
+        for i in range(first, first + count)
+    ]
+    db.add_all(documents)
+    db.commit()
+    return [document.id for document in documents]
+
+def test_bulk_delete_documents(client, db, mock_s3_client):
+    """Test that bulk delete batches S3 deletes and reports missing ids and S3 failures"""
+    ids = add_documents(db, 3)
+    mock_s3_client.delete_objects.return_value = {"Errors": [{"Key": "key-1", "Code": "AccessDenied", "Message": "Access Denied"}]}
+
+    response = client.post("/api/v1/documents/bulk-delete", json={"ids": ids + [9999]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["succeeded"] == [ids[0], ids[2]]
+    assert data["failed"] == [
+        {"id": 9999, "error": "Document not found"},
+        {"id": ids[1], "error": "S3 delete failed: AccessDenied: Access Denied"},
+    ]
+    mock_s3_client.delete_objects.assert_called_once()
+    assert [document.id for document in db.query(Document).all()] == [ids[1]]
+
+def test_bulk_delete_documents_by_filter(client, db, mock_s3_client):
+    """Test that bulk delete selects by filter and refuses an empty selection"""
+    mock_s3_client.delete_objects.return_value = {}
+    failed_ids = add_documents(db, 2, analysis_status="failed")
+    kept_ids = add_documents(db, 2)
+
+    assert client.post("/api/v1/documents/bulk-delete", json={}).status_code == 400
+
+    response = client.post("/api/v1/documents/bulk-delete", json={"analysis_status": "failed"})
+    assert response.json() == {"succeeded": failed_ids, "failed": []}
+    assert sorted(document.id for document in db.query(Document).all()) == kept_ids
+
+def test_bulk_reanalyze_documents(client, db, mock_celery, fake_redis):
+    """Test that bulk reanalyze resets documents to pending and queues them, reporting queue failures"""
+    ids = add_documents(db, 3, analysis_result={"total_value": 1.0})
+    mock_celery.side_effect = [None, RuntimeError("broker down"), None]
+
+    response = client.post("/api/v1/documents/bulk-reanalyze", json={"ids": ids})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": [ids[0], ids[2]],
+        "failed": [{"id": ids[1], "error": "Failed to queue analysis: broker down"}],
+    }
+    assert [call.kwargs["document_id"] for call in mock_celery.call_args_list] == ids
+    db.expire_all()
+    documents = {document.id: document for document in db.query(Document).all()}
+    assert [documents[i].analysis_status for i in ids] == ["pending", "failed", "pending"]
+    assert documents[ids[0]].analysis_result is None
+    # Clients see the final status of every document, including the ones that couldn't be queued
+    events = [json.loads(fields[b"data"]) for _, fields in fake_redis.xrange("events:documents")]
+    assert events == [
+        {"document_id": ids[0], "status": "pending"},
+        {"document_id": ids[1], "status": "failed"},
+        {"document_id": ids[2], "status": "pending"},
+    ]
+
+def mock_s3_object(mock_s3_client, content, **extra):
+    body = MagicMock()
+    body.iter_chunks.return_value = iter([content])
+    mock_s3_client.get_object.return_value = {
+        "Body": body,
+        "ContentType": "application/pdf",
+        "ContentLength": len(content),
+        "ETag": '"abc123"',
+        "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        **extra
+    }
+    return body
+
+def test_download_document(client, mock_s3_client):
+    """Test streaming a document download with caching headers"""
+    body = mock_s3_object(mock_s3_client, b"%PDF-1.4 test")
+
+    response = client.get("/api/v1/documents/download/test_key.pdf")
+
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.4 test"
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.headers["etag"] == '"abc123"'
+    assert response.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert response.headers["accept-ranges"] == "bytes"
+    body.close.assert_called_once()
+
+def test_download_document_range(client, mock_s3_client):
+    """Test that Range requests are passed to S3 and answered with 206"""
+    mock_s3_object(mock_s3_client, b"%PDF", ContentRange="bytes 0-3/13")
+
+    response = client.get(
+        "/api/v1/documents/download/test_key.pdf",
+        headers={"Range": "bytes=0-3"}
+    )
+
+    assert response.status_code == 206
+    assert response.content == b"%PDF"
+    assert response.headers["content-range"] == "bytes 0-3/13"
+    assert mock_s3_client.get_object.call_args.kwargs["Range"] == "bytes=0-3"
+
+def test_download_document_not_modified(client, mock_s3_client):
+    """Test that a matching If-None-Match returns 304"""
+    mock_s3_client.get_object.side_effect = ClientError(
+        {
+            "Error": {"Code": "304", "Message": "Not Modified"},
+            "ResponseMetadata": {"HTTPStatusCode": 304, "HTTPHeaders": {"etag": '"abc123"'}},
+        },
+        "GetObject"
+    )
+
+    response = client.get(
+        "/api/v1/documents/download/test_key.pdf",
+        headers={"If-None-Match": '"abc123"'}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"abc123"'
+    assert mock_s3_client.get_object.call_args.kwargs["IfNoneMatch"] == '"abc123"'
+
+def test_download_document_not_found(client, mock_s3_client):
+    """Test downloading a missing object"""
+    mock_s3_client.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": "Not Found"}},
+        "GetObject"
+    )
+
+    response = client.get("/api/v1/documents/download/missing.pdf")
+    assert response.status_code == 404
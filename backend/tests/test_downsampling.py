@@ -0,0 +1,53 @@
+import numpy as np
+from app.services.downsampling import lttb_indices, minmax_indices
+
+def test_lttb_keeps_endpoints_and_size():
+    """Test that LTTB returns exactly n_out ascending indices including both ends"""
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 25.0)
+
+    indices = lttb_indices(x, y, 100)
+
+    assert len(indices) == 100
+    assert indices[0] == 0
+    assert indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+
+def test_lttb_keeps_spike():
+    """Test that LTTB preserves a single outlier in a flat series"""
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[321] = 50.0
+
+    assert 321 in lttb_indices(x, y, 20)
+
+def test_minmax_keeps_extremes():
+    """Test that min/max bucketing keeps the global minimum and maximum"""
+    rng = np.random.default_rng(42)
+    x = np.arange(2000, dtype=np.float64)
+    y = rng.normal(size=2000).cumsum()
+
+    indices = minmax_indices(x, y, 100)
+
+    assert len(indices) <= 100
+    assert np.argmax(y) in indices
+    assert np.argmin(y) in indices
+    assert indices[0] == 0
+    assert indices[-1] == 1999
+
+def test_minmax_small_output_is_bounded():
+    """Test that min/max with fewer than four points still downsamples"""
+    x = np.arange(10000, dtype=np.float64)
+    y = np.sin(x / 100)
+
+    for n_out in (3, 4):
+        indices = minmax_indices(x, y, n_out)
+        assert len(indices) <= n_out
+        assert indices[0] == 0
+        assert indices[-1] == 9999
+
+def test_short_series_unchanged():
+    """Test that series no longer than n_out are returned whole"""
+    x = np.arange(10, dtype=np.float64)
+    assert list(lttb_indices(x, x, 10)) == list(range(10))
+    assert list(minmax_indices(x, x, 50)) == list(range(10))
@@ -0,0 +1,80 @@
+import asyncio
+import json
+from app.core.events import document_events
+from app.api.v1.endpoints.documents import _event_stream
+
+async def _next(stream):
+    return await asyncio.wait_for(stream.__anext__(), 5)
+
+def test_subscribe_replays_after_last_event_id_then_streams_live():
+    """Test that a resuming subscriber gets missed events once, then live ones"""
+    first = document_events.publish({"document_id": 1, "status": "pending"})
+    document_events.publish({"document_id": 1, "status": "completed"})
+
+    async def run():
+        stream = document_events.subscribe(first)
+        replayed = await _next(stream)
+        await document_events.apublish({"document_id": 2, "status": "pending"})
+        live = await _next(stream)
+        await stream.aclose()
+        return replayed, live
+
+    replayed, live = asyncio.run(run())
+    assert json.loads(replayed[1]) == {"document_id": 1, "status": "completed"}
+    assert json.loads(live[1]) == {"document_id": 2, "status": "pending"}
+    assert live[0] > replayed[0] > first
+
+def test_subscribe_heartbeat(monkeypatch):
+    """Test that an idle subscription yields heartbeats"""
+    monkeypatch.setattr("app.core.config.settings.EVENTS_HEARTBEAT_SECONDS", 0.01)
+
+    async def run():
+        stream = document_events.subscribe()
+        heartbeat = await _next(stream)
+        await stream.aclose()
+        return heartbeat
+
+    assert asyncio.run(run()) is None
+
+def test_subscribe_drops_slow_subscriber(monkeypatch):
+    """Test that a subscriber whose queue overflows gets what was queued, then ends"""
+    monkeypatch.setattr("app.core.config.settings.EVENTS_SUBSCRIBER_QUEUE_SIZE", 2)
+
+    async def run():
+        stream = document_events.subscribe()
+        first = asyncio.ensure_future(_next(stream))
+        # Let the subscription start before publishing
+        await asyncio.sleep(0.1)
+        for i in range(5):
+            await document_events.apublish({"document_id": i, "status": "pending"})
+        events = [await first]
+        async for event in stream:
+            events.append(event)
+        return events
+
+    events = asyncio.run(run())
+    assert 1 <= len(events) <= 3
+    assert json.loads(events[0][1])["document_id"] == 0
+
+def test_event_stream_format():
+    """Test the SSE framing of document events"""
+    last = document_events.publish({"document_id": 1, "status": "pending"})
+    event_id = document_events.publish({"document_id": 1, "status": "completed"})
+
+    async def run():
+        stream = _event_stream(last)
+        chunks = [await _next(stream), await _next(stream)]
+        await stream.aclose()
+        return chunks
+
+    retry, event = asyncio.run(run())
+    assert retry == b"retry: 3000\n\n"
+    assert event == f"id: {event_id}\nevent: document\ndata: ".encode() + b'{"document_id":1,"status":"completed"}\n\n'
+
+def test_events_disabled(fake_redis, client, monkeypatch):
+    """Test that nothing is published and the stream is unavailable when events are disabled"""
+    monkeypatch.setattr("app.core.config.settings.EVENTS_ENABLED", False)
+    assert document_events.publish({"document_id": 1, "status": "pending"}) is None
+    asyncio.run(document_events.apublish_many([{"document_id": 2, "status": "pending"}]))
+    assert not fake_redis.exists(document_events.key)
+    assert client.get("/api/v1/documents/events").status_code == 404
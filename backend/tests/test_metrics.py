@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+from moto import mock_aws
+from prometheus_client import REGISTRY
+from app.core import s3
+from app.services.document_analyzer import DocumentAnalyzer
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_metrics_endpoint_reports_requests_and_queries(client):
+    """Test that requests are timed per handler and their SQL statements are counted"""
+    before = sample("http_request_duration_seconds_count", method="GET", handler="get_net_worth_history", status="200")
+    queries_before = sample("db_queries_per_request_sum", handler="get_net_worth_history")
+
+    assert client.get("/api/v1/net-worth/history").status_code == 200
+
+    assert sample("http_request_duration_seconds_count", method="GET", handler="get_net_worth_history", status="200") == before + 1
+    assert sample("db_queries_per_request_sum", handler="get_net_worth_history") >= queries_before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_request_duration_seconds_bucket" in response.text
+    assert 'db_pool_checkouts_total{engine="async"}' in response.text
+
+def test_slow_query_log(client, monkeypatch, capsys):
+    """Test that statements over SLOW_QUERY_SECONDS are logged"""
+    monkeypatch.setattr("app.core.config.settings.SLOW_QUERY_SECONDS", 0.0)
+    client.get("/api/v1/net-worth/latest")
+    assert "Slow query" in capsys.readouterr().out
+
+def test_s3_calls_are_timed(monkeypatch):
+    """Test that S3 calls are timed by operation and status"""
+    monkeypatch.setattr("app.core.config.settings.S3_ENDPOINT_URL", None)
+    with mock_aws():
+        client = s3.create_s3_client()
+        client.create_bucket(Bucket="metrics-test")
+        before = sample("s3_request_duration_seconds_count", operation="ListObjectsV2", status="200")
+        client.list_objects_v2(Bucket="metrics-test")
+        assert sample("s3_request_duration_seconds_count", operation="ListObjectsV2", status="200") == before + 1
+
+def test_llm_latency_and_tokens():
+    """Test that LLM calls record latency and token usage"""
+    class Completions:
+        async def create(self, model, messages):
+            message = SimpleNamespace(content='{"total_assets": 100.0, "valuation_date": "2024-01-31"}')
+            usage = SimpleNamespace(prompt_tokens=120, completion_tokens=30)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    analyzer = DocumentAnalyzer(client=SimpleNamespace(chat=SimpleNamespace(completions=Completions())))
+    prompt_before = sample("llm_tokens_total", model=analyzer.model, kind="prompt")
+    calls_before = sample("llm_request_duration_seconds_count", model=analyzer.model, outcome="ok")
+
+    assert asyncio.run(analyzer.analyze_document(b"Total assets 100", "text/plain"))["total_value"] == 100.0
+    assert sample("llm_tokens_total", model=analyzer.model, kind="prompt") == prompt_before + 120
+    assert sample("llm_request_duration_seconds_count", model=analyzer.model, outcome="ok") == calls_before + 1
+
+def test_event_streams_are_counted_separately():
+    """Test that SSE responses are tracked as open streams, not as request latency"""
+    from app.core.metrics import MetricsMiddleware
+
+    open_during = []
+
+    async def stream(scope, receive, send):
+        scope["route"] = SimpleNamespace(name="document_events_stream")
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        open_during.append(sample("http_event_streams_open", handler="document_events_stream"))
+        open_during.append(sample("http_requests_in_progress", method="GET"))
+        await send({"type": "http.response.body", "body": b": keepalive\n\n"})
+
+    async def send(message):
+        pass
+
+    before = sample("http_request_duration_seconds_count", method="GET", handler="document_events_stream", status="200")
+    in_progress = sample("http_requests_in_progress", method="GET")
+    asyncio.run(MetricsMiddleware(stream)({"type": "http", "method": "GET"}, None, send))
+
+    assert open_during == [1, in_progress]
+    assert sample("http_event_streams_open", handler="document_events_stream") == 0
+    assert sample("http_request_duration_seconds_count", method="GET", handler="document_events_stream", status="200") == before
@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytest
 from app.models.models import NetWorthEntry
+from app.schemas.schemas import NetWorthEntry as NetWorthEntrySchema
 
 def test_create_net_worth_entry(client):
     """Test creating a new net worth entry"""
@@ -41,6 +42,19 @@ def test_get_net_worth_history_with_entries(client, db):
     assert data[1]["value"] == 110000.0
     assert data[2]["value"] == 100000.0
 
+def test_get_net_worth_history_matches_schema(client, db):
+    """Test that the projection fast path returns exactly what the response schema would"""
+    entries = [NetWorthEntry(value=100000.5 + i, date=datetime(2024, 1, 1 + i, 9, 30)) for i in range(5)]
+    db.add_all(entries)
+    db.commit()
+
+    expected = [
+        NetWorthEntrySchema.model_validate(entry).model_dump(mode="json")
+        for entry in sorted(entries, key=lambda entry: entry.date, reverse=True)
+    ]
+    assert client.get("/api/v1/net-worth/history").json() == expected
+    assert client.get("/api/v1/net-worth/history", params={"points": 3}).json() == [expected[0], expected[3], expected[4]]
+
 def test_get_latest_net_worth_empty(client):
     """Test getting latest net worth when no entries exist"""
     response = client.get("/api/v1/net-worth/latest")
@@ -62,4 +76,207 @@ def test_get_latest_net_worth_with_entries(client, db):
     response = client.get("/api/v1/net-worth/latest")
     assert response.status_code == 200
     data = response.json()
-    assert data["value"] == 120000.0  # Should return the most recent entry 
\ No newline at end of file
+    assert data["value"] == 120000.0  # Should return the most recent entry 
+
+def test_get_net_worth_history_downsampled(client, db):
+    """Test that ?points= returns a downsampled history that keeps the endpoints"""
+    start = datetime(2020, 1, 1)
+    for i in range(1000):
+        db.add(NetWorthEntry(value=100000.0 + (i % 50) * 1000, date=start + timedelta(days=i)))
+    db.commit()
+
+    for method in ("lttb", "minmax"):
+        response = client.get("/api/v1/net-worth/history", params={"points": 100, "method": method})
+        assert response.status_code == 200
+        data = response.json()
+        assert 3 <= len(data) <= 100
+        dates = [entry["date"] for entry in data]
+        assert dates == sorted(dates, reverse=True)
+        assert dates[0].startswith("2022-09-26")  # last entry
+        assert dates[-1].startswith("2020-01-01")  # first entry
+
+def test_get_net_worth_history_minmax_three_points(client, db):
+    """Test that ?points=3&method=minmax returns three points, not the whole history"""
+    start = datetime(2020, 1, 1)
+    for i in range(1000):
+        db.add(NetWorthEntry(value=100000.0 + (i % 50) * 1000, date=start + timedelta(days=i)))
+    db.commit()
+
+    response = client.get("/api/v1/net-worth/history", params={"points": 3, "method": "minmax"})
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+def test_get_net_worth_history_points_short_series(client, db):
+    """Test that a series shorter than ?points= is returned whole"""
+    for i in range(5):
+        db.add(NetWorthEntry(value=1000.0 * i, date=datetime(2024, 1, i + 1)))
+    db.commit()
+
+    response = client.get("/api/v1/net-worth/history", params={"points": 100})
+    assert response.status_code == 200
+    assert [entry["value"] for entry in response.json()] == [4000.0, 3000.0, 2000.0, 1000.0, 0.0]
+
+def test_create_net_worth_entries_batch(client, db):
+    """Test bulk inserting entries with a per-row error report"""
+    response = client.post(
+        "/api/v1/net-worth/batch",
+        json=[
+            {"value": 100000.0, "date": "2024-01-01T00:00:00"},
+            {"value": "not a number", "date": "2024-02-01T00:00:00"},
+            {"value": 120000.0, "date": "2024-03-01T00:00:00"},
+            {"value": 130000.0},
+        ]
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 2
+    assert [error["row"] for error in data["errors"]] == [2, 4]
+    assert "value" in data["errors"][0]["error"]
+    assert "date" in data["errors"][1]["error"]
+    assert sorted(entry.value for entry in db.query(NetWorthEntry).all()) == [100000.0, 120000.0]
+
+    # Rollups are maintained for bulk inserts too
+    response = client.get("/api/v1/net-worth/rollup", params={"granularity": "month"})
+    assert [bucket["close"] for bucket in response.json()] == [100000.0, 120000.0]
+
+def test_import_net_worth_csv(client, db, monkeypatch):
+    """Test streaming a CSV import across several chunks"""
+    monkeypatch.setattr("app.core.config.settings.NET_WORTH_IMPORT_CHUNK_SIZE", 2)
+    csv_content = (
+        "date,value\n"
+        "2024-01-01,100000\n"
+        "2024-02-01,110000\n"
+        "bad-date,120000\n"
+        "2024-04-01,130000\n"
+        "2024-05-01,140000\n"
+    )
+
+    response = client.post(
+        "/api/v1/net-worth/import-csv",
+        files={"file": ("history.csv", csv_content.encode(), "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 4
+    assert data["errors"][0]["row"] == 4
+    assert db.query(NetWorthEntry).count() == 4
+
+def test_import_net_worth_csv_rejects_non_finite_values(client, db):
+    """Test that nan and inf values are reported per row instead of imported"""
+    csv_content = (
+        "date,value\n"
+        "2024-01-01,100000\n"
+        "2024-02-01,nan\n"
+        "2024-03-01,inf\n"
+    )
+
+    response = client.post(
+        "/api/v1/net-worth/import-csv",
+        files={"file": ("history.csv", csv_content.encode(), "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 1
+    assert [error["row"] for error in data["errors"]] == [3, 4]
+    assert "value" in data["errors"][0]["error"]
+    assert [entry.value for entry in db.query(NetWorthEntry).all()] == [100000.0]
+
+def test_import_net_worth_csv_not_utf8(client, db, monkeypatch):
+    """Test that a non UTF-8 CSV is rejected with its first bad line, importing nothing"""
+    monkeypatch.setattr("app.core.config.settings.NET_WORTH_IMPORT_CHUNK_SIZE", 1)
+    csv_content = "\ufeffdate,value\n2024-01-01,100000\n".encode() + "2024-02-01,110000 \u20ac\n".encode("cp1252")
+
+    response = client.post(
+        "/api/v1/net-worth/import-csv",
+        files={"file": ("history.csv", csv_content, "text/csv")}
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 3 is not valid UTF-8")
+    assert db.query(NetWorthEntry).count() == 0
+
+def test_get_net_worth_analytics(client, db):
+    """Test analytics over a date range and that a write refreshes them"""
+    for i, value in enumerate([100.0, 120.0, 60.0, 90.0, 150.0]):
+        db.add(NetWorthEntry(value=value, date=datetime(2024, i + 1, 15)))
+    db.commit()
+
+    response = client.get("/api/v1/net-worth/analytics", params={"start": "2024-02-01T00:00:00", "window": 2})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["points"] == 4
+    assert data["total_return"] == pytest.approx(0.25)
+    assert [point["value"] for point in data["returns"]] == pytest.approx([-0.5, 0.5, 2 / 3])
+    assert data["worst_period"]["date"].startswith("2024-03-15")
+    assert data["max_drawdown"]["depth"] == pytest.approx(-0.5)
+    assert data["max_drawdown"]["recovery_date"].startswith("2024-05-15")
+    assert len(data["rolling_volatility"]) == 2
+
+    client.post("/api/v1/net-worth/", json={"value": 30.0, "date": "2024-06-15T00:00:00"})
+    data = client.get("/api/v1/net-worth/analytics", params={"start": "2024-02-01T00:00:00", "window": 2}).json()
+    assert data["points"] == 5
+    assert data["worst_period"]["value"] == pytest.approx(-0.8)
+
+def test_get_net_worth_projection(client, db):
+    """Test that a projection needs some history and returns one band per month"""
+    assert client.get("/api/v1/net-worth/projection").status_code == 422
+
+    for i in range(24):
+        db.add(NetWorthEntry(value=100000.0 * 1.01 ** i * (1.02 if i % 2 else 0.98), date=datetime(2022 + i // 12, i % 12 + 1, 1)))
+    db.commit()
+    client.post("/api/v1/net-worth/", json={"value": 130000.0, "date": "2024-01-01T00:00:00"})
+
+    response = client.get("/api/v1/net-worth/projection", params={"months": 12, "paths": 500, "seed": 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["start_value"] == 130000.0
+    assert [band["date"][:10] for band in data["bands"]][:2] == ["2024-02-01", "2024-03-01"]
+    assert len(data["bands"]) == 12
+    assert data["calibration"]["months"] == 24
+
+def test_net_worth_reads_are_cached_until_write(client, db):
+    """Test that history is served from cache and invalidated by a write through the API"""
+    client.post("/api/v1/net-worth/", json={"value": 100000.0, "date": "2024-01-01T00:00:00"})
+    assert len(client.get("/api/v1/net-worth/history").json()) == 1
+
+    # Written behind the API's back: the cached response is still served
+    db.add(NetWorthEntry(value=110000.0, date=datetime(2024, 2, 1)))
+    db.commit()
+    assert len(client.get("/api/v1/net-worth/history").json()) == 1
+
+    # Any write through the API invalidates every cached net worth response
+    client.post("/api/v1/net-worth/", json={"value": 120000.0, "date": "2024-03-01T00:00:00"})
+    assert len(client.get("/api/v1/net-worth/history").json()) == 3
+    assert client.get("/api/v1/net-worth/latest").json()["value"] == 120000.0
+
+def test_net_worth_latest_not_modified(client):
+    """Test conditional GET with If-None-Match on /latest"""
+    client.post("/api/v1/net-worth/", json={"value": 100000.0, "date": "2024-01-01T00:00:00"})
+    response = client.get("/api/v1/net-worth/latest")
+    etag = response.headers["etag"]
+
+    response = client.get("/api/v1/net-worth/latest", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.post("/api/v1/net-worth/", json={"value": 110000.0, "date": "2024-02-01T00:00:00"})
+    response = client.get("/api/v1/net-worth/latest", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["value"] == 110000.0
+
+def test_routes_use_sync_engine_when_async_db_disabled(client, db, monkeypatch):
+    """Test that with ASYNC_DB_ENABLED off the async routes run on a threaded sync session"""
+    from app.core.database import get_async_db
+    from app.main import app
+    from tests.conftest import TestingSessionLocal
+
+    monkeypatch.setattr("app.core.config.settings.ASYNC_DB_ENABLED", False)
+    monkeypatch.setattr("app.core.database.SessionLocal", TestingSessionLocal)
+    monkeypatch.delitem(app.dependency_overrides, get_async_db)
+
+    response = client.post("/api/v1/net-worth/", json={"value": 100000.0, "date": "2024-01-15T00:00:00"})
+    assert response.status_code == 200
+    assert response.json()["value"] == 100000.0
+    assert client.get("/api/v1/net-worth/latest").json()["value"] == 100000.0
+    response = client.get("/api/v1/net-worth/rollup", params={"granularity": "month"})
+    assert [bucket["close"] for bucket in response.json()] == [100000.0]
+    assert [entry.value for entry in db.query(NetWorthEntry).all()] == [100000.0]
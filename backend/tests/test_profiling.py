@@ -0,0 +1,102 @@
+import asyncio
+import os
+import pstats
+from moto import mock_aws
+from app.core import profiling, s3
+
+def test_request_profiled_with_token(client, tmp_path, monkeypatch):
+    """Test that a request with the profiling token is profiled, listed and downloadable"""
+    monkeypatch.setattr("app.core.config.settings.PROFILING_TOKEN", "secret")
+    monkeypatch.setattr("app.core.config.settings.PROFILES_DIR", str(tmp_path))
+
+    response = client.get("/api/v1/net-worth/history", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    name = response.headers["x-profile-id"]
+    assert os.listdir(tmp_path) == [name]
+
+    response = client.get("/api/v1/admin/profiles", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    assert [profile["name"] for profile in response.json()] == [name]
+
+    response = client.get(f"/api/v1/admin/profiles/{name}", headers={"X-Profile-Token": "secret"})
+    assert response.status_code == 200
+    downloaded = tmp_path / "downloaded.prof"
+    downloaded.write_bytes(response.content)
+    assert pstats.Stats(str(downloaded)).total_calls > 0
+
+def test_request_not_profiled_by_default(client, tmp_path, monkeypatch):
+    """Test that requests without a valid token are not profiled when sampling is off"""
+    monkeypatch.setattr("app.core.config.settings.PROFILING_TOKEN", "secret")
+    monkeypatch.setattr("app.core.config.settings.PROFILES_DIR", str(tmp_path))
+
+    for headers in ({}, {"X-Profile-Token": "wrong"}):
+        response = client.get("/api/v1/net-worth/history", headers=headers)
+        assert "x-profile-id" not in response.headers
+    assert os.listdir(tmp_path) == []
+
+def test_admin_profiles_require_token(client, monkeypatch):
+    """Test that the admin endpoints reject missing or wrong tokens, and are closed when unset"""
+    assert client.get("/api/v1/admin/profiles").status_code == 403
+    assert client.get("/api/v1/admin/profiles", headers={"X-Profile-Token": ""}).status_code == 403
+
+    monkeypatch.setattr("app.core.config.settings.PROFILING_TOKEN", "secret")
+    assert client.get("/api/v1/admin/profiles", headers={"X-Profile-Token": "wrong"}).status_code == 403
+    assert client.get("/api/v1/admin/profiles/missing.prof", headers={"X-Profile-Token": "secret"}).status_code == 404
+    assert profiling.read_profile("../../etc/passwd.prof") is None
+
+def test_profiled_block_sampled_to_s3(monkeypatch):
+    """Test the task hook with sampling on and S3 storage"""
+    monkeypatch.setattr("app.core.config.settings.PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr("app.core.config.settings.PROFILES_STORAGE", "s3")
+    monkeypatch.setattr("app.core.config.settings.S3_ENDPOINT_URL", None)
+    with mock_aws():
+        try:
+            s3.get_s3_client().create_bucket(Bucket=s3.settings.S3_BUCKET_NAME)
+            with profiling.profiled("task analyze_document"):
+                sum(range(1000))
+
+            profiles = profiling.list_profiles()
+            assert len(profiles) == 1
+            assert "-task_analyze_document-" in profiles[0]["name"]
+            assert profiling.read_profile(profiles[0]["name"])
+        finally:
+            s3.close_s3()
+
+def test_overlapping_profiles_are_skipped():
+    """Test that only one profile runs per process at a time"""
+    outer = profiling.Profiler()
+    assert outer.start()
+    try:
+        assert not profiling.Profiler().start()
+    finally:
+        outer.stop()
+    inner = profiling.Profiler()
+    assert inner.start()
+    inner.stop()
+
+def test_event_streams_are_not_profiled(tmp_path, monkeypatch):
+    """Test that an SSE response frees the profiling slot as soon as it starts, and stores nothing"""
+    monkeypatch.setattr("app.core.config.settings.PROFILING_TOKEN", "secret")
+    monkeypatch.setattr("app.core.config.settings.PROFILES_DIR", str(tmp_path))
+    slot_free = []
+
+    async def stream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]})
+        # Another request can be profiled while the stream is still open
+        profiler = profiling.Profiler()
+        slot_free.append(profiler.start())
+        if slot_free[0]:
+            profiler.cancel()
+        await send({"type": "http.response.body", "body": b": keepalive\n\n"})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/documents/events", "headers": [(b"x-profile-token", b"secret")]}
+    asyncio.run(profiling.ProfilingMiddleware(stream)(scope, None, send))
+
+    assert slot_free == [True]
+    assert b"x-profile-id" not in dict(messages[0]["headers"])
+    assert os.listdir(tmp_path) == []
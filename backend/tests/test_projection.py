@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from app.services import projection
+from app.services.projection import InsufficientHistoryError, calibrate, project, run_simulation
+
+def monthly_series(months, trend=0.005, volatility=0.02, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = np.array([
+        datetime(2015 + m // 12, m % 12 + 1, 28, tzinfo=timezone.utc).timestamp() for m in range(months)
+    ])
+    values = 100000 * np.exp(np.cumsum(rng.normal(trend, volatility, months)))
+    return timestamps, values
+
+def test_calibrate_recovers_trend_and_volatility():
+    """Test that calibration on a synthetic series recovers its drift and volatility"""
+    calibration = calibrate(*monthly_series(120))
+
+    assert calibration["months"] == 119
+    assert calibration["trend"] == pytest.approx(0.005, abs=0.004)
+    assert calibration["volatility"] == pytest.approx(0.02, abs=0.005)
+    assert len(calibration["seasonality"]) == 12
+
+def test_calibrate_needs_history():
+    """Test that a too-short or non-positive history is rejected"""
+    timestamps, values = monthly_series(2)
+    with pytest.raises(InsufficientHistoryError):
+        calibrate(timestamps, values)
+
+    timestamps, values = monthly_series(12)
+    values[5] = 0.0
+    with pytest.raises(InsufficientHistoryError):
+        calibrate(timestamps, values)
+
+def test_project_bands_are_ordered():
+    """Test that percentile bands are ordered and start one month after the last point"""
+    timestamps, values = monthly_series(60)
+    result = project(timestamps, values, months=24, paths=2000, seed=1)
+
+    assert len(result["bands"]) == 24
+    assert result["bands"][0]["date"] == datetime(2020, 1, 28, tzinfo=timezone.utc)
+    for band in result["bands"]:
+        assert band["p5"] <= band["p25"] <= band["p50"] <= band["p75"] <= band["p95"]
+    # Uncertainty widens with the horizon
+    assert result["bands"][-1]["p95"] - result["bands"][-1]["p5"] > result["bands"][0]["p95"] - result["bands"][0]["p5"]
+
+def test_run_simulation_same_in_process_pool(monkeypatch):
+    """Test that a seeded run gives the same paths with or without the process pool"""
+    calibration = calibrate(*monthly_series(60))
+    monkeypatch.setattr("app.core.config.settings.PROJECTION_CHUNK_PATHS", 500)
+    monkeypatch.setattr("app.core.config.settings.PROJECTION_WORKERS", 2)
+
+    monkeypatch.setattr("app.core.config.settings.PROJECTION_PARALLEL_PATHS", 10 ** 9)
+    serial = run_simulation(calibration, 1000.0, 0, 12, 2000, seed=7)
+
+    monkeypatch.setattr("app.core.config.settings.PROJECTION_PARALLEL_PATHS", 1000)
+    try:
+        parallel = run_simulation(calibration, 1000.0, 0, 12, 2000, seed=7)
+    finally:
+        projection.close_projection_pool()
+
+    assert serial.shape == (2000, 12)
+    np.testing.assert_array_equal(serial, parallel)
+    assert not np.array_equal(serial, run_simulation(calibration, 1000.0, 0, 12, 2000, seed=8))
@@ -0,0 +1,217 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import fakeredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.core.rate_limit import llm_rate_limiter
+from app.services.document_analyzer import DocumentAnalyzer
+
+@pytest.fixture
+def limits(monkeypatch):
+    # 60 requests and 6000 tokens a minute, i.e. 1 request and 100 tokens a second;
+    # buckets hold 10 seconds worth
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_RPM", 60)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_TPM", 6000)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_HEADROOM", 1.0)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_BURST_SECONDS", 10)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_RECOVERY_SECONDS", 60)
+
+@pytest.fixture
+def bucket_redis():
+    """Synchronous view of the limiter's fakeredis server, which runs the Lua script."""
+    server = fakeredis.FakeServer()
+    llm_rate_limiter.async_redis = fakeredis.FakeAsyncRedis(server=server)
+    return fakeredis.FakeRedis(server=server)
+
+class FakeClock:
+    """Epoch clock that only moves when the limiter sleeps; records every sleep."""
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_rate_limiter, "clock", clock.time)
+    monkeypatch.setattr(llm_rate_limiter, "sleep", clock.sleep)
+    return clock
+
+def stored_state(redis):
+    return {key.decode(): float(value) for key, value in redis.hgetall(llm_rate_limiter.key).items()}
+
+def run_script(*steps):
+    """Run (op, amount, now in ms) steps through the bucket script; returns the waits in ms."""
+    async def run():
+        return [await llm_rate_limiter._run(op, amount, now=now) for op, amount, now in steps]
+    return asyncio.run(run())
+
+def test_take_until_empty_then_wait(limits, bucket_redis):
+    """Test that a full bucket allows a burst, then reports the wait for the scarcer limit"""
+    assert run_script(*[("take", 200, 0)] * 5) == [0.0] * 5
+    assert stored_state(bucket_redis)["requests"] == 5
+    assert stored_state(bucket_redis)["tokens"] == 0
+
+    # Tokens ran out before requests: 200 more tokens take two seconds
+    assert run_script(("take", 200, 0), ("take", 200, 2000)) == [pytest.approx(2000), 0.0]
+    assert stored_state(bucket_redis)["requests"] == pytest.approx(6)
+
+def test_refill_is_capped_at_the_burst(limits, bucket_redis):
+    """Test that an idle bucket doesn't save up more than BURST_SECONDS of capacity"""
+    run_script(("take", 1000, 0), ("settle", 0, 3_600_000))
+    state = stored_state(bucket_redis)
+    assert state["tokens"] == 1000
+    assert state["requests"] == 10
+
+def test_oversized_call_goes_through_when_full(limits, bucket_redis):
+    """Test that a call bigger than the bucket waits for a full bucket and leaves it in debt"""
+    assert run_script(("take", 2500, 0)) == [0.0]
+    assert stored_state(bucket_redis)["tokens"] == -1500
+    assert run_script(("take", 2500, 0)) == [pytest.approx(25000)]
+
+def test_backoff_cuts_the_rate_once_and_recovers(limits, bucket_redis):
+    """Test that a 429 pauses callers, halves the rate once per episode and recovers over time"""
+    # A second 429 from a call already in flight doesn't cut the rate again
+    waits = run_script(("backoff", 2, 0), ("backoff", 1, 0), ("take", 100, 0))
+    state = stored_state(bucket_redis)
+    assert state["rate"] == 0.5
+    assert state["blocked_until"] == 2000
+    assert waits[2] == 2000
+
+    # Refills at half speed during the pause, and the rate climbs back over 60 seconds
+    run_script(("settle", 0, 2000))
+    state = stored_state(bucket_redis)
+    assert state["tokens"] == pytest.approx(100)
+    assert state["requests"] == pytest.approx(1)
+    assert state["rate"] == pytest.approx(0.5 + 2 / 60)
+    assert run_script(("take", 100, 2000)) == [0.0]
+    run_script(("settle", 0, 32000))
+    assert stored_state(bucket_redis)["rate"] == 1.0
+
+def test_limiter_shares_state_through_redis(limits, bucket_redis, clock):
+    """Test that the limiter waits for capacity and keeps its buckets in Redis"""
+    async def run():
+        # Take the whole request bucket, then one more, which needs a refill
+        for _ in range(10):
+            assert await llm_rate_limiter.acquire(10) == 0.0
+        return await llm_rate_limiter.acquire(10)
+
+    waited = asyncio.run(run())
+    # One request refills in a second, plus up to 10% jitter
+    assert len(clock.sleeps) == 1
+    assert 1.0 <= clock.sleeps[0] <= 1.1
+    assert waited == clock.sleeps[0]
+    # Eleven requests taken from ten plus what refilled while waiting
+    assert stored_state(bucket_redis)["requests"] == pytest.approx(clock.sleeps[0] - 1, abs=1e-3)
+
+def test_concurrent_acquires_dont_overspend(limits, bucket_redis, clock):
+    """Test that concurrent callers never take more than the bucket holds"""
+    async def run():
+        return await asyncio.gather(*(llm_rate_limiter.acquire(100) for _ in range(10)))
+
+    assert asyncio.run(run()) == [0.0] * 10
+    # Every call took from the bucket, and together they took exactly what it held
+    state = stored_state(bucket_redis)
+    assert state["tokens"] == 0
+    assert state["requests"] == 0
+
+    # So the next caller waits for a refill
+    asyncio.run(llm_rate_limiter.acquire(100))
+    assert len(clock.sleeps) == 1
+    assert 1.0 <= clock.sleeps[0] <= 1.1
+
+def test_settle_charges_actual_usage(limits, bucket_redis, clock):
+    """Test that usage beyond the estimate is charged, and overestimates refunded"""
+    async def run():
+        await llm_rate_limiter.acquire(100)
+        await llm_rate_limiter.settle(250)
+        await llm_rate_limiter.settle(-50)
+
+    asyncio.run(run())
+    # 100 estimated, 300 actually used
+    assert stored_state(bucket_redis)["tokens"] == 700
+
+def test_limiter_disabled_without_limits(bucket_redis, clock):
+    """Test that nothing is stored or waited for when no limits are configured"""
+    assert asyncio.run(llm_rate_limiter.acquire(10 ** 9)) == 0.0
+    assert clock.sleeps == []
+    assert stored_state(bucket_redis) == {}
+
+class RateLimitedError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after_ms):
+        super().__init__("Rate limit reached")
+        self.response = SimpleNamespace(headers={"retry-after-ms": str(retry_after_ms)})
+
+class FlakyCompletions:
+    """Rejects the first ``failures`` calls with a 429, then answers with token usage."""
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def create(self, model, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimitedError(200)
+        message = SimpleNamespace(content=json.dumps({"total_assets": 100.0, "valuation_date": "2024-01-31"}))
+        usage = SimpleNamespace(prompt_tokens=300, completion_tokens=50)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def test_analyzer_backs_off_on_429(limits, bucket_redis, clock, monkeypatch):
+    """Test that a 429 is retried after the shared pause, with the rate cut for every worker"""
+    monkeypatch.setattr("app.core.config.settings.LLM_COMPLETION_TOKENS_ESTIMATE", 100)
+    # Plenty of capacity, so the wait is the pause the 429 asked for
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_RPM", 600)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_TPM", 600000)
+    completions = FlakyCompletions(failures=1)
+    analyzer = DocumentAnalyzer(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    result = asyncio.run(analyzer.analyze_document(b"Total assets 100", "text/plain"))
+
+    assert result["total_value"] == 100.0
+    assert completions.calls == 2
+    # The retry waited out the 200ms the 429 asked for, plus jitter
+    assert len(clock.sleeps) == 1
+    assert 0.2 <= clock.sleeps[0] <= 0.22
+    assert stored_state(bucket_redis)["rate"] == pytest.approx(0.5 + clock.sleeps[0] / 60)
+
+def test_analyzer_gives_up_after_max_retries(limits, bucket_redis, clock, monkeypatch):
+    """Test that persistent 429s fail the chunk after OPENAI_MAX_RETRIES retries"""
+    monkeypatch.setattr("app.core.config.settings.OPENAI_MAX_RETRIES", 2)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_RPM", 600)
+    monkeypatch.setattr("app.core.config.settings.LLM_RATE_LIMIT_TPM", 600000)
+    completions = FlakyCompletions(failures=10)
+    analyzer = DocumentAnalyzer(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    assert asyncio.run(analyzer.analyze_document(b"Total assets 100", "text/plain")) is None
+    assert completions.calls == 3
+    # Each retry first waited out the 200ms pause
+    assert all(0.2 <= seconds <= 0.22 for seconds in clock.sleeps[:2])
+
+class UnreachableRedis:
+    def register_script(self, script):
+        async def run(keys, args):
+            raise RedisConnectionError("Connection refused")
+        return run
+
+def test_analyzer_waits_locally_when_redis_is_down(limits, monkeypatch):
+    """Test that a 429 still pauses the retry when the shared limiter can't record it"""
+    monkeypatch.setattr(llm_rate_limiter, "async_redis", UnreachableRedis())
+    clock = FakeClock()
+    monkeypatch.setattr("app.services.document_analyzer.asyncio.sleep", clock.sleep)
+    completions = FlakyCompletions(failures=2)
+    analyzer = DocumentAnalyzer(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    result = asyncio.run(analyzer.analyze_document(b"Total assets 100", "text/plain"))
+
+    assert result["total_value"] == 100.0
+    # Two retries, each after the 200ms the 429 asked for
+    assert clock.sleeps == [0.2, 0.2]
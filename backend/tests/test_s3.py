@@ -0,0 +1,24 @@
+import asyncio
+import threading
+from app.core import s3
+
+def test_get_s3_client_is_shared():
+    """Test that every caller gets the same pooled client"""
+    try:
+        client = s3.get_s3_client()
+        assert s3.get_s3_client() is client
+        assert client.meta.config.max_pool_connections == s3.settings.S3_MAX_POOL_CONNECTIONS
+    finally:
+        s3.close_s3()
+
+def test_run_s3_runs_off_event_loop_thread():
+    """Test that blocking S3 calls run in the S3 executor"""
+    async def call():
+        return await s3.run_s3(lambda key: (key, threading.current_thread().name), "test_key")
+
+    try:
+        key, thread_name = asyncio.run(call())
+        assert key == "test_key"
+        assert thread_name.startswith("s3")
+    finally:
+        s3.close_s3()
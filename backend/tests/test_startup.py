@@ -0,0 +1,26 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def imported_modules(code: str) -> set:
+    probe = f"{code}\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    env = {**os.environ, "DATABASE_URL": "sqlite://"}
+    output = subprocess.run(
+        [sys.executable, "-c", probe], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return set(json.loads(output.strip().splitlines()[-1]))
+
+def test_api_startup_skips_worker_dependencies():
+    """Test that importing the API loads neither boto3, botocore, Celery nor the OpenAI SDK"""
+    modules = imported_modules("import app.main")
+    assert "app.main" in modules
+    assert not {"boto3", "botocore", "celery", "openai", "app.tasks.document_tasks"} & modules
+
+def test_health_check(client):
+    """Test the health endpoint of the application built by create_app"""
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "healthy"}
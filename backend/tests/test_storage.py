@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import io
+from unittest.mock import MagicMock
+import pytest
+from fastapi import UploadFile
+from app.services.storage import delete_s3_objects, stream_upload_to_s3, read_s3_object, ChecksumMismatchError, UploadTooLargeError
+
+def make_upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="test.txt")
+
+def make_s3_client():
+    s3_client = MagicMock()
+    s3_client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+    s3_client.upload_part.side_effect = lambda **kwargs: {"ETag": f"etag-{kwargs['PartNumber']}"}
+    return s3_client
+
+def test_stream_upload_multipart():
+    """Test that large files are sent as multipart uploads in fixed-size parts"""
+    content = b"abcdefghij" * 3  # 30 bytes -> parts of 8, 8, 8, 6
+    s3_client = make_s3_client()
+
+    result = asyncio.run(stream_upload_to_s3(
+        s3_client, make_upload(content), "key", content_type="text/plain", part_size=8
+    ))
+
+    assert result.size == len(content)
+    assert result.sha256 == hashlib.sha256(content).hexdigest()
+    s3_client.put_object.assert_not_called()
+    bodies = [call.kwargs["Body"] for call in s3_client.upload_part.call_args_list]
+    assert bodies == [content[0:8], content[8:16], content[16:24], content[24:30]]
+    parts = s3_client.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+    assert [p["PartNumber"] for p in parts] == [1, 2, 3, 4]
+    assert parts[0]["ETag"] == "etag-1"
+    s3_client.abort_multipart_upload.assert_not_called()
+
+def test_stream_upload_aborts_on_failure():
+    """Test that a failed part aborts the multipart upload"""
+    s3_client = make_s3_client()
+    s3_client.upload_part.side_effect = RuntimeError("connection reset")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(stream_upload_to_s3(s3_client, make_upload(b"x" * 20), "key", part_size=8))
+
+    s3_client.complete_multipart_upload.assert_not_called()
+    s3_client.abort_multipart_upload.assert_called_once_with(
+        Bucket="wealthmgr-documents",
+        Key="key",
+        UploadId="upload-1"
+    )
+
+def test_stream_upload_aborts_when_too_large():
+    """Test that exceeding the size limit mid-stream aborts the multipart upload"""
+    s3_client = make_s3_client()
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(stream_upload_to_s3(
+            s3_client, make_upload(b"x" * 20), "key", part_size=8, max_size=12
+        ))
+
+    assert s3_client.upload_part.call_count == 1
+    s3_client.abort_multipart_upload.assert_called_once()
+
+def make_s3_body(chunks):
+    body = MagicMock()
+    body.iter_chunks.return_value = iter(chunks)
+    return body
+
+def test_read_s3_object_verifies_hash():
+    """Test reading an object in chunks and checking its SHA-256"""
+    s3_client = MagicMock()
+    s3_client.get_object.return_value = {"Body": make_s3_body([b"abc", b"def"])}
+
+    content = read_s3_object(s3_client, "key", expected_sha256=hashlib.sha256(b"abcdef").hexdigest())
+
+    assert content == b"abcdef"
+    s3_client.get_object.return_value["Body"].close.assert_called_once()
+
+def test_read_s3_object_hash_mismatch():
+    """Test that a corrupted or replaced object is rejected"""
+    s3_client = MagicMock()
+    s3_client.get_object.return_value = {"Body": make_s3_body([b"tampered"])}
+
+    with pytest.raises(ChecksumMismatchError):
+        read_s3_object(s3_client, "key", expected_sha256=hashlib.sha256(b"original").hexdigest())
+
+def test_delete_s3_objects_batches_and_reports_errors():
+    """Test that keys are deleted 1000 per request and failures are reported per key"""
+    s3_client = MagicMock()
+
+    def delete_objects(Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        if "key-1500" in keys:
+            return {"Errors": [{"Key": "key-1500", "Code": "AccessDenied", "Message": "Access Denied"}]}
+        return {}
+    s3_client.delete_objects.side_effect = delete_objects
+
+    errors = asyncio.run(delete_s3_objects(s3_client, [f"key-{i}" for i in range(2500)]))
+
+    assert [len(call.kwargs["Delete"]["Objects"]) for call in s3_client.delete_objects.call_args_list] == [1000, 1000, 500]
+    assert errors == {"key-1500": "AccessDenied: Access Denied"}
@@ -1,39 +1,107 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { DocumentIcon, ArrowDownTrayIcon } from '@heroicons/react/24/outline'
 import api from '@/app/api'
 import toast from 'react-hot-toast'
 
 interface Document {
+  id: number;
   name: string;
   date: string;
   type: string;
   size: string;
+  status: string;
 }
 
+interface DocumentEvent {
+  document_id: number;
+  status: string;
+}
+
+// Uploads arriving together (e.g. a bulk upload) are fetched with one refresh
+const REFRESH_DEBOUNCE_MS = 500
+
 export default function DocumentList() {
   const [documents, setDocuments] = useState<Document[]>([])
   const [loading, setLoading] = useState(true)
+  // Keyset pagination: the list endpoint returns the next page's cursor in X-Next-Cursor
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const loadedMore = useRef(false)
+  const knownIds = useRef<Set<number>>(new Set())
+  const newestId = useRef(0)
+  const refreshTimer = useRef<ReturnType<typeof setTimeout> | null>(null)
+
+  useEffect(() => {
+    knownIds.current = new Set(documents.map((doc) => doc.id))
+    newestId.current = documents.reduce((newest, doc) => Math.max(newest, doc.id), 0)
+  }, [documents])
+
+  const scheduleRefresh = () => {
+    if (refreshTimer.current === null) {
+      refreshTimer.current = setTimeout(() => {
+        refreshTimer.current = null
+        fetchDocuments()
+      }, REFRESH_DEBOUNCE_MS)
+    }
+  }
 
   useEffect(() => {
     fetchDocuments()
+
+    // Status changes are pushed over one long-lived connection instead of polling;
+    // EventSource reconnects on its own and resumes from the last event id
+    const events = new EventSource(`${api.defaults.baseURL}/documents/events`)
+    events.addEventListener('document', (message) => {
+      const event: DocumentEvent = JSON.parse((message as MessageEvent).data)
+      if (event.status === 'deleted') {
+        setDocuments((docs) => docs.filter((doc) => doc.id !== event.document_id))
+      } else if (!knownIds.current.has(event.document_id)) {
+        // Only a new upload belongs in the list; other unknown ids are
+        // documents outside it, e.g. older ones being reanalyzed
+        if (event.status === 'pending' && event.document_id > newestId.current) {
+          scheduleRefresh()
+        }
+      } else {
+        setDocuments((docs) => docs.map((doc) => doc.id === event.document_id ? { ...doc, status: event.status } : doc))
+      }
+    })
+    return () => {
+      events.close()
+      if (refreshTimer.current !== null) {
+        clearTimeout(refreshTimer.current)
+      }
+    }
   }, [])
 
+  const fetchPage = async (cursor?: string) => {
+    const response = await api.get('/documents/list', { params: cursor ? { cursor } : {} })
+    const page: Document[] = response.data.map((doc: any) => ({
+      id: doc.id,
+      name: doc.name,
+      date: new Date(doc.created_at).toLocaleDateString('en-US', {
+        year: 'numeric',
+        month: 'short',
+        day: 'numeric'
+      }),
+      type: doc.name.split('.').pop()?.toUpperCase() || 'Unknown',
+      size: formatFileSize(doc.size),
+      status: doc.analysis_status
+    }))
+    // Absent on the last page
+    return { page, cursor: (response.headers['x-next-cursor'] as string | undefined) ?? null }
+  }
+
   const fetchDocuments = async () => {
+    // Refreshes the first page, keeping any older pages already loaded below it
     try {
-      const response = await api.get('/documents/list')
-      const formattedDocs = response.data.map((doc: any) => ({
-        name: doc.name,
-        date: new Date(doc.created_at).toLocaleDateString('en-US', {
-          year: 'numeric',
-          month: 'short',
-          day: 'numeric'
-        }),
-        type: doc.name.split('.').pop()?.toUpperCase() || 'Unknown',
-        size: formatFileSize(doc.size)
-      }))
-      setDocuments(formattedDocs)
+      const { page, cursor } = await fetchPage()
+      const pageIds = new Set(page.map((doc) => doc.id))
+      setDocuments((docs) => [...page, ...docs.filter((doc) => !pageIds.has(doc.id))])
+      if (!loadedMore.current) {
+        setNextCursor(cursor)
+      }
     } catch (err) {
       console.error('Error fetching documents:', err)
       toast.error('Failed to fetch documents')
@@ -42,6 +110,26 @@ export default function DocumentList() {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const { page, cursor } = await fetchPage(nextCursor)
+      loadedMore.current = true
+      // Rows pushed down by new uploads since the previous page are already listed
+      setDocuments((docs) => {
+        const ids = new Set(docs.map((doc) => doc.id))
+        return [...docs, ...page.filter((doc) => !ids.has(doc.id))]
+      })
+      setNextCursor(cursor)
+    } catch (err) {
+      console.error('Error fetching documents:', err)
+      toast.error('Failed to fetch documents')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const formatFileSize = (bytes: number) => {
     if (bytes === 0) return '0 B'
     const k = 1024
@@ -78,21 +166,39 @@ export default function DocumentList() {
             <tr className="border-b border-slate-700/50">
               <th className="text-left py-3 px-6 text-sm font-medium text-slate-400">Name</th>
               <th className="text-left py-3 px-6 text-sm font-medium text-slate-400">Date</th>
+              <th className="text-left py-3 px-6 text-sm font-medium text-slate-400">Analysis</th>
             </tr>
           </thead>
           <tbody>
-            {documents.map((doc, i) => (
-              <tr key={i} className="border-b border-slate-700/50 last:border-0 hover:bg-slate-700/20 transition-colors cursor-pointer">
+            {documents.map((doc) => (
+              <tr key={doc.id} className="border-b border-slate-700/50 last:border-0 hover:bg-slate-700/20 transition-colors cursor-pointer">
                 <td className="py-4 px-6">
                   <div className="flex items-center gap-3">
                     <span className="text-sm text-slate-200">{doc.name}</span>
                   </div>
                 </td>
                 <td className="py-4 px-6 text-sm text-slate-300">{doc.date}</td>
+                <td className="py-4 px-6 text-sm text-slate-300 capitalize">{doc.status}</td>
               </tr>
             ))}
           </tbody>
         </table>
+        {nextCursor && (
+          <div className="border-t border-slate-700/50 p-4 flex justify-center">
+            <button
+              type="button"
+              onClick={loadMore}
+              disabled={loadingMore}
+              className={`py-2 px-4 rounded-lg text-sm font-medium transition-all duration-200 ${
+                loadingMore
+                  ? 'bg-slate-700/50 text-slate-400 cursor-not-allowed'
+                  : 'bg-indigo-600 text-white hover:bg-indigo-700 shadow-sm'
+              }`}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
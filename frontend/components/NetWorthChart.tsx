@@ -62,7 +62,8 @@ export default function NetWorthChart({ onHighlightsChange }: Props) {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await api.get('net-worth/history')
+        // The chart is a few hundred pixels wide; let the API downsample long histories
+        const response = await api.get('net-worth/history', { params: { points: 500 } })
         const formattedData = response.data.map((item: ApiResponse) => ({
           date: item.date,
           net_worth: Number(item.value)